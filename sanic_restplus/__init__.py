@@ -1,8 +1,11 @@
 # -*- coding: utf-8 -*-
 #
-from . import fields, reqparse, inputs, cors
+from . import fields, reqparse, inputs, cors, sources
 from .api import Api  # noqa
-from .marshalling import marshal, marshal_with, marshal_with_field  # noqa
+from .marshalling import (  # noqa
+    marshal, marshal_with, marshal_with_field, marshal_many, marshal_json, compile_marshaller, compile_encoder,
+    projection, memoizing, marshal_async, marshal_many_async, Columns
+)
 from .mask import Mask
 from .model import Model, OrderedModel, SchemaModel  # noqa
 from .namespace import Namespace  # noqa
@@ -19,6 +22,15 @@ __all__ = (
     'marshal',
     'marshal_with',
     'marshal_with_field',
+    'marshal_many',
+    'marshal_json',
+    'compile_marshaller',
+    'compile_encoder',
+    'projection',
+    'memoizing',
+    'marshal_async',
+    'marshal_many_async',
+    'Columns',
     'Mask',
     'Model',
     'Namespace',
@@ -29,6 +41,7 @@ __all__ = (
     'fields',
     'inputs',
     'reqparse',
+    'sources',
     'RestError',
     'SpecsError',
     'Swagger',
@@ -11,6 +11,7 @@ import logging
 import operator
 import re
 import traceback
+from concurrent.futures import ProcessPoolExecutor
 
 from functools import wraps, partial, lru_cache, update_wrapper
 from types import MethodType
@@ -49,7 +50,7 @@ from .postman import PostmanCollectionV1
 from .resource import Resource
 from .swagger import Swagger
 from .utils import OrderedDict, cur_py_version, default_id, camel_to_dash, unpack, best_match_accept_mimetype, get_accept_mimetypes
-from .representations import output_json_fast
+from .representations import output_json_fast, output_json_pretty, RawJSON, dumps_bytes
 from ._http import HTTPStatus
 
 
@@ -98,6 +99,11 @@ class Api(object):
     :param FormatChecker format_checker: A jsonschema.FormatChecker object that is hooked into
         the Model validator. A default or a custom FormatChecker can be provided (e.g., with custom
         checkers), otherwise the default action is to not enforce any format validation.
+    :param int offload_threshold: The number of rows from which collections are marshalled
+        and encoded out of the event loop. Disabled if ``None`` (default).
+    :param Executor executor: The executor (thread or process pool) to offload big collections to.
+        Default to the event loop default executor.
+        With a process pool, the collections are only encoded there if the response is JSON.
     '''
 
     uid_counter = 0
@@ -109,7 +115,7 @@ class Api(object):
             tags=None, prefix='', ordered=False,
             default_mediatype='application/json', decorators=None,
             catch_all_404s=False, serve_challenge_on_401=False, format_checker=None,
-            additional_css=None, **kwargs):
+            additional_css=None, offload_threshold=None, executor=None, **kwargs):
         self.version = version
         self.title = title or 'API'
         self.description = description
@@ -123,6 +129,8 @@ class Api(object):
         self.security = security
         self.default_id = default_id
         self.ordered = ordered
+        self.offload_threshold = offload_threshold
+        self.executor = executor
         self._validate = validate
         self._doc = doc
         self._doc_view = None
@@ -453,9 +461,40 @@ class Api(object):
                 # Can't unpack an awaitable.
                 raise RuntimeError("RestPlus output handler received a non-awaited coroutine or Task.")
             data, code, headers = unpack(resp)
+            if self.should_offload(data):
+                loop = asyncio.get_event_loop()
+                if not isinstance(self.executor, ProcessPoolExecutor):
+                    return await loop.run_in_executor(
+                        self.executor, partial(self.make_response, request, data, code, headers=headers))
+                if self.encodes_json(request):
+                    # Requests can't be sent to another process, only the data is encoded there
+                    settings = request.app.config.get('RESTPLUS_JSON', {})
+                    data = RawJSON(await loop.run_in_executor(self.executor, partial(dumps_bytes, data, **settings)))
             return self.make_response(request, data, code, headers=headers)
         return wrapper
 
+    def encodes_json(self, request):
+        '''
+        Wether or not the response to ``request`` is encoded by the compact JSON representation
+
+        :param request: the current request
+        '''
+        mediatype = best_match_accept_mimetype(request, self.representations, default=self.default_mediatype)
+        return self.representations.get(mediatype) is output_json_fast and not request.app.debug
+
+    def should_offload(self, data):
+        '''
+        Wether or not ``data`` is big enough to be marshalled and encoded out of the event loop
+
+        Already encoded data (ie. marshalled with ``as_bytes`` in an executor) is never offloaded again.
+
+        :param data: the data returned by a resource
+        '''
+        threshold = self.offload_threshold
+        if threshold is None or isinstance(data, RawJSON):
+            return False
+        return isinstance(data, (list, tuple)) and len(data) >= threshold
+
     def make_response(self, request, data, *args, **kwargs):
         """
         Looks up the representation transformer for the requested media
@@ -473,8 +512,11 @@ class Api(object):
         )
         if mediatype is None:
             raise exceptions.SanicException("Not Acceptable", 406)
-        if mediatype in self.representations:
-            resp = self.representations[mediatype](request, data, *args, **kwargs)
+        representation = self.representations.get(mediatype)
+        if isinstance(data, RawJSON) and representation not in (output_json_fast, output_json_pretty):
+            data = data.loads()
+        if representation is not None:
+            resp = representation(request, data, *args, **kwargs)
             resp.headers['Content-Type'] = mediatype
             return resp
         elif mediatype == 'text/plain':
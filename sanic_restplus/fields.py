@@ -3,25 +3,34 @@
 import re
 import fnmatch
 import inspect
+import threading
 
 from calendar import timegm
 from datetime import date, datetime
 from decimal import Decimal, ROUND_HALF_EVEN
 from email.utils import formatdate
-from functools import lru_cache
+from functools import lru_cache, partial
+from string import Formatter
 
 from urllib.parse import urlparse, urlunparse
 
 
 from .inputs import date_from_iso8601, datetime_from_iso8601, datetime_from_rfc822, boolean
 from .errors import RestError
-from .marshalling import marshal
+from .marshalling import marshal, compile_marshaller, compile_encoder, projection, memoized, defer, defer_load
+from .representations import encode_json, encodes_numpy, dumps_bytes
+from .sources import slot_names, source_adapter
 from .utils import camel_to_dash, not_none
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 
 __all__ = ('Raw', 'String', 'FormattedString', 'Url', 'DateTime', 'Date',
            'Boolean', 'Integer', 'Float', 'Arbitrary', 'Fixed',
-           'Nested', 'List', 'ClassName', 'Polymorph', 'Wildcard',
+           'Nested', 'List', 'Array', 'ClassName', 'Polymorph', 'Wildcard', 'WildcardContext', 'Async', 'Batched',
            'StringMixin', 'MinMaxMixin', 'NumberMixin', 'MarshallingError')
 
 
@@ -66,10 +75,111 @@ def _get_value_for_key(key, obj, default):
     return getattr(obj, key, default)
 
 
+def column_values(values):
+    '''Get the values of a column (a sequence, a NumPy array or a pandas series) as Python objects'''
+    if numpy is not None and isinstance(values, numpy.ndarray) and values.dtype.kind == 'M':
+        # Nanoseconds datetimes are converted to integers, missing ones (NaT) to None
+        values = values.astype('datetime64[us]')
+    return values.tolist() if hasattr(values, 'tolist') else values
+
+
+def _column_array(values):
+    '''Get a column as a NumPy array if it is array backed (NumPy array, pandas series...), else ``None``'''
+    if numpy is None or not hasattr(values, 'dtype'):
+        return None
+    return numpy.asarray(values)
+
+
+def make_accessor(key, source=None):
+    '''
+    Build a ``callable(obj)`` equivalent to ``get_value(key, obj)``.
+
+    The key is inspected and dotted paths are split once, ahead of time,
+    so the returned accessor only has to walk the object.
+    Keys are extracted by the getters the :mod:`~sanic_restplus.sources` adapters
+    generate for each marshalled type (ie. an index for named tuples).
+
+    :param key: the key, attribute name, index, dotted path or callable to extract
+    :param type source: an optional hint on the type of the objects the (first) key
+        is extracted from, allowing to skip the per type dispatch.
+        It must match the marshalled objects type.
+    '''
+    if isinstance(key, int):
+        return _make_key_accessor(key, source)
+    elif callable(key):
+        return key
+    keys = key.split('.')
+    if len(keys) == 1:
+        return _make_key_accessor(key, source)
+    getters = tuple([_make_key_accessor(keys[0], source)] + [_make_key_accessor(k) for k in keys[1:]])
+
+    def get_path(obj):
+        for getter in getters:
+            obj = getter(obj)
+        return obj
+    return get_path
+
+
+#: The maximum number of types an accessor keeps a specialized getter for
+SOURCE_ACCESSORS_SIZE = 32
+
+
+@lru_cache(maxsize=1024)
+def _make_key_accessor(key, source=None):
+    adapter = source_adapter(source) if source is not None and isinstance(key, str) else None
+    if adapter is not None:
+        return adapter.accessor(key)
+    elif source is None:
+        # Getters specialized by the source adapters, per marshalled type
+        getters = {}
+
+        def get(obj):
+            if type(obj) is dict:
+                try:
+                    return obj[key]
+                except KeyError:
+                    return getattr(obj, key, None)
+            getter = getters.get(type(obj))
+            if getter is None:
+                getter = _make_type_getter(key, type(obj))
+                if len(getters) < SOURCE_ACCESSORS_SIZE:
+                    getters[type(obj)] = getter
+            return getter(obj)
+    elif hasattr(source, '__iter__') and not hasattr(source, 'strip'):
+        def get(obj):
+            try:
+                return obj[key]
+            except (IndexError, TypeError, KeyError):
+                return getattr(obj, key, None)
+    else:
+        def get(obj):
+            return getattr(obj, key, None)
+    return get
+
+
+def _make_type_getter(key, cls):
+    adapter = source_adapter(cls) if isinstance(key, str) else None
+    if adapter is not None:
+        return adapter.accessor(key)
+
+    def get(obj):
+        return _get_value_for_key(key, obj, None)
+    return get
+
+
+@lru_cache(maxsize=256)
+def glob_matcher(pattern):
+    '''Compile a glob pattern into a case insensitive ``match`` function, cached per pattern'''
+    return re.compile(fnmatch.translate(pattern), re.IGNORECASE).match
+
+
 def to_marshallable_type(obj):
     '''
     Helper for converting an object to a dictionary only if it is not
-    dictionary already or an indexable object nor a simple type
+    dictionary already or an indexable object nor a simple type.
+
+    Objects handled by a source adapter (see :mod:`~sanic_restplus.sources`)
+    are converted by their adapter.
     '''
     if obj is None:
         return None  # make it idempotent for None
@@ -77,6 +187,13 @@ def to_marshallable_type(obj):
     if hasattr(obj, '__marshallable__'):
         return obj.__marshallable__()
 
+    if type(obj) is dict:
+        return obj
+
+    adapter = source_adapter(type(obj))
+    if adapter is not None:
+        return adapter.to_dict(obj)
+
     if hasattr(obj, '__getitem__'):
         return obj  # it is indexable it is ok
 
@@ -101,7 +218,17 @@ class Raw(object):
     :param bool readonly: Is the field read only ? (for documentation purpose)
     :param example: An optional data example (for documentation purpose)
     :param callable mask: An optional mask function to be applied to output
+    :param bool skip_if_none: Whether or not to skip this field when its value is ``None`` (or empty),
+        overriding the marshalling ``skip_none`` flag. Follow the flag if ``None`` (default).
+    :param bool lazy: If ``True``, when a mask is applied, this field is only output (and its value computed)
+        if the mask explicitly names it: neither ``*`` nor a kept parent includes it.
+
+    Builtin fields use ``__slots__`` to keep big models lightweight:
+    subclasses not declaring their own ``__slots__`` get a regular ``__dict__``.
     '''
+    __slots__ = ('attribute', 'default', 'title', 'description', 'required', 'readonly',
+                 'example', 'mask', 'skip_if_none', 'lazy', '__apidoc__', '__weakref__')
+
     #: The JSON/Swagger schema type
     __schema_type__ = 'object'
     #: The JSON/Swagger schema format
@@ -110,7 +237,7 @@ class Raw(object):
     __schema_example__ = None
 
     def __init__(self, default=None, attribute=None, title=None, description=None,
-                 required=None, readonly=None, example=None, mask=None, **kwargs):
+                 required=None, readonly=None, example=None, mask=None, skip_if_none=None, lazy=False, **kwargs):
         self.attribute = attribute
         self.default = default
         self.title = title
@@ -119,6 +246,8 @@ class Raw(object):
         self.readonly = readonly
         self.example = example or self.__schema_example__
         self.mask = mask
+        self.skip_if_none = skip_if_none
+        self.lazy = lazy
 
     def format(self, value):
         '''
@@ -161,6 +290,165 @@ class Raw(object):
             raise MarshallingError(msg)
         return self.mask.apply(data) if self.mask else data
 
+    def compile(self, key, ordered=False, source=None):
+        '''
+        Build a specialized ``callable(obj)`` returning the output of this field for ``key``.
+
+        This is used by :func:`~sanic_restplus.marshalling.compile_marshaller`
+        to bind the value accessor and the formatter once per model.
+        Field classes overriding :meth:`output` are called through it unchanged.
+
+        :param type source: an optional hint on the marshalled objects type (see :func:`make_accessor`)
+        '''
+        if type(self).output is not Raw.output:
+            return self._compile_output(key, ordered)
+
+        getter = self.accessor(key, source)
+        fmt = self.format
+        mask = self.mask
+        default_value = partial(self._v, 'default')
+
+        def output(obj):
+            value = getter(obj)
+            if value is None:
+                default = default_value()
+                return fmt(default) if default else default
+            try:
+                data = fmt(value)
+            except MarshallingError as e:
+                msg = 'Unable to marshal field "{0}" value "{1}": {2}'.format(key, value, str(e))
+                raise MarshallingError(msg)
+            return mask.apply(data) if mask else data
+        return output
+
+    def compile_json(self, key, source=None):
+        '''
+        Build a ``callable(obj)`` returning the output of this field for ``key`` encoded as JSON bytes.
+
+        This is used by :func:`~sanic_restplus.marshalling.compile_encoder`.
+        Field classes overriding :meth:`output` or :meth:`compile` have their output encoded.
+        '''
+        if type(self).output is not Raw.output or type(self).compile is not Raw.compile:
+            output = self.compile(key, source=source)
+
+            def encode(obj):
+                return encode_json(output(obj))
+            return encode
+
+        getter = self.accessor(key, source)
+        fmt = self.format
+        mask = self.mask
+        default_value = partial(self._v, 'default')
+
+        def encode(obj):
+            value = getter(obj)
+            if value is None:
+                default = default_value()
+                return encode_json(fmt(default) if default else default)
+            try:
+                data = fmt(value)
+            except MarshallingError as e:
+                msg = 'Unable to marshal field "{0}" value "{1}": {2}'.format(key, value, str(e))
+                raise MarshallingError(msg)
+            return encode_json(mask.apply(data) if mask else data)
+        return encode
+
+    def compile_column(self, key):
+        '''
+        Build a ``callable(columns)`` returning the outputs of this field for ``key``
+        for every row of some :class:`~sanic_restplus.marshalling.Columns`.
+
+        Fields reading a column format it at once with :meth:`format_column`.
+        Field classes overriding :meth:`output` or :meth:`compile`, callable attributes
+        and missing columns are output row by row.
+        '''
+        attribute = key if self.attribute is None else self.attribute
+        # The rows built from columns are dictionaries
+        output = self.compile(key, source=dict)
+        format_column = self.format_column
+        by_column = type(self).output is Raw.output and type(self).compile is Raw.compile \
+            and not callable(attribute)
+
+        def output_column(columns):
+            if not by_column or attribute not in columns:
+                return [output(row) for row in columns.rows]
+            try:
+                return format_column(columns.column(attribute))
+            except MarshallingError as e:
+                raise MarshallingError('Unable to marshal field "{0}" {1}'.format(key, str(e)))
+        return output_column
+
+    def format_column(self, values):
+        '''
+        Format a whole column of values at once (see :class:`~sanic_restplus.marshalling.Columns`),
+        missing (``None``) values getting the default one.
+
+        This implementation formats the values one by one,
+        field classes can override it with a vectorized one.
+
+        :param values: a sequence, a NumPy array or a pandas series
+        :rtype: list
+        :raises MarshallingError: In case of formatting problem
+        '''
+        fmt = self.format
+        mask = self.mask
+        out = []
+        for value in column_values(values):
+            if value is None:
+                default = self._v('default')
+                out.append(fmt(default) if default else default)
+                continue
+            try:
+                data = fmt(value)
+            except MarshallingError as e:
+                raise MarshallingError('value "{0}": {1}'.format(value, str(e)))
+            out.append(mask.apply(data) if mask else data)
+        return out
+
+    def accessor(self, key, source=None):
+        '''Build the ``callable(obj)`` extracting the raw value of this field for ``key``'''
+        return make_accessor(key if self.attribute is None else self.attribute, source)
+
+    def projection(self, key):
+        '''
+        List the dotted attribute paths this field reads from the marshalled objects for ``key``
+        (see :func:`~sanic_restplus.marshalling.projection`).
+
+        Custom fields overriding :meth:`output` are assumed to read the whole object (``'*'``)
+        unless they override this method too.
+        '''
+        attribute = key if self.attribute is None else self.attribute
+        if callable(attribute) or type(self).output is not Raw.output:
+            return ('*',)
+        return (str(attribute),)
+
+    def _join_projection(self, key, paths):
+        '''Prefix the ``paths`` read from this field value with its attribute'''
+        attribute = key if self.attribute is None else self.attribute
+        if callable(attribute):
+            return ('*',)
+        prefix = str(attribute)
+        return tuple(prefix if path == '*' else prefix + '.' + path for path in paths)
+
+    def _compile_output(self, key, ordered=False):
+        '''Fallback compilation delegating to :meth:`output`'''
+        field_output = self.output
+
+        def output(obj):
+            return field_output(key, obj, ordered=ordered)
+        return output
+
+    def _attrs(self):
+        '''The public attributes of this field, from its slots and its ``__dict__``'''
+        attrs = {}
+        for name in slot_names(self.__class__):
+            try:
+                attrs[name] = getattr(self, name)
+            except AttributeError:
+                continue
+        attrs.update(getattr(self, '__dict__', ()))
+        return attrs
+
     def _v(self, key):
         '''Helper for getting a value from attribute allowing callable'''
         value = getattr(self, key)
@@ -199,6 +487,7 @@ class Nested(Raw):
         all-null keys (e.g. lets you return an empty JSON object instead of
         null)
     '''
+    __slots__ = ('model', 'as_list', 'allow_null', 'skip_none')
     __schema_type__ = None
 
     def __init__(self, model, allow_null=False, skip_none=False, as_list=False, **kwargs):
@@ -212,6 +501,15 @@ class Nested(Raw):
     def nested(self):
         return getattr(self.model, 'resolved', self.model)
 
+    def projection(self, key):
+        return self._join_projection(key, self._projection_value())
+
+    def _projection_value(self):
+        '''List the dotted paths read from the nested values'''
+        if type(self).output is not Nested.output:
+            return ('*',)
+        return projection(self.nested, self.mask)
+
     def output(self, key, obj, ordered=False, **kwargs):
         value = get_value(key if self.attribute is None else self.attribute, obj)
         if value is None:
@@ -220,7 +518,69 @@ class Nested(Raw):
             elif self.default is not None:
                 return self.default
 
-        return marshal(value, self.nested, skip_none=self.skip_none, ordered=ordered)
+        return marshal(value, self.nested, skip_none=self.skip_none, mask=self.mask, ordered=ordered)
+
+    def compile(self, key, ordered=False, source=None):
+        if type(self).output is not Nested.output:
+            return self._compile_output(key, ordered)
+        getter = self.accessor(key, source)
+        marshal_value = self._compile_value(ordered)
+
+        def output(obj):
+            return marshal_value(getter(obj))
+        return output
+
+    def _compile_value(self, ordered=False):
+        '''
+        Build a ``callable(value)`` marshalling an already extracted value.
+
+        The nested marshaller is compiled on first use to support self-referencing models.
+        '''
+        allow_null = self.allow_null
+        default = self.default
+        mask = self.mask
+        marshaller = None
+
+        def marshal_value(value):
+            nonlocal marshaller
+            if value is None:
+                if allow_null:
+                    return None
+                elif default is not None:
+                    return default
+            if marshaller is None:
+                marshaller = compile_marshaller(self.nested, skip_none=self.skip_none, ordered=ordered, mask=mask)
+            return memoized(marshaller, value)
+        return marshal_value
+
+    def compile_json(self, key, source=None):
+        if type(self).output is not Nested.output:
+            return super(Nested, self).compile_json(key, source)
+        getter = self.accessor(key, source)
+        encode_value = self._compile_json_value()
+
+        def encode(obj):
+            return encode_value(getter(obj))
+        return encode
+
+    def _compile_json_value(self):
+        '''Build a ``callable(value)`` encoding an already extracted value as JSON bytes'''
+        allow_null = self.allow_null
+        default = self.default
+        mask = self.mask
+        encoder = None
+
+        def encode_value(value):
+            nonlocal encoder
+            if value is None:
+                if allow_null:
+                    return b'null'
+                elif default is not None:
+                    return encode_json(default)
+            if encoder is None:
+                encoder = compile_encoder(self.nested, skip_none=self.skip_none, mask=mask)
+            return memoized(encoder, value)
+        return encode_value
 
     def schema(self):
         schema = super(Nested, self).schema()
@@ -239,7 +599,7 @@ class Nested(Raw):
         return schema
 
     def clone(self, mask=None):
-        kwargs = self.__dict__.copy()
+        kwargs = self._attrs()
         model = kwargs.pop('model')
         if mask:
             model = mask.apply(model.resolved if hasattr(model, 'resolved') else model)
@@ -254,6 +614,8 @@ class List(Raw):
 
     :param cls_or_instance: The field type the list will contain.
     '''
+    __slots__ = ('min_items', 'max_items', 'unique', 'container')
+
     def __init__(self, cls_or_instance, **kwargs):
         self.min_items = kwargs.pop('min_items', None)
         self.max_items = kwargs.pop('max_items', None)
@@ -274,6 +636,11 @@ class List(Raw):
         if isinstance(value, set):
             value = list(value)
 
+        if isinstance(value, (list, tuple)):
+            items = self._format_items(value)
+            if items is not None:
+                return items
+
         is_nested = isinstance(self.container, Nested) or type(self.container) is Raw
 
         def is_attr(val):
@@ -285,6 +652,36 @@ class List(Raw):
             for idx, val in enumerate(value)
         ]
 
+    def _items_type(self):
+        '''The type the items are converted to if the container is a plain primitive field, else ``None``'''
+        container = self.container
+        if type(container).output is not Raw.output or container.attribute is not None or container.mask:
+            return None
+        return _ITEMS_TYPES.get(type(container).format)
+
+    def _format_items(self, values):
+        '''
+        Format a list of primitive values at once, without going through the container :meth:`~Raw.output`.
+
+        Return ``None`` when the values have to be formatted one by one:
+        missing values, dictionaries or conversion errors (to get the container error message).
+        '''
+        kind = self._items_type()
+        if kind is None:
+            return None
+        elif kind is object:
+            # Raw items are output unchanged
+            return None if None in values else list(values)
+        types = set(map(type, values))
+        if types <= {kind}:
+            return list(values)
+        elif type(None) in types or any(issubclass(t, dict) for t in types):
+            return None
+        try:
+            return list(map(kind, values))
+        except (TypeError, ValueError):
+            return None
+
     def output(self, key, data, ordered=False, **kwargs):
         value = get_value(key if self.attribute is None else self.attribute, data)
         # we cannot really test for external dict behavior
@@ -294,7 +691,69 @@ class List(Raw):
         if value is None:
             return self._v('default')
 
-        return [marshal(value, self.container.nested)]
+        return [marshal(value, self.container.nested, mask=self.container.mask)]
+
+    def compile(self, key, ordered=False, source=None):
+        container = self.container
+        if type(self).output is List.output and self._items_type() is not None:
+            return self._compile_primitives(key, ordered, source)
+        if type(self).output is not List.output or type(self).format is not List.format \
+                or not isinstance(container, Nested) or type(container).output is not Nested.output:
+            return self._compile_output(key, ordered)
+        getter = self.accessor(key, source)
+        # Items are marshalled unordered, as in :meth:`format`
+        marshal_item = container._compile_value()
+        nested = container.nested
+        mask = container.mask
+        default_value = partial(self._v, 'default')
+
+        def output(obj):
+            value = getter(obj)
+            if isinstance(value, (list, tuple, set)):
+                return [marshal_item(item) for item in value]
+            elif is_indexable_but_not_string(value) and not isinstance(value, dict):
+                return self.format(value)
+            elif value is None:
+                return default_value()
+            return [marshal(value, nested, mask=mask)]
+        return output
+
+    def _compile_primitives(self, key, ordered=False, source=None):
+        getter = self.accessor(key, source)
+        fmt = self.format
+        fallback = self._compile_output(key, ordered)
+
+        def output(obj):
+            value = getter(obj)
+            if isinstance(value, (list, tuple, set)):
+                return fmt(value)
+            return fallback(obj)
+        return output
+
+    def projection(self, key):
+        container = self.container
+        if type(self).output is not List.output or type(self).format is not List.format:
+            return ('*',)
+        elif isinstance(container, Nested) and container.attribute is None:
+            return self._join_projection(key, container._projection_value())
+        return self._join_projection(key, ('*',))
+
+    def compile_json(self, key, source=None):
+        container = self.container
+        if type(self).output is not List.output or type(self).format is not List.format \
+                or not isinstance(container, Nested) or type(container).output is not Nested.output:
+            return super(List, self).compile_json(key, source)
+        getter = self.accessor(key, source)
+        # Only lists of nested objects are encoded directly
+        output = self.compile(key, source=source)
+        encode_item = container._compile_json_value()
+
+        def encode(obj):
+            value = getter(obj)
+            if isinstance(value, (list, tuple, set)):
+                return b'[' + b','.join([encode_item(item) for item in value]) + b']'
+            return encode_json(output(obj))
+        return encode
 
     def schema(self):
         schema = super(List, self).schema()
@@ -306,14 +765,115 @@ class List(Raw):
         return schema
 
     def clone(self, mask=None):
-        kwargs = self.__dict__.copy()
+        kwargs = self._attrs()
         model = kwargs.pop('container')
         if mask:
             model = mask.apply(model)
         return self.__class__(model, **kwargs)
 
 
+RE_DTYPE = re.compile(r'^(?P<kind>u?int|float|bool)(?P<bits>\d*)_?$')
+
+# The Python types of the dtypes kinds
+_DTYPE_TYPES = {'i': int, 'u': int, 'f': float, 'b': bool}
+
+
+def dtype_kind(dtype):
+    '''
+    Get the ``(kind, bits)`` of a NumPy like dtype, ie. ``('f', 32)`` for ``'float32'``.
+
+    Without NumPy, only the ``int``, ``float`` and ``bool`` types and the ``int32`` like names are supported.
+
+    :raises MarshallingError: if the dtype is not an integer, float or boolean one
+    '''
+    if numpy is not None:
+        try:
+            dtype = numpy.dtype(dtype)
+        except TypeError as e:
+            raise MarshallingError(e)
+        kind, bits = dtype.kind, dtype.itemsize * 8
+    else:
+        match = RE_DTYPE.match(getattr(dtype, '__name__', str(dtype)))
+        if not match:
+            raise MarshallingError('Unsupported dtype {0!r}'.format(dtype))
+        kind = 'u' if match.group('kind') == 'uint' else match.group('kind')[0]
+        bits = int(match.group('bits') or (8 if kind == 'b' else 64))
+    if kind not in _DTYPE_TYPES:
+        raise MarshallingError('Unsupported dtype {0!r}'.format(dtype))
+    return kind, bits
+
+
+class Array(Raw):
+    '''
+    Marshal a one-dimensional numeric series: a NumPy array, a buffer backed sequence
+    (``array.array``, ``memoryview``) or any iterable.
+
+    Arrays and buffers are converted to a list in a single pass (``tolist()``) instead of item by item.
+    When marshalling straight to JSON (see :func:`~sanic_restplus.marshalling.marshal_json`)
+    and orjson is installed, NumPy arrays are not even converted: orjson encodes them natively.
+
+    :param dtype: the optional items type, as a NumPy dtype or a type (``int``, ``float``, ``bool``).
+        Arrays are cast to it and the other values converted, it also sets the items schema.
+    '''
+    __slots__ = ('dtype', '_kind')
+    __schema_type__ = 'array'
+
+    def __init__(self, dtype=None, **kwargs):
+        self.dtype = dtype
+        self._kind = None if dtype is None else dtype_kind(dtype)
+        super(Array, self).__init__(**kwargs)
+
+    def format(self, value):
+        dtype = self.dtype
+        try:
+            if numpy is not None and isinstance(value, numpy.ndarray):
+                return (value if dtype is None else value.astype(dtype, copy=False)).tolist()
+            values = value.tolist() if hasattr(value, 'tolist') else list(value)
+            if dtype is None:
+                return values
+            return list(map(_DTYPE_TYPES[self._kind[0]], values))
+        except (TypeError, ValueError) as e:
+            raise MarshallingError(e)
+
+    def compile_json(self, key, source=None):
+        if not encodes_numpy or numpy is None \
+                or type(self).output is not Raw.output or type(self).format is not Array.format:
+            return super(Array, self).compile_json(key, source)
+        getter = self.accessor(key, source)
+        output = self.compile(key, source=source)
+        dtype = self.dtype
+
+        def encode(obj):
+            value = getter(obj)
+            if isinstance(value, numpy.ndarray):
+                return dumps_bytes(value if dtype is None else value.astype(dtype, copy=False))
+            return encode_json(output(obj))
+        return encode
+
+    def schema(self):
+        schema = super(Array, self).schema()
+        if self._kind is None:
+            schema['items'] = {'type': 'number'}
+            return schema
+        kind, bits = self._kind
+        if kind == 'b':
+            schema['items'] = {'type': 'boolean'}
+        elif kind == 'f':
+            schema['items'] = {'type': 'number', 'format': 'float' if bits <= 32 else 'double'}
+        else:
+            schema['items'] = {'type': 'integer', 'format': 'int32' if bits <= 32 else 'int64'}
+        return schema
+
+
+# Mixins can't declare non-empty slots along with Raw (layout conflict):
+# concrete fields declare the mixins attributes slots themselves.
+_STRING_SLOTS = ('min_length', 'max_length', 'pattern')
+_MINMAX_SLOTS = ('minimum', 'exclusiveMinimum', 'maximum', 'exclusiveMaximum')
+_NUMBER_SLOTS = _MINMAX_SLOTS + ('multiple',)
+
+
 class StringMixin(object):
+    __slots__ = ()
     __schema_type__ = 'string'
 
     def __init__(self, *args, **kwargs):
@@ -331,6 +891,8 @@ class StringMixin(object):
 
 
 class MinMaxMixin(object):
+    __slots__ = ()
+
     def __init__(self, *args, **kwargs):
         self.minimum = kwargs.pop('min', None)
         self.exclusiveMinimum = kwargs.pop('exclusiveMin', None)
@@ -348,6 +910,7 @@ class MinMaxMixin(object):
 
 
 class NumberMixin(MinMaxMixin):
+    __slots__ = ()
     __schema_type__ = 'number'
 
     def __init__(self, *args, **kwargs):
@@ -364,6 +927,8 @@ class String(StringMixin, Raw):
     '''
     Marshal a value as a string.
     '''
+    __slots__ = _STRING_SLOTS + ('enum', 'discriminator')
+
     def __init__(self, *args, **kwargs):
         self.enum = kwargs.pop('enum', None)
         self.discriminator = kwargs.pop('discriminator', None)
@@ -376,6 +941,12 @@ class String(StringMixin, Raw):
         except ValueError as ve:
             raise MarshallingError(ve)
 
+    def format_column(self, values):
+        array = _column_array(values)
+        if array is not None and array.dtype.kind == 'U' and not self.mask:
+            return array.tolist()
+        return super(String, self).format_column(values)
+
     def schema(self):
         enum = self._v('enum')
         schema = super(String, self).schema()
@@ -392,6 +963,7 @@ class Integer(NumberMixin, Raw):
 
     :param int default: The default value for the field, if no value is specified.
     '''
+    __slots__ = _NUMBER_SLOTS
     __schema_type__ = 'integer'
 
     def format(self, value):
@@ -402,6 +974,12 @@ class Integer(NumberMixin, Raw):
         except ValueError as ve:
             raise MarshallingError(ve)
 
+    def format_column(self, values):
+        array = _column_array(values)
+        if array is not None and array.dtype.kind in 'iub' and not self.mask:
+            return (array.astype(int) if array.dtype.kind == 'b' else array).tolist()
+        return super(Integer, self).format_column(values)
+
 
 class Float(NumberMixin, Raw):
     '''
@@ -409,6 +987,7 @@ class Float(NumberMixin, Raw):
 
     ex : 3.141592653589793 3.1415926535897933e-06 3.141592653589793e+24 nan inf -inf
     '''
+    __slots__ = _NUMBER_SLOTS
 
     def format(self, value):
         try:
@@ -416,6 +995,21 @@ class Float(NumberMixin, Raw):
         except ValueError as ve:
             raise MarshallingError(ve)
 
+    def format_column(self, values):
+        array = _column_array(values)
+        if array is not None and array.dtype.kind in 'iufb' and not self.mask:
+            return array.astype(float).tolist()
+        return super(Float, self).format_column(values)
+
+
+# The primitive fields formats equivalent to a plain type conversion, see :meth:`List._format_items`
+_ITEMS_TYPES = {
+    Raw.format: object,
+    String.format: str,
+    Integer.format: int,
+    Float.format: float,
+}
+
 
 class Arbitrary(NumberMixin, Raw):
     '''
@@ -423,6 +1017,7 @@ class Arbitrary(NumberMixin, Raw):
 
     ex: 634271127864378216478362784632784678324.23432
     '''
+    __slots__ = _NUMBER_SLOTS
 
     def format(self, value):
         return str(Decimal(value))
@@ -435,6 +1030,8 @@ class Fixed(NumberMixin, Raw):
     '''
     A decimal number with a fixed precision.
     '''
+    __slots__ = _NUMBER_SLOTS + ('precision',)
+
     def __init__(self, decimals=5, **kwargs):
         super(Fixed, self).__init__(**kwargs)
         self.precision = Decimal('0.' + '0' * (decimals - 1) + '1')
@@ -452,6 +1049,7 @@ class Boolean(Raw):
 
     Empty collections such as ``""``, ``{}``, ``[]``, etc. will be converted to ``False``.
     '''
+    __slots__ = ()
     __schema_type__ = 'boolean'
 
     def format(self, value):
@@ -468,6 +1066,7 @@ class DateTime(MinMaxMixin, Raw):
 
     :param str dt_format: ``rfc822`` or ``iso8601``
     '''
+    __slots__ = _MINMAX_SLOTS + ('dt_format',)
     __schema_type__ = 'string'
     __schema_format__ = 'date-time'
 
@@ -502,6 +1101,28 @@ class DateTime(MinMaxMixin, Raw):
         except (AttributeError, ValueError) as e:
             raise MarshallingError(e)
 
+    def format_column(self, values):
+        array = _column_array(values)
+        if array is None or array.dtype.kind != 'M' or self.dt_format != 'iso8601' or self.mask \
+                or type(self).format_iso8601 is not DateTime.format_iso8601:
+            return super(DateTime, self).format_column(values)
+        # Naive datetimes as :meth:`datetime.isoformat`: microseconds are only output when not null
+        array = array.astype('datetime64[us]')
+        out = numpy.datetime_as_string(array, unit='us')
+        whole = array.astype('datetime64[s]') == array
+        if whole.all():
+            out = numpy.datetime_as_string(array, unit='s')
+        elif whole.any():
+            out = numpy.where(whole, numpy.datetime_as_string(array, unit='s'), out)
+        out = out.tolist()
+        missing = numpy.isnat(array)
+        if missing.any():
+            default = self._v('default')
+            default = self.format(default) if default else default
+            for index in numpy.flatnonzero(missing).tolist():
+                out[index] = default
+        return out
+
     def format_rfc822(self, dt):
         '''
         Turn a datetime object into a formatted date.
@@ -538,6 +1159,7 @@ class Date(DateTime):
 
     See :meth:`datetime.date.isoformat` for more info on the ISO 8601 format.
     '''
+    __slots__ = ()
     __schema_format__ = 'date'
 
     def __init__(self, **kwargs):
@@ -565,6 +1187,8 @@ class Url(StringMixin, Raw):
     :param bool absolute: If ``True``, ensures that the generated urls will have the hostname included
     :param str scheme: URL scheme specifier (e.g. ``http``, ``https``)
     '''
+    __slots__ = _STRING_SLOTS + ('endpoint', 'absolute', 'scheme')
+
     def __init__(self, endpoint=None, absolute=False, scheme=None, **kwargs):
         super(Url, self).__init__(**kwargs)
         self.endpoint = endpoint
@@ -584,6 +1208,9 @@ class Url(StringMixin, Raw):
         except TypeError as te:
             raise MarshallingError(te)
 
+    def projection(self, key):
+        return ('*',)
+
 
 class FormattedString(StringMixin, Raw):
     '''
@@ -605,6 +1232,8 @@ class FormattedString(StringMixin, Raw):
 
     :param str src_str: the string to format with the other values from the response.
     '''
+    __slots__ = _STRING_SLOTS + ('src_str',)
+
     def __init__(self, src_str, **kwargs):
         super(FormattedString, self).__init__(**kwargs)
         self.src_str = str(src_str)
@@ -616,6 +1245,13 @@ class FormattedString(StringMixin, Raw):
         except (TypeError, IndexError) as error:
             raise MarshallingError(error)
 
+    def projection(self, key):
+        if type(self).output is not FormattedString.output:
+            return ('*',)
+        # Only the root of ``{address.city}`` or ``{tags[0]}`` replacement fields is known to be a key
+        names = (name for _, name, _, _ in Formatter().parse(self.src_str) if name)
+        return tuple(re.split(r'[.\[]', name, 1)[0] for name in names)
+
 
 class ClassName(String):
     '''
@@ -623,6 +1259,8 @@ class ClassName(String):
 
     :param bool dash: If `True`, transform CamelCase to kebab_case.
     '''
+    __slots__ = ('dash',)
+
     def __init__(self, dash=False, **kwargs):
         super(ClassName, self).__init__(**kwargs)
         self.dash = dash
@@ -633,6 +1271,11 @@ class ClassName(String):
             return 'object'
         return camel_to_dash(classname) if self.dash else classname
 
+    def projection(self, key):
+        if type(self).output is not ClassName.output:
+            return ('*',)
+        return ()
+
 
 class Polymorph(Nested):
     '''
@@ -651,10 +1294,18 @@ class Polymorph(Nested):
             owner: fields.Polymorph(mapping)
         })
 
+    The model of a class is looked up in the mapping the first time an instance is marshalled
+    and kept in a per field dispatch table, so the mapping should not be mutated afterward
+    (the models themselves can still change).
+
     :param dict mapping: Maps classes to their model/fields representation
     '''
+    __slots__ = ('mapping', '_dispatch')
+
     def __init__(self, mapping, required=False, **kwargs):
         self.mapping = mapping
+        # The model of each class already marshalled, see :meth:`resolve`
+        self._dispatch = {}
         parent = self.resolve_ancestor(list(mapping.values()))
         super(Polymorph, self).__init__(parent, allow_null=not required, **kwargs)
 
@@ -671,14 +1322,66 @@ class Polymorph(Nested):
         if not hasattr(value, '__class__'):
             raise ValueError('Polymorph field only accept class instances')
 
-        candidates = [fields for cls, fields in self.mapping.items() if isinstance(value, cls)]
+        return marshal(value, self.resolve(value.__class__), mask=self.mask, ordered=ordered)
+
+    def resolve(self, cls):
+        '''
+        Get the resolved model of the instances of ``cls``.
+
+        The mapping is only scanned the first time a class is seen,
+        afterward its model is found with a single lookup in the dispatch table.
+
+        :raises ValueError: if none or several classes of the mapping match
+        '''
+        try:
+            return self._dispatch[cls].resolved
+        except KeyError:
+            pass
+        candidates = [fields for klass, fields in self.mapping.items() if issubclass(cls, klass)]
 
         if len(candidates) <= 0:
-            raise ValueError('Unknown class: ' + value.__class__.__name__)
+            raise ValueError('Unknown class: ' + cls.__name__)
         elif len(candidates) > 1:
-            raise ValueError('Unable to determine a candidate for: ' + value.__class__.__name__)
-        else:
-            return marshal(value, candidates[0].resolved, mask=self.mask, ordered=ordered)
+            raise ValueError('Unable to determine a candidate for: ' + cls.__name__)
+        model = self._dispatch[cls] = candidates[0]
+        return model.resolved
+
+    def compile(self, key, ordered=False, source=None):
+        if type(self).output is not Polymorph.output:
+            return self._compile_output(key, ordered)
+        getter = self.accessor(key, source)
+        allow_null = self.allow_null
+        default = self.default
+        mask = self.mask
+        resolve = self.resolve
+        # The resolved model and compiled marshaller of each class already marshalled
+        marshallers = {}
+
+        def output(obj):
+            value = getter(obj)
+            if value is None:
+                if allow_null:
+                    return None
+                elif default is not None:
+                    return default
+            cls = value.__class__
+            model = resolve(cls)
+            compiled = marshallers.get(cls)
+            if compiled is None or compiled[0] is not model:
+                # The model resolves to a new copy once changed
+                compiled = marshallers[cls] = (model, compile_marshaller(model, mask=mask, ordered=ordered))
+            return memoized(compiled[1], value)
+        return output
+
+    def _projection_value(self):
+        if type(self).output is not Polymorph.output:
+            return ('*',)
+        paths = []
+        for model in self.mapping.values():
+            for path in projection(model.resolved):
+                if path not in paths:
+                    paths.append(path)
+        return tuple(paths)
 
     def resolve_ancestor(self, models):
         '''
@@ -696,7 +1399,7 @@ class Polymorph(Nested):
         return models[0].get_parent(parent_name)
 
     def clone(self, mask=None):
-        data = self.__dict__.copy()
+        data = self._attrs()
         mapping = data.pop('mapping')
         for field in ('allow_null', 'model'):
             data.pop(field, None)
@@ -705,18 +1408,32 @@ class Polymorph(Nested):
         return Polymorph(mapping, **data)
 
 
+class WildcardContext(object):
+    '''
+    The iteration state of a :class:`Wildcard` over a single object.
+
+    Passing a fresh context to :meth:`Wildcard.output` for each marshalled object
+    keeps the field itself stateless, so it can be shared between concurrent calls.
+
+    :param exclude: the keys to exclude (already marshalled by other fields)
+    '''
+    __slots__ = ('obj', 'flat', 'cache', 'last', 'exclude')
+
+    def __init__(self, exclude=()):
+        self.obj = None
+        self.flat = None
+        self.cache = set()
+        self.last = None
+        self.exclude = set(exclude)
+
+
 class Wildcard(Raw):
     '''
     Field for marshalling list of "unkown" fields.
 
     :param cls_or_instance: The field type the list will contain.
     '''
-    exclude = set()
-    # cache the flat object
-    _flat = None
-    _obj = None
-    _cache = set()
-    _last = None
+    __slots__ = ('container', '_contexts')
 
     def __init__(self, cls_or_instance, **kwargs):
         super(Wildcard, self).__init__(**kwargs)
@@ -729,58 +1446,71 @@ class Wildcard(Raw):
             if not isinstance(cls_or_instance, Raw):
                 raise MarshallingError(error_msg)
             self.container = cls_or_instance
+        # Only used by callers of output() not providing their own context, one per thread
+        self._contexts = {}
 
-    def _flatten(self, obj):
+    @property
+    def _context(self):
+        thread = threading.get_ident()
+        context = self._contexts.get(thread)
+        if context is None:
+            context = self._contexts[thread] = WildcardContext()
+        return context
+
+    @staticmethod
+    def _flatten(obj, context):
         if obj is None:
             return None
-        if obj == self._obj and self._flat is not None:
-            return self._flat
-        if isinstance(obj, dict):
-            self._flat = [(k,v) for k,v in obj.items()]
-        else:
-
-            def __match_attributes(attribute):
-                attr_name, attr_obj = attribute
-                if inspect.isroutine(attr_obj) or \
-                        (attr_name.startswith('__') and attr_name.endswith('__')):
-                    return False
-                return True
-
-            attributes = inspect.getmembers(obj)
-            self._flat = [x for x in attributes if __match_attributes(x)]
-
-        self._cache = set()
-        self._obj = obj
-        return self._flat
+        if obj is context.obj and context.flat is not None:
+            return context.flat
+        # Excluded object attributes are never evaluated, as with expand()
+        exclude = context.exclude
+        context.flat = list(Wildcard._iter_members(obj, lambda name: name not in exclude))
+        context.cache = set()
+        context.obj = obj
+        return context.flat
 
     @property
     def key(self):
-        return self._last
+        return self._context.last
+
+    @property
+    def exclude(self):
+        return self._context.exclude
+
+    @exclude.setter
+    def exclude(self, value):
+        self._context.exclude = value
 
     def reset(self):
-        self.exclude = set()
-        self._flat = None
-        self._obj = None
-        self._cache = set()
-        self._last = None
+        self._contexts[threading.get_ident()] = WildcardContext()
 
-    def output(self, key, obj, ordered=False):
+    def output(self, key, obj, ordered=False, context=None):
+        '''
+        Marshal the next member of ``obj`` matching the ``key`` glob pattern.
+
+        :param WildcardContext context: the iteration state to use.
+            Defaults to a context held by the field for the current thread,
+            which needs a :meth:`reset` between objects.
+        '''
+        if context is None:
+            context = self._context
         value = None
-        reg = fnmatch.translate(key)
+        match = glob_matcher(key)
 
-        if self._flatten(obj):
+        if self._flatten(obj, context):
             while True:
                 try:
                     # we are using pop() so that we don't
                     # loop over the whole object every time dropping the
                     # complexity to O(n)
-                    (objkey, val) = self._flat.pop()
-                    if objkey not in self._cache and \
-                            objkey not in self.exclude and \
-                            re.match(reg, objkey, re.IGNORECASE):
+                    (objkey, val) = context.flat.pop()
+                    if objkey not in context.cache and \
+                            objkey not in context.exclude and \
+                            match(objkey):
                         value = val
-                        self._cache.add(objkey)
-                        self._last = objkey
+                        context.cache.add(objkey)
+                        context.last = objkey
                         break
                 except IndexError:
                     break
@@ -792,6 +1522,71 @@ class Wildcard(Raw):
 
         return self.container.format(value)
 
+    def compile(self, key, ordered=False, source=None):
+        if type(self).output is not Wildcard.output:
+            return partial(self._drain, key, ordered)
+        return partial(self.expand, key)
+
+    def _drain(self, key, ordered, obj, exclude=()):
+        '''Collect the ``(key, value)`` pairs of a subclass overriding :meth:`output` one call at a time'''
+        self.reset()
+        self.exclude |= set(exclude)
+        end = self.container.format(self.default)
+        value = self.output(key, obj, ordered=ordered)
+        pairs = [(self.key or key, value)]
+        while True:
+            value = self.output(key, obj, ordered=ordered)
+            if value is None or value == end:
+                return pairs
+            pairs.append((self.key, value))
+
+    def expand(self, key, obj, exclude=()):
+        '''
+        Marshal all the members of ``obj`` matching the ``key`` glob pattern in a single pass.
+
+        Unlike :meth:`output`, no state is kept on the field between calls.
+        Excluded or unmatched object attributes are never evaluated.
+
+        :param str key: the glob pattern to match
+        :param obj: the object (or dict) to marshal
+        :param exclude: the keys to exclude (already marshalled by other fields)
+        :return: a list of ``(key, value)`` tuples, or ``[(key, default)]`` if nothing matched
+        '''
+        match = glob_matcher(key)
+        fmt = self.container.format
+        default = None if self.default is None else fmt(self.default)
+
+        def accept(name):
+            return name not in exclude and match(name)
+
+        items = [
+            (name, default if value is None else fmt(value))
+            for name, value in self._iter_members(obj, accept)
+        ]
+        return items or [(key, default)]
+
+    @staticmethod
+    def _iter_members(obj, accept):
+        if obj is None:
+            return
+        if isinstance(obj, dict):
+            for name, value in obj.items():
+                if accept(name):
+                    yield name, value
+            return
+        for name in dir(obj):
+            if (name.startswith('__') and name.endswith('__')) or not accept(name):
+                continue
+            try:
+                value = getattr(obj, name)
+            except AttributeError:
+                continue
+            if not inspect.isroutine(value):
+                yield name, value
+
+    def projection(self, key):
+        return ('*',)
+
     def schema(self):
         schema = super(Wildcard, self).schema()
         schema['type'] = 'object'
@@ -799,6 +1594,168 @@ class Wildcard(Raw):
         return schema
 
     def clone(self):
-        kwargs = self.__dict__.copy()
+        kwargs = self._attrs()
         model = kwargs.pop('container')
         return self.__class__(model, **kwargs)
+
+
+class Async(Raw):
+    '''
+    Field for marshalling awaitable values (ie. coroutines fetching per item enrichments).
+
+    The awaitables are resolved concurrently by :func:`~sanic_restplus.marshalling.marshal_async`
+    and :func:`~sanic_restplus.marshalling.marshal_with`, then marshalled with the container field.
+    Non awaitable values are marshalled straight away.
+
+    .. code-block:: python
+
+        async def rating(item):
+            return await ratings_service.get(item.id)
+
+        model = api.model('Item', {
+            'name': fields.String,
+            'rating': fields.Async(fields.Float, attribute=rating),
+        })
+
+    :param cls_or_instance: The field type marshalling the awaited values.
+        Its ``attribute`` is not used: set it on the Async field.
+    '''
+    __slots__ = ('container',)
+
+    # The key the awaited values are marshalled from
+    _VALUE = 'value'
+
+    def __init__(self, cls_or_instance, **kwargs):
+        super(Async, self).__init__(**kwargs)
+        error_msg = 'The type of the awaited values must be a subclass of fields.Raw'
+        if isinstance(cls_or_instance, type):
+            if not issubclass(cls_or_instance, Raw):
+                raise MarshallingError(error_msg)
+            self.container = cls_or_instance()
+        else:
+            if not isinstance(cls_or_instance, Raw):
+                raise MarshallingError(error_msg)
+            self.container = cls_or_instance
+        if self.container.attribute is not None:
+            raise MarshallingError('The attribute of the awaited values must be set on the Async field')
+
+    def output(self, key, obj, ordered=False, **kwargs):
+        value = get_value(key if self.attribute is None else self.attribute, obj)
+        finish = partial(self._finish, ordered)
+        if inspect.isawaitable(value):
+            return defer(value, finish)
+        return finish(value)
+
+    def _finish(self, ordered, value):
+        return self.container.output(self._VALUE, {self._VALUE: value}, ordered=ordered)
+
+    def compile(self, key, ordered=False, source=None):
+        if type(self).output is not Async.output:
+            return self._compile_output(key, ordered)
+        getter = self.accessor(key, source)
+        step = self.container.compile(self._VALUE, ordered=ordered, source=dict)
+        value_key = self._VALUE
+
+        def finish(value):
+            return step({value_key: value})
+
+        def output(obj):
+            value = getter(obj)
+            if inspect.isawaitable(value):
+                return defer(value, finish)
+            return finish(value)
+        return output
+
+    def projection(self, key):
+        container = self.container
+        if type(self).output is not Async.output:
+            return ('*',)
+        elif isinstance(container, Nested):
+            return self._join_projection(key, container._projection_value())
+        return self._join_projection(key, ('*',))
+
+    def schema(self):
+        schema = super(Async, self).schema()
+        schema.update(self.container.__schema__)
+        return schema
+
+    def clone(self, mask=None):
+        container = self.container
+        if mask:
+            container = mask.apply(container)
+        return self.with_container(container)
+
+    def with_container(self, container):
+        '''Copy this field with another container field'''
+        kwargs = self._attrs()
+        kwargs.pop('container')
+        return self.__class__(container, **kwargs)
+
+
+class Batched(Async):
+    '''
+    Field for marshalling values loaded in batches (ie. relationships), avoiding a query per object.
+
+    The field value is the key to load. The keys of all the marshalled objects are collected
+    and loaded with a single call to ``loader`` by :func:`~sanic_restplus.marshalling.marshal_async`
+    and :func:`~sanic_restplus.marshalling.marshal_with`, then marshalled with the container field.
+    ``None`` keys are not loaded.
+
+    .. code-block:: python
+
+        async def load_authors(ids):
+            rows = await db.fetch('SELECT * FROM users WHERE id = ANY($1)', ids)
+            return {row['id']: row for row in rows}
+
+        model = api.model('Post', {
+            'title': fields.String,
+            'author': fields.Batched(load_authors, fields.Nested(user), attribute='author_id'),
+        })
+
+    :param loader: An async ``callable(keys)`` returning either the values in the keys order
+        or a mapping of the keys to their values (missing keys are ``None``).
+        Keys are deduplicated and must be hashable.
+    :param cls_or_instance: The field type marshalling the loaded values
+        (ie. a :class:`List` of :class:`Nested` for one-to-many relationships).
+    '''
+    __slots__ = ('loader',)
+
+    def __init__(self, loader, cls_or_instance, **kwargs):
+        self.loader = loader
+        super(Batched, self).__init__(cls_or_instance, **kwargs)
+
+    def output(self, key, obj, ordered=False, **kwargs):
+        value = get_value(key if self.attribute is None else self.attribute, obj)
+        finish = partial(self._finish, ordered)
+        if value is None:
+            return finish(None)
+        return defer_load(self.loader, value, finish)
+
+    def compile(self, key, ordered=False, source=None):
+        if type(self).output is not Batched.output:
+            return self._compile_output(key, ordered)
+        getter = self.accessor(key, source)
+        step = self.container.compile(self._VALUE, ordered=ordered, source=dict)
+        value_key = self._VALUE
+        loader = self.loader
+
+        def finish(value):
+            return step({value_key: value})
+
+        def output(obj):
+            value = getter(obj)
+            if value is None:
+                return finish(None)
+            return defer_load(loader, value, finish)
+        return output
+
+    def projection(self, key):
+        if type(self).output is not Batched.output:
+            return ('*',)
+        # Only the key is read from the marshalled objects, not the loaded values
+        return self._join_projection(key, ('*',))
+
+    def with_container(self, container):
+        kwargs = self._attrs()
+        kwargs.pop('container')
+        return self.__class__(kwargs.pop('loader'), container, **kwargs)
@@ -1,12 +1,21 @@
 # -*- coding: utf-8 -*-
 
 import asyncio
+import collections
+import hashlib
 import inspect
-from functools import wraps
-
-from .mask import Mask, apply as apply_mask
-from .utils import unpack, OrderedDict
+import pickle
+import threading
+import weakref
+from collections.abc import Iterator, Mapping
+from functools import partial, wraps
+from itertools import chain, islice
 
+from .mask import Mask, MaskError, apply as apply_mask
+from .representations import (
+    output_json_stream, iter_chunks, DEFAULT_CHUNK_SIZE, RawJSON, dumps_bytes, json_settings
+)
+from .utils import unpack, OrderedDict, get_accept_mimetypes
 
 
 def make(cls):
@@ -15,7 +24,7 @@ def make(cls):
     return cls
 
 
-def marshal(data, fields, envelope=None, skip_none=False, mask=None, ordered=False):
+def marshal(data, fields, envelope=None, skip_none=False, mask=None, ordered=False, memoize=False):
     """Takes raw data (in the form of a dict, list, object) and a dict of
     fields to output and filters the data based on those fields.
 
@@ -28,6 +37,8 @@ def marshal(data, fields, envelope=None, skip_none=False, mask=None, ordered=Fal
                            which value is None or the field's key not
                            exist in data
     :param bool ordered: Wether or not to preserve order
+    :param bool memoize: If ``True``, nested objects appearing several times
+                         are only marshalled once (see :func:`memoizing`)
 
 
     >>> from sanic_restplus import fields, marshal
@@ -52,67 +63,197 @@ def marshal(data, fields, envelope=None, skip_none=False, mask=None, ordered=Fal
     >>> marshal(data, mfields, skip_none=True, ordered=True)
     OrderedDict([('a', 100)])
 
+    Asynchronous iterables (async generators, database cursors...) are marshalled
+    as they are consumed: in this case an awaitable is returned::
+
+        rows = await marshal(async_cursor, mfields)
+
     """
-    out, has_wildcards = _marshal(data, fields, envelope, skip_none, mask, ordered)
+    marshaller = compile_marshaller(fields, skip_none=skip_none, ordered=ordered, mask=mask)
+    if is_async_iterable(data):
+        marshal_one = marshaller.marshal_one
+        return _marshal_async_iterable(data, memoizing(marshal_one) if memoize else marshal_one, envelope, ordered)
+    if memoize:
+        marshaller = memoizing(marshaller)
+    return _envelop(marshaller(data), envelope, ordered)
 
-    if has_wildcards:
-        # ugly local import to avoid dependency loop
-        from .fields import Wildcard
 
-        items = []
-        keys = []
-        for dkey, val in fields.items():
-            key = dkey
-            if isinstance(val, dict):
-                value = marshal(data, val, skip_none=skip_none, ordered=ordered)
+def marshal_many(data, fields, envelope=None, skip_none=False, mask=None, ordered=False,
+                 executor=None, chunk_size=DEFAULT_CHUNK_SIZE, memoize=False):
+    """Takes an iterable of raw objects and marshal each of them with the same fields.
+
+    The marshalling plan is prepared once for the whole collection
+    and each item is then marshalled in a tight loop.
+    Unlike :func:`marshal`, any iterable (generators, database cursors...) is accepted
+    and each item is marshalled as a single object.
+
+    :param data: an iterable of objects from which the fields are taken from
+    :param fields: a dict of whose keys will make up the final serialized
+                   response output
+    :param envelope: optional key that will be used to envelop the serialized
+                     response
+    :param bool skip_none: optional key will be used to eliminate fields
+                           which value is None or the field's key not
+                           exist in data
+    :param mask: an optional mask (parsed or not) to apply on the fields
+    :param bool ordered: Wether or not to preserve order
+    :param Executor executor: an optional executor (ie. a process pool)
+                              to marshal the data in parallel chunks with
+    :param int chunk_size: the number of items marshalled by each executor task
+    :param bool memoize: If ``True``, nested objects appearing several times
+                         are only marshalled once (see :func:`memoizing`)
+
+    >>> from sanic_restplus import fields, marshal_many
+    >>> mfields = { 'a': fields.Raw }
+    >>> marshal_many(({ 'a': i, 'b': 'foo' } for i in range(3)), mfields)
+    [{'a': 0}, {'a': 1}, {'a': 2}]
+
+    With an ``executor``, the data is split into chunks of ``chunk_size`` items
+    marshalled in parallel and reassembled in order.
+    The model is pickled once per call, but only sent to and compiled by the workers which haven't seen it yet:
+    the chunks only carry a digest of the plan.
+    The items and the marshalled chunks are still sent to and from the workers:
+    it only pays off for CPU heavy models.
+    Nested objects are then only memoized within a chunk.
+    This call blocks until every chunk is marshalled: use :func:`marshal_many_async` from the event loop.
+
+    Like :func:`marshal`, an awaitable is returned for asynchronous iterables.
+    """
+    if executor is not None and not is_async_iterable(data):
+        shards = _Shards(data, fields, skip_none, mask, ordered, executor, chunk_size, memoize)
+        out = []
+        for index, future in enumerate(shards.submit()):
+            out.extend(shards.result(index, future))
+        return _envelop(out, envelope, ordered)
+    marshal_one = compile_marshaller(fields, skip_none=skip_none, ordered=ordered, mask=mask).marshal_one
+    if memoize:
+        marshal_one = memoizing(marshal_one)
+    if is_async_iterable(data):
+        return _marshal_async_iterable(data, marshal_one, envelope, ordered)
+    return _envelop([marshal_one(item) for item in data], envelope, ordered)
+
+
+#: The marshallers compiled by the current (worker) process, keyed on their pickled plan digest
+_worker_marshallers = collections.OrderedDict()
+_worker_marshallers_lock = threading.Lock()
+_WORKER_MARSHALLERS_SIZE = 32
+#: The digests of the plans confirmed to be compiled by the workers of each executor
+_sent_plans = weakref.WeakKeyDictionary()
+
+
+class _MissingPlan(Exception):
+    '''Raised by an executor worker asked to marshal with a plan it has not been sent yet'''
+
+
+class _Shards(object):
+    '''The chunks of a collection marshalled by the workers of an executor (see :func:`marshal_many`)'''
+    def __init__(self, data, fields, skip_none, mask, ordered, executor, chunk_size, memoize):
+        self.plan = pickle.dumps((fields, bool(skip_none), str(mask) if mask else None, bool(ordered)))
+        self.key = hashlib.sha1(self.plan).digest()
+        iterator = iter(data)
+        self.chunks = list(iter(lambda: list(islice(iterator, chunk_size)), []))
+        self.executor = executor
+        self.memoize = memoize
+
+    def submit(self):
+        '''
+        Submit every chunk and return their futures.
+
+        Until a chunk has been marshalled with it, the plan is attached to as many chunks as the executor has workers.
+        Afterwards, a worker missing it (ie. a new process) is sent the plan again by :meth:`result`.
+        '''
+        confirmed = self.key in _sent_plans.get(self.executor, ())
+        primed = 0 if confirmed else getattr(self.executor, '_max_workers', 1)
+        return [self.submit_chunk(index, index < primed) for index in range(len(self.chunks))]
+
+    def submit_chunk(self, index, with_plan=True):
+        return self.executor.submit(_marshal_chunk, self.key, self.chunks[index], self.memoize,
+                                    self.plan if with_plan else None)
+
+    def result(self, index, future):
+        '''Wait for a chunk, submitting it again with the plan until its worker has it'''
+        while True:
+            try:
+                out = future.result()
+            except _MissingPlan:
+                future = self.submit_chunk(index)
             else:
-                field = make(val)
-                is_wildcard = isinstance(field, Wildcard)
-                # exclude already parsed keys from the wildcard
-                if is_wildcard:
-                    field.reset()
-                    if keys:
-                        field.exclude |= set(keys)
-                        keys = []
-                value = field.output(dkey, data)
-                if is_wildcard:
-
-                    def _append(k, v):
-                        if skip_none and (v is None or v == OrderedDict() or v == {}):
-                            return
-                        items.append((k, v))
-
-                    key = field.key or dkey
-                    _append(key, value)
-                    while True:
-                        value = field.output(dkey, data, ordered=ordered)
-                        if value is None or \
-                                value == field.container.format(field.default):
-                            break
-                        key = field.key
-                        _append(key, value)
-                    continue
+                self.confirm()
+                return out
 
-            keys.append(key)
-            if skip_none and (value is None or value == OrderedDict() or value == {}):
-                continue
-            items.append((key, value))
+    async def result_async(self, index, future):
+        '''Await a chunk like :meth:`result`'''
+        while True:
+            try:
+                out = await asyncio.wrap_future(future)
+            except _MissingPlan:
+                future = self.submit_chunk(index)
+            else:
+                self.confirm()
+                return out
 
-        items = tuple(items)
+    def confirm(self):
+        '''Remember a worker of the executor compiled the plan'''
+        sent = _sent_plans.get(self.executor)
+        if sent is None:
+            sent = _sent_plans[self.executor] = set()
+        sent.add(self.key)
 
-        out = OrderedDict(items) if ordered else dict(items)
 
-        if envelope:
-            out = OrderedDict([(envelope, out)]) if ordered else {envelope: out}
+def _marshal_chunk(key, chunk, memoize=False, plan=None):
+    '''Marshal a chunk of items in an executor worker, compiling the pickled plan on first use'''
+    with _worker_marshallers_lock:
+        marshal_one = _worker_marshallers.get(key)
+        if marshal_one is not None:
+            _worker_marshallers.move_to_end(key)
+    if marshal_one is None:
+        if plan is None:
+            raise _MissingPlan(key)
+        fields, skip_none, mask, ordered = pickle.loads(plan)
+        marshal_one = compile_marshaller(fields, skip_none=skip_none, ordered=ordered, mask=mask).marshal_one
+        with _worker_marshallers_lock:
+            _worker_marshallers[key] = marshal_one
+            while len(_worker_marshallers) > _WORKER_MARSHALLERS_SIZE:
+                _worker_marshallers.popitem(last=False)
+    if memoize:
+        marshal_one = memoizing(marshal_one)
+    return [marshal_one(item) for item in chunk]
 
-        return out
 
-    return out
+async def marshal_many_async(data, fields, envelope=None, skip_none=False, mask=None, ordered=False,
+                             executor=None, chunk_size=DEFAULT_CHUNK_SIZE, memoize=False):
+    """Marshal a collection like :func:`marshal_many` without blocking the event loop.
 
+    With an ``executor``, the chunks are marshalled in parallel by its workers
+    and awaited together with :func:`asyncio.gather`.
+    Asynchronous iterables are collected first.
 
-def _marshal(data, fields, envelope=None, skip_none=False, mask=None, ordered=False):
-    """Takes raw data (in the form of a dict, list, object) and a dict of
-    fields to output and filters the data based on those fields.
+    ::
+
+        @api.route('/export')
+        class Export(Resource):
+            async def get(self, request):
+                return await marshal_many_async(db.rows(), model, envelope='data', executor=executor)
+    """
+    if is_async_iterable(data):
+        data = await _collect(data)
+    if executor is None:
+        return marshal_many(data, fields, envelope, skip_none, mask, ordered, memoize=memoize)
+    shards = _Shards(data, fields, skip_none, mask, ordered, executor, chunk_size, memoize)
+    chunks = await asyncio.gather(*[shards.result_async(index, future)
+                                    for index, future in enumerate(shards.submit())])
+    return _envelop(list(chain.from_iterable(chunks)), envelope, ordered)
+
+
+async def marshal_async(data, fields, envelope=None, skip_none=False, mask=None, ordered=False,
+                        memoize=False, concurrency=None):
+    """Marshal data like :func:`marshal`, awaiting the awaitable values concurrently.
+
+    The :class:`~sanic_restplus.fields.Async` fields values (ie. coroutines fetching
+    per item enrichments) are collected while marshalling,
+    awaited together with :func:`asyncio.gather`,
+    then marshalled and put in place in the output.
+    Awaitables found in the awaited values are handled the same way.
 
     :param data: the actual object(s) from which the fields are taken from
     :param fields: a dict of whose keys will make up the final serialized
@@ -122,72 +263,1049 @@ def _marshal(data, fields, envelope=None, skip_none=False, mask=None, ordered=Fa
     :param bool skip_none: optional key will be used to eliminate fields
                            which value is None or the field's key not
                            exist in data
+    :param mask: an optional mask (parsed or not) to apply on the fields
     :param bool ordered: Wether or not to preserve order
+    :param bool memoize: If ``True``, nested objects appearing several times
+                         are only marshalled once (see :func:`memoizing`)
+    :param int concurrency: the maximum number of values awaited at once (unlimited by default)
 
+    ::
 
-    >>> from flask_restplus import fields, marshal
-    >>> data = { 'a': 100, 'b': 'foo', 'c': None }
-    >>> mfields = { 'a': fields.Raw, 'c': fields.Raw, 'd': fields.Raw }
+        async def rating(item):
+            return await ratings_service.get(item['id'])
 
-    >>> marshal(data, mfields)
-    {'a': 100, 'c': None, 'd': None}
+        mfields = { 'a': fields.Raw, 'rating': fields.Async(fields.Float, attribute=rating) }
+        await marshal_async([{ 'a': 100, 'id': 1 }], mfields, concurrency=10)
+        # [{'a': 100, 'rating': 4.5}]
 
-    >>> marshal(data, mfields, envelope='data')
-    {'data': {'a': 100, 'c': None, 'd': None}}
+    Asynchronous iterables are accepted too.
+    """
+    marshaller = compile_marshaller(fields, skip_none=skip_none, ordered=ordered, mask=mask)
+    if is_async_iterable(data):
+        data = await _collect(data)
+    if memoize:
+        marshaller = memoizing(marshaller)
+    out = await _marshal_resolved(marshaller, data, concurrency)
+    return _envelop(out, envelope, ordered)
 
-    >>> marshal(data, mfields, skip_none=True)
-    {'a': 100}
 
-    >>> marshal(data, mfields, ordered=True)
-    OrderedDict([('a', 100), ('c', None), ('d', None)])
+def marshal_json(data, fields, envelope=None, skip_none=False, mask=None, memoize=False, layout=None):
+    """Marshal data like :func:`marshal` but straight to JSON bytes.
 
-    >>> marshal(data, mfields, envelope='data', ordered=True)
-    OrderedDict([('data', OrderedDict([('a', 100), ('c', None), ('d', None)]))])
+    The data is encoded by the compiled encoder of the model (see :func:`compile_encoder`)
+    without building the intermediate dictionaries.
+    The result is a :class:`~sanic_restplus.representations.RawJSON` instance,
+    written as is by the JSON representations.
 
-    >>> marshal(data, mfields, skip_none=True, ordered=True)
-    OrderedDict([('a', 100)])
+    :param data: the actual object(s) from which the fields are taken from
+    :param fields: a dict of whose keys will make up the final serialized
+                   response output
+    :param envelope: optional key that will be used to envelop the serialized
+                     response
+    :param bool skip_none: optional key will be used to eliminate fields
+                           which value is None or the field's key not
+                           exist in data
+    :param mask: an optional mask (parsed or not) to apply on the fields
+    :param bool memoize: If ``True``, nested objects appearing several times
+                         are only encoded once (see :func:`memoizing`)
+    :param str layout: an optional compact layout for collections (see :func:`to_layout`)
+
+    >>> from sanic_restplus import fields, marshal_json
+    >>> marshal_json({ 'a': 100, 'b': 'foo' }, { 'a': fields.Raw }, envelope='data')
+    b'{"data":{"a":100}}'
+
+    >>> marshal_json([{ 'a': 100, 'b': 'foo' }], { 'a': fields.Raw, 'b': fields.Raw }, layout='rows')
+    b'{"fields":["a","b"],"rows":[[100,"foo"]]}'
+
+    Like :func:`marshal`, an awaitable is returned for asynchronous iterables.
+    """
+    if layout is not None:
+        marshaller = compile_marshaller(fields, skip_none=skip_none, mask=mask)
+        if is_async_iterable(data):
+            return _encode_async_layout(data, marshaller, layout, envelope, memoize)
+        out = _marshal_layout(marshaller, data, layout, memoize=memoize)
+        return RawJSON(dumps_bytes(_envelop(out, envelope)))
+    encoder = compile_encoder(fields, skip_none=skip_none, mask=mask)
+    if memoize:
+        encoder = memoizing(encoder)
+    if is_async_iterable(data):
+        return _encode_async_iterable(data, encoder, envelope)
+    return _envelop_json(encoder(data), envelope)
+
+
+def _marshal_offloaded(data, fields, envelope, skip_none, mask, ordered, memoize, layout):
+    '''Marshal data like :meth:`marshal_with.marshal` in an executor worker'''
+    if layout is None:
+        return marshal(data, fields, envelope, skip_none, mask, ordered, memoize)
+    marshaller = compile_marshaller(fields, skip_none=skip_none, ordered=ordered, mask=mask)
+    return _envelop(_marshal_layout(marshaller, data, layout, ordered, memoize), envelope, ordered)
+
+
+#: The compact layouts of marshalled collections (see :func:`to_layout`)
+LAYOUTS = ('rows', 'columns')
+
+
+def to_layout(rows, layout, keys=None, ordered=False):
+    """Convert marshalled rows to a compact layout, not repeating the fields names in every row.
+
+    - ``rows``: the fields names and an array of values per row,
+      ie. ``{"fields": ["a", "b"], "rows": [[1, 2], [3, 4]]}``
+    - ``columns``: an array of values per field, ie. ``{"a": [1, 3], "b": [2, 4]}``
+
+    Missing keys (ie. skipped ``None`` values) are output as ``None``.
+
+    :param list rows: the marshalled rows (dictionaries)
+    :param str layout: the layout name, one of :data:`LAYOUTS`
+    :param keys: the fields names, in output order.
+                 By default, all the rows keys in order of appearance.
+    :param bool ordered: Wether or not to output an ordered dictionary
+
+    >>> from sanic_restplus.marshalling import to_layout
+    >>> to_layout([{'a': 1, 'b': 2}, {'a': 3}], 'columns')
+    {'a': [1, 3], 'b': [2, None]}
+    """
+    if layout not in LAYOUTS:
+        raise ValueError('Unknown layout {0!r}, expected one of {1}'.format(layout, ', '.join(LAYOUTS)))
+    factory = OrderedDict if ordered else dict
+    if keys is None:
+        keys = list(OrderedDict.fromkeys(chain.from_iterable(rows)))
+    else:
+        keys = list(keys)
+    values = [[row.get(key) for key in keys] for row in rows]
+    if layout == 'rows':
+        return factory([('fields', keys), ('rows', values)])
+    columns = map(list, zip(*values)) if values else ([] for _ in keys)
+    return factory(zip(keys, columns))
+
+
+def _marshal_layout(marshaller, data, layout, ordered=False, memoize=False):
+    '''Marshal a collection with a compiled marshaller and convert it to ``layout``, single objects are left as is'''
+    if isinstance(data, (list, tuple)):
+        marshal_one = memoizing(marshaller.marshal_one) if memoize else marshaller.marshal_one
+        return to_layout([marshal_one(item) for item in data], layout, marshaller.keys, ordered)
+    out = memoizing(marshaller)(data) if memoize else marshaller(data)
+    if isinstance(data, Columns):
+        return to_layout(out, layout, marshaller.keys, ordered)
+    return out
+
+
+async def _encode_async_layout(data, marshaller, layout, envelope=None, memoize=False):
+    data = await _collect(data)
+    return RawJSON(dumps_bytes(_envelop(_marshal_layout(marshaller, data, layout, memoize=memoize), envelope)))
+
+
+def requested_layout(request, layouts=LAYOUTS):
+    """Get the compact layout requested with the ``layout`` parameter of the ``Accept`` media types.
+
+    ie. ``Accept: application/json;layout=rows``
+
+    Layouts only apply to JSON responses: ``None`` is returned
+    unless ``application/json`` is the preferred media type of the client.
+
+    :param request: the current request
+    :param layouts: the layouts which can be served
+    :return: the preferred requested layout or ``None``
+    """
+    accepted = sorted(get_accept_mimetypes(request), key=lambda accepted: accepted[1], reverse=True)
+    if not accepted or _base_mimetype(accepted[0][0]) != 'application/json':
+        return None
+    for mimetype, quality in accepted:
+        if not quality or _base_mimetype(mimetype) != 'application/json':
+            # Explicitly refused by the client or not JSON
+            continue
+        for param in mimetype.split(';')[1:]:
+            name, _, value = param.partition('=')
+            value = value.strip().strip('"')
+            if name.strip().lower() == 'layout' and value in layouts:
+                return value
+    return None
+
+
+def _base_mimetype(mimetype):
+    return mimetype.split(';', 1)[0].strip().lower()
+
+
+def is_async_iterable(data):
+    '''Wether or not ``data`` is an asynchronous iterable (async generator, cursor...)'''
+    return hasattr(data, '__aiter__')
+
+
+class Columns(object):
+    """
+    Columnar data marshalled as a list of rows: a mapping of equal length columns
+    (lists, NumPy arrays...) or a DataFrame like object (exposing its ``columns`` names,
+    its columns by name and its length, ie. a pandas DataFrame).
+
+    The fields reading a column format it at once (see :meth:`~sanic_restplus.fields.Raw.format_column`)
+    before the rows are assembled. The other fields (nested models, lists, custom outputs...)
+    are output row by row, from rows built as dictionaries.
+
+    >>> from sanic_restplus import fields, marshal, Columns
+    >>> marshal(Columns({'a': [1, 2], 'b': ['x', 'y']}), {'a': fields.Float, 'b': fields.Raw})
+    [{'a': 1.0, 'b': 'x'}, {'a': 2.0, 'b': 'y'}]
+
+    :param data: the columns
+    :raises MarshallingError: if the columns don't have the same length
+    """
+    __slots__ = ('data', 'names', '_length', '_rows')
+
+    def __init__(self, data):
+        self.data = data
+        is_mapping = isinstance(data, Mapping)
+        self.names = list(data.keys() if is_mapping else data.columns)
+        lengths = set(len(data[name]) for name in self.names)
+        if len(lengths) > 1:
+            # ugly local import to avoid dependency loop
+            from .fields import MarshallingError
+            raise MarshallingError('Columns must have the same length')
+        self._length = lengths.pop() if lengths else (0 if is_mapping else len(data))
+        self._rows = None
 
+    def __len__(self):
+        return self._length
+
+    def __contains__(self, name):
+        return name in self.names
+
+    def column(self, name):
+        """Get a column by name"""
+        return self.data[name]
+
+    @property
+    def rows(self):
+        """The rows as dictionaries, only built if some fields can't be output by column"""
+        if self._rows is None:
+            # ugly local import to avoid dependency loop
+            from .fields import column_values
+            names = self.names
+            columns = [column_values(self.data[name]) for name in names]
+            self._rows = [dict(zip(names, values)) for values in zip(*columns)]
+        return self._rows
+
+
+# The identity memo of the memoizing marshalling running in the current thread.
+# It is only set while marshalling synchronously, so it is never seen by another asyncio task.
+_memo = threading.local()
+
+
+def memoizing(func):
+    """Wrap a marshalling (or encoding) function to memoize nested objects.
+
+    All the calls to the returned function share a memo keyed on the identity
+    of the nested objects and of their compiled marshaller:
+    an object nested several times (ie. the same owner of many items)
+    is marshalled once and the same output is reused.
+    The marshalled dictionaries are then shared, so they must not be mutated.
+
+    Use a new wrapper for each response: the memo keeps every memoized object alive.
+
+    :param func: a compiled marshaller, encoder or one of their ``marshal_one`` functions
+
+    >>> from sanic_restplus import fields, compile_marshaller, memoizing
+    >>> owner = {'name': 'John'}
+    >>> marshaller = memoizing(compile_marshaller({'owner': fields.Nested({'name': fields.String})}))
+    >>> items = marshaller([{'owner': owner}, {'owner': owner}])
+    >>> items[0]['owner'] is items[1]['owner']
+    True
     """
+    memo = {}
+
+    @wraps(func)
+    def wrapper(data):
+        previous = getattr(_memo, 'objects', None)
+        _memo.objects = memo
+        try:
+            return func(data)
+        finally:
+            _memo.objects = previous
+    return wrapper
+
+
+class Pending(object):
+    '''
+    An awaitable value waiting in the output for :func:`marshal_async`.
+
+    :param awaitable: the value to await
+    :param finish: a ``callable(value)`` marshalling the awaited value
+    '''
+    __slots__ = ('awaitable', 'finish')
+
+    def __init__(self, awaitable, finish):
+        self.awaitable = awaitable
+        self.finish = finish
+
+
+# The awaitables deferred by the marshalling running in the current thread (see :func:`defer`).
+# Like the memo, it is only set while marshalling synchronously.
+_pending = threading.local()
+
+
+def defer(awaitable, finish):
+    '''
+    Put an awaitable value in the output, marshalled by ``finish`` once awaited.
+
+    :raises MarshallingError: if not marshalling with :func:`marshal_async` or :func:`marshal_with`
+    '''
+    pendings = getattr(_pending, 'values', None)
+    if pendings is None:
+        # ugly local import to avoid dependency loop
+        from .fields import MarshallingError
+        if inspect.iscoroutine(awaitable):
+            awaitable.close()
+        raise MarshallingError('Awaitable values can only be marshalled by marshal_async() or marshal_with()')
+    pending = Pending(awaitable, finish)
+    pendings.append(pending)
+    return pending
+
+
+class Batch(object):
+    '''
+    The keys deferred for a batch loader while marshalling (see :func:`defer_load`).
+
+    The loader is called once, with all the keys, by the first awaited value.
+
+    :param loader: an async ``callable(keys)`` returning the values in the keys order, or a mapping
+    '''
+    __slots__ = ('loader', 'keys', 'task')
+
+    def __init__(self, loader):
+        self.loader = loader
+        self.keys = {}
+        self.task = None
+
+    async def get(self, key):
+        '''Get the value loaded for ``key``'''
+        if self.task is None:
+            self.task = asyncio.ensure_future(self.load())
+        values = await self.task
+        return values.get(key)
+
+    async def load(self):
+        keys = list(self.keys)
+        values = await self.loader(keys)
+        if isinstance(values, Mapping):
+            return values
+        values = list(values)
+        if len(values) != len(keys):
+            # ugly local import to avoid dependency loop
+            from .fields import MarshallingError
+            raise MarshallingError('The batch loader returned {0} values for {1} keys'.format(len(values), len(keys)))
+        return dict(zip(keys, values))
+
+
+def defer_load(loader, key, finish):
+    '''
+    Put the value of ``key`` in the output, loaded with the other keys of the same batch ``loader``
+    and marshalled by ``finish`` (see :func:`defer`).
+
+    :raises MarshallingError: if not marshalling with :func:`marshal_async` or :func:`marshal_with`
+    '''
+    batches = getattr(_pending, 'batches', None)
+    if batches is None:
+        # Let defer() report the error
+        return defer(None, finish)
+    batch = batches.get(loader)
+    if batch is None:
+        batch = batches[loader] = Batch(loader)
+    batch.keys[key] = None
+    return defer(batch.get(key), finish)
+
+
+def _collecting(func, *args):
+    '''Call ``func`` collecting the awaitables it defers, as a ``(result, pendings)`` tuple'''
+    previous = getattr(_pending, 'values', None), getattr(_pending, 'batches', None)
+    pendings = _pending.values = []
+    # The keys to load, per loader, until the deferred values are awaited
+    _pending.batches = {}
+    try:
+        return func(*args), pendings
+    except BaseException:
+        # Don't leave never awaited coroutines behind
+        for pending in pendings:
+            if inspect.iscoroutine(pending.awaitable):
+                pending.awaitable.close()
+        raise
+    finally:
+        _pending.values, _pending.batches = previous
+
+
+async def _marshal_resolved(func, data, concurrency=None):
+    '''Marshal ``data`` with ``func``, then await and marshal the deferred values until there is none left'''
+    out, pendings = _collecting(func, data)
+    while pendings:
+        if concurrency:
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def limited(awaitable):
+                async with semaphore:
+                    return await awaitable
+            results = await asyncio.gather(*[limited(pending.awaitable) for pending in pendings])
+        else:
+            results = await asyncio.gather(*[pending.awaitable for pending in pendings])
+        values, pendings = _collecting(_finish_pendings, pendings, results)
+        out = _replace_pendings(out, values)
+    return out
+
+
+def _finish_pendings(pendings, results):
+    return dict((id(pending), pending.finish(result)) for pending, result in zip(pendings, results))
+
+
+def _replace_pendings(node, values):
+    '''Put the marshalled awaited values in place of their :class:`Pending` in the output'''
+    if type(node) is Pending:
+        return values[id(node)]
+    elif isinstance(node, dict):
+        for key, value in node.items():
+            if type(value) is Pending or isinstance(value, (dict, list)):
+                node[key] = _replace_pendings(value, values)
+    elif isinstance(node, list):
+        for index, value in enumerate(node):
+            if type(value) is Pending or isinstance(value, (dict, list)):
+                node[index] = _replace_pendings(value, values)
+    return node
+
+
+def has_awaitables(fields):
+    '''Wether or not a model (or a dict of fields) has :class:`~sanic_restplus.fields.Async` fields, recursively'''
+    return _has_awaitables(fields, set())
+
+
+def _has_awaitables(fields, seen):
     # ugly local import to avoid dependency loop
-    from .fields import Wildcard
+    from .fields import Async, List, Nested, Polymorph
+
+    key = getattr(fields, 'name', None) or id(fields)
+    if key in seen:
+        return False
+    seen.add(key)
+    for field in getattr(fields, 'resolved', fields).values():
+        if isinstance(field, dict):
+            models = [field]
+        else:
+            if isinstance(field, List):
+                field = field.container
+            if isinstance(field, Async):
+                return True
+            elif isinstance(field, Polymorph):
+                models = list(field.mapping.values())
+            elif isinstance(field, Nested):
+                models = [field.model]
+            else:
+                continue
+        if any(_has_awaitables(model, seen) for model in models):
+            return True
+    return False
+
+
+def memoized(func, value):
+    '''Apply ``func`` on a nested ``value``, reusing its output if already seen by the running memoizing call'''
+    memo = getattr(_memo, 'objects', None)
+    if memo is None:
+        return func(value)
+    key = (id(value), id(func))
+    entry = memo.get(key)
+    if entry is None:
+        # Keep the value alive so its identity can't be reused within the call
+        entry = memo[key] = (value, func(value))
+    return entry[1]
+
+
+def iter_marshal_async(data, marshal_one):
+    '''Marshal the items of an asynchronous iterable as they arrive'''
+    return _MarshalIterator(data, marshal_one)
+
+
+class _MarshalIterator(object):
+    def __init__(self, data, marshal_one):
+        self.items = data.__aiter__()
+        self.marshal_one = marshal_one
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return self.marshal_one(await self.items.__anext__())
+
+
+def iter_marshal_resolved(data, marshal_one, chunk_size=DEFAULT_CHUNK_SIZE, concurrency=None):
+    '''
+    Marshal the items of an iterable (or asynchronous iterable) by chunks,
+    awaiting the awaitable values of each chunk concurrently (see :func:`marshal_async`)
+    '''
+    return _ResolvedMarshalIterator(data, marshal_one, chunk_size, concurrency)
+
 
+class _ResolvedMarshalIterator(object):
+    def __init__(self, data, marshal_one, chunk_size, concurrency):
+        self.chunks = iter_chunks(data, chunk_size)
+        self.marshal_one = marshal_one
+        self.concurrency = concurrency
+        self.rows = iter(())
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        while True:
+            try:
+                return next(self.rows)
+            except StopIteration:
+                pass
+            # Raises StopAsyncIteration once all the chunks are marshalled
+            chunk = await self.chunks.__anext__()
+            self.rows = iter(await _marshal_resolved(self.marshal_chunk, chunk, self.concurrency))
+
+    def marshal_chunk(self, chunk):
+        return [self.marshal_one(item) for item in chunk]
+
+
+async def _collect(data):
+    '''Collect the items of an asynchronous iterable in a list'''
+    items = []
+    async for item in data:
+        items.append(item)
+    return items
+
+
+async def _marshal_async_iterable(data, marshal_one, envelope=None, ordered=False):
+    out = []
+    async for item in data:
+        out.append(marshal_one(item))
+    return _envelop(out, envelope, ordered)
+
+
+def _envelop(out, envelope=None, ordered=False):
+    if envelope:
+        out = OrderedDict([(envelope, out)]) if ordered else {envelope: out}
+    return out
+
+
+async def _encode_async_iterable(data, encoder, envelope=None):
+    return _envelop_json(encoder(await _collect(data)), envelope)
+
+
+def _envelop_json(out, envelope=None):
+    if envelope:
+        out = b'{' + dumps_bytes(envelope) + b':' + out + b'}'
+    return RawJSON(out)
+
+
+def compile_marshaller(fields, skip_none=False, ordered=False, mask=None):
+    """Compile a model (or a dict of fields) into a specialized marshalling function.
+
+    The model is resolved and masked once, every field is instanciated once
+    and its value accessor, formatter and nested marshallers are bound ahead of time,
+    so the returned function only has to walk the data.
+    It accepts the same data as :func:`marshal` (a single object or a list of objects)
+    and returns the same output, without envelope.
+    Its ``marshal_one`` attribute marshals a single object without any type check.
+
+    Marshallers compiled without an explicit mask are cached on the :class:`~sanic_restplus.Model`,
+    the others are kept in the :data:`plan_cache`.
+
+    :param fields: a dict of whose keys will make up the final serialized
+                   response output
+    :param bool skip_none: optional key will be used to eliminate fields
+                           which value is None or the field's key not
+                           exist in data
+    :param bool ordered: Wether or not to preserve order
+    :param mask: an optional mask (parsed or not) to apply on the fields
+
+    >>> from sanic_restplus import fields, compile_marshaller
+    >>> marshaller = compile_marshaller({ 'a': fields.Raw, 'd': fields.Raw })
+    >>> marshaller({ 'a': 100, 'b': 'foo' })
+    {'a': 100, 'd': None}
+
+    >>> marshaller([{ 'a': 100 }, { 'd': 'foo' }])
+    [{'a': 100, 'd': None}, {'a': None, 'd': 'foo'}]
+
+    """
+    cache = None if mask else getattr(fields, '_marshallers', None)
+    if cache is not None:
+        key = (bool(skip_none), bool(ordered))
+        marshaller = cache.get(key)
+        if marshaller is None:
+            marshaller = cache[key] = _compile(resolve_fields(fields), skip_none, ordered,
+                                               getattr(fields, '__source__', None))
+        return marshaller
+    return plan_cache.get(fields, mask, skip_none, ordered).marshaller
+
+
+def compile_encoder(fields, skip_none=False, mask=None):
+    """Compile a model (or a dict of fields) into a function marshalling data straight to JSON bytes.
+
+    Keys are encoded once and each field value is encoded as soon as it is marshalled,
+    so no intermediate dictionary is built and the output is not walked a second time.
+    Nested models and lists of nested models are encoded by their own compiled encoders.
+    The returned function accepts the same data as the :func:`compile_marshaller` ones
+    and its ``encode_one`` attribute encodes a single object.
+
+    Encoders are cached like marshallers.
+
+    :param fields: a dict of whose keys will make up the final serialized
+                   response output
+    :param bool skip_none: optional key will be used to eliminate fields
+                           which value is None or the field's key not
+                           exist in data
+    :param mask: an optional mask (parsed or not) to apply on the fields
+
+    >>> from sanic_restplus import fields, compile_encoder
+    >>> encoder = compile_encoder({ 'a': fields.Raw, 'd': fields.Raw })
+    >>> encoder([{ 'a': 100 }, { 'd': 'foo' }])
+    b'[{"a":100,"d":null},{"a":null,"d":"foo"}]'
+
+    """
+    cache = None if mask else getattr(fields, '_marshallers', None)
+    if cache is not None:
+        key = ('json', bool(skip_none))
+        encoder = cache.get(key)
+        if encoder is None:
+            encoder = cache[key] = _compile_encoder(resolve_fields(fields), skip_none,
+                                                    getattr(fields, '__source__', None))
+        return encoder
+    return plan_cache.get(fields, mask, skip_none).encoder
+
+
+def projection(fields, mask=None):
+    """List the dotted attribute paths read from the marshalled objects for a model and a mask.
+
+    Paths are built from the fields ``attribute`` (or key) and walk into nested models and lists,
+    so ``'address.city'`` means the ``city`` of each ``address``.
+    A path standing alone means its whole value is read and ``'*'`` means the whole object is,
+    ie. for wildcards, callable attributes or custom fields overriding ``output``
+    (see :meth:`~sanic_restplus.fields.Raw.projection`).
+    It lets handlers only fetch what will actually be output.
+
+    Projections are cached like marshallers.
+
+    :param fields: a model or a dict of fields
+    :param mask: an optional mask (parsed or not) to apply on the fields
+    :return: the paths, in fields order
+    :rtype: tuple
+
+    >>> from sanic_restplus import fields, projection
+    >>> projection({'name': fields.String, 'city': fields.String(attribute='address.city')})
+    ('name', 'address.city')
+    """
+    cache = None if mask else getattr(fields, '_marshallers', None)
+    if cache is not None:
+        paths = cache.get('projection')
+        if paths is None:
+            paths = cache['projection'] = _projection(fields, resolve_fields(fields))
+        return paths
+    return plan_cache.get(fields, mask).projection
+
+
+# The models whose projection is being computed, to stop on self-referencing models.
+# Models are tracked by name because resolving a self-referencing model copies its nested models.
+_projecting = threading.local()
+
+
+def _projection(source, fields):
+    in_progress = _projecting.__dict__.setdefault('models', set())
+    key = getattr(source, 'name', None) or id(source)
+    if key in in_progress:
+        return ('*',)
+    in_progress.add(key)
+    try:
+        paths = _project(fields)
+    finally:
+        in_progress.discard(key)
+    if '*' in paths:
+        return ('*',)
+    # Drop the paths already covered by a whole value
+    found = set(paths)
+    out = []
+    for path in paths:
+        parts = path.split('.')
+        if path in out or any('.'.join(parts[:i]) in found for i in range(1, len(parts))):
+            continue
+        out.append(path)
+    return tuple(out)
+
+
+def _project(fields):
+    paths = []
+    for key, value in fields.items():
+        if isinstance(value, dict):
+            # Inline dicts read from the same object
+            paths.extend(_project(value))
+        else:
+            paths.extend(make(value).projection(key))
+    return paths
+
+
+def resolve_fields(fields, mask=None):
+    """Resolve a model and apply the mask (or the model default mask) on it.
+
+    :param fields: a model or a dict of fields
+    :param mask: an optional mask (parsed or not)
+    :return: the resolved and pruned fields tree
+    """
     mask = mask or getattr(fields, '__mask__', None)
     fields = getattr(fields, 'resolved', fields)
     if mask:
         fields = apply_mask(fields, mask, skip=True)
+    return fields
 
-    if isinstance(data, (list, tuple)):
-        out = [marshal(d, fields, skip_none=skip_none, ordered=ordered) for d in data]
-        if envelope:
-            out = OrderedDict([(envelope, out)]) if ordered else {envelope: out}
-        return out, False
 
-    has_wildcards = {'present': False}
+class MarshalPlan(object):
+    """
+    The resolved and masked fields tree for a given set of marshalling options.
+
+    The marshaller and the JSON encoder are only compiled on first use.
+    """
+    __slots__ = ('source', 'fields', 'skip_none', 'ordered', '_marshaller', '_encoder', '_projection')
+
+    def __init__(self, source, fields, skip_none=False, ordered=False):
+        self.source = source
+        self.fields = fields
+        self.skip_none = skip_none
+        self.ordered = ordered
+        self._marshaller = None
+        self._encoder = None
+        self._projection = None
+
+    @property
+    def marshaller(self):
+        if self._marshaller is None:
+            self._marshaller = _compile(self.fields, self.skip_none, self.ordered,
+                                        getattr(self.source, '__source__', None))
+        return self._marshaller
+
+    @property
+    def encoder(self):
+        if self._encoder is None:
+            self._encoder = _compile_encoder(self.fields, self.skip_none,
+                                             getattr(self.source, '__source__', None))
+        return self._encoder
+
+    @property
+    def projection(self):
+        if self._projection is None:
+            self._projection = _projection(self.source, self.fields)
+        return self._projection
+
+
+PlanCacheInfo = collections.namedtuple('PlanCacheInfo', 'hits misses maxsize currsize')
+
+
+class PlanCache(object):
+    """
+    A bounded LRU cache of :class:`MarshalPlan`.
+
+    Plans are keyed on the model identity and state, the normalized mask and the marshalling flags,
+    so a request with an already seen ``X-Fields`` mask neither clones the model nor compiles it again
+    while a changed model gets a new plan.
+    Plain dicts of fields have no state to track: they are keyed on their content instead,
+    so a changed dict gets a new plan and equal inline dicts share theirs.
+    Their plans are kept apart and only once their key is seen again,
+    so inline dicts built with new field instances on each call neither fill the cache nor evict the models plans.
+    The cache keeps a reference on the models it holds, so a key can't be reused by another model.
+
+    :param int maxsize: the maximum number of models plans to keep
+    :param int dict_maxsize: the maximum number of plain dicts plans to keep
+    """
+    def __init__(self, maxsize=256, dict_maxsize=64):
+        self.maxsize = maxsize
+        self.dict_maxsize = dict_maxsize
+        self.hits = 0
+        self.misses = 0
+        self._plans = collections.OrderedDict()
+        self._dict_plans = collections.OrderedDict()
+        self._dict_seen = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, fields, mask=None, skip_none=False, ordered=False, fields_key=None):
+        """
+        Get the marshalling plan for the given model and options, building it if necessary.
 
-    def __format_field(key, val):
-        field = make(val)
+        :param fields: a model or a dict of fields
+        :param mask: an optional mask (parsed or not)
+        :param bool skip_none: the marshalling ``skip_none`` flag
+        :param bool ordered: the marshalling ``ordered`` flag
+        :param fields_key: the fields identity if already known (see :meth:`marshal_with.fields_key`)
+        :rtype: MarshalPlan
+        """
+        mask = mask or getattr(fields, '__mask__', None)
+        if mask and not isinstance(mask, Mask):
+            mask = Mask(mask, skip=True)
+        if fields_key is None:
+            fields_key = _fields_key(fields)
+        key = (fields_key, str(mask) if mask else None, bool(skip_none), bool(ordered))
+        try:
+            hash(key)
+        except TypeError:
+            # Unhashable fields can't be identified, the plan is built for this call only
+            return MarshalPlan(fields, resolve_fields(fields, mask), bool(skip_none), bool(ordered))
+        is_model = _is_model(fields)
+        plans, maxsize = (self._plans, self.maxsize) if is_model else (self._dict_plans, self.dict_maxsize)
+        with self._lock:
+            plan = plans.get(key)
+            if plan is not None:
+                plans.move_to_end(key)
+                self.hits += 1
+                return plan
+        if not is_model:
+            with self._lock:
+                seen = self._dict_seen.pop(key, None)
+                if seen is None:
+                    self.misses += 1
+                    self._dict_seen[key] = True
+                    while len(self._dict_seen) > self.dict_maxsize:
+                        self._dict_seen.popitem(last=False)
+            if seen is None:
+                # First seen, the plan is built for this call only
+                return MarshalPlan(fields, resolve_fields(fields, mask), bool(skip_none), bool(ordered))
+            # The plan must not follow later changes of the dict it is keyed on
+            fields = _copy_dict(fields)
+        plan = MarshalPlan(fields, resolve_fields(fields, mask), bool(skip_none), bool(ordered))
+        with self._lock:
+            self.misses += 1
+            plans[key] = plan
+            while len(plans) > maxsize:
+                plans.popitem(last=False)
+        return plan
+
+    def info(self):
+        """Get the cache statistics as a ``(hits, misses, maxsize, currsize)`` named tuple"""
+        return PlanCacheInfo(self.hits, self.misses, self.maxsize, len(self._plans) + len(self._dict_plans))
+
+    def clear(self):
+        """Drop all plans and reset the statistics"""
+        with self._lock:
+            self._plans.clear()
+            self._dict_plans.clear()
+            self._dict_seen.clear()
+            self.hits = self.misses = 0
+
+
+#: The default plan cache used by :func:`marshal` and :func:`compile_marshaller`
+plan_cache = PlanCache()
+
+
+def _is_model(fields):
+    '''Wether or not the fields track their own state (ie. a :class:`~sanic_restplus.Model`)'''
+    return getattr(type(fields), '_stamp', None) is not None
+
+
+def _copy_dict(fields):
+    '''Copy a plain dict of fields and the plain dicts nested in it'''
+    return type(fields)((key, _copy_dict(value) if isinstance(value, dict) else value)
+                        for key, value in fields.items())
+
+
+def _fields_key(fields):
+    '''Identify a model by its identity and state and a plain dict of fields by its content'''
+    stamp = getattr(fields, '_stamp', None)
+    if stamp is not None:
+        return (id(fields), stamp)
+    return tuple((key, _fields_key(value) if isinstance(value, dict) else value)
+                 for key, value in fields.items())
+
+
+def _compile(fields, skip_none, ordered, source=None):
+    # ugly local import to avoid dependency loop
+    from .fields import Wildcard
+
+    steps = []
+    has_wildcards = False
+    for key, value in fields.items():
+        if isinstance(value, dict):
+            steps.append((key, compile_marshaller(value, skip_none=skip_none, ordered=ordered), skip_none, False))
+            continue
+        field = make(value)
+        is_wildcard = isinstance(field, Wildcard)
+        has_wildcards = has_wildcards or is_wildcard
+        step = field.compile(key, ordered=ordered, source=source)
+        steps.append((key, step, _skips_none(field, skip_none), is_wildcard))
+
+    if has_wildcards:
+        marshal_one = _compile_wildcard_steps(tuple(steps), ordered)
+    else:
+        marshal_one = _compile_steps(tuple((key, step, skip) for key, step, skip, _ in steps), ordered)
+
+    # Only compiled when marshalling some columns
+    columns_marshaller = []
+
+    def marshaller(data):
+        if isinstance(data, (list, tuple)):
+            return [marshaller(d) for d in data]
+        elif isinstance(data, Columns):
+            if not columns_marshaller:
+                columns_marshaller.append(_compile_columns(fields, skip_none, ordered, marshal_one))
+            return columns_marshaller[0](data)
+        return marshal_one(data)
+
+    marshaller.marshal_one = marshal_one
+    # The output keys, unknown with wildcards
+    marshaller.keys = None if has_wildcards else tuple(key for key, _, _, _ in steps)
+    return marshaller
+
+
+def _compile_columns(fields, skip_none, ordered, marshal_one):
+    '''Build the marshaller of :class:`Columns`: every field outputs its whole column then the rows are assembled'''
+    # ugly local import to avoid dependency loop
+    from .fields import Wildcard
+
+    steps = []
+    for key, value in fields.items():
+        if isinstance(value, dict):
+            nested = compile_marshaller(value, skip_none=skip_none, ordered=ordered).marshal_one
+            steps.append((key, partial(_output_rows, nested), skip_none))
+            continue
+        field = make(value)
         if isinstance(field, Wildcard):
-            has_wildcards['present'] = True
-        value = field.output(key, data, ordered=ordered)
-        return (key, value)
+            # Wildcards output a variable set of keys
+            return partial(_output_rows, marshal_one)
+        steps.append((key, field.compile_column(key), _skips_none(field, skip_none)))
 
-    items = (
-        (k, marshal(data, v, skip_none=skip_none, ordered=ordered))
-        if isinstance(v, dict)
-        else __format_field(k, v)
-        for k, v in fields.items()
-    )
+    factory = OrderedDict if ordered else dict
+    keys = tuple(key for key, _, _ in steps)
+    skips = tuple(skip for _, _, skip in steps)
+    columns_steps = tuple(step for _, step, _ in steps)
 
-    if skip_none:
-        items = ((k, v) for k, v in items
-                 if v is not None and v != OrderedDict() and v != {})
+    if not any(skips):
+        def marshal_columns(columns):
+            if not keys:
+                return [factory() for _ in range(len(columns))]
+            return [factory(zip(keys, row)) for row in zip(*[step(columns) for step in columns_steps])]
+        return marshal_columns
 
-    out = OrderedDict(items) if ordered else dict(items)
+    def marshal_columns(columns):
+        rows = []
+        for row in zip(*[step(columns) for step in columns_steps]):
+            out = factory()
+            for key, skip, value in zip(keys, skips, row):
+                # Avoid comparing to new empty dicts
+                if skip and (value is None or (isinstance(value, dict) and not value)):
+                    continue
+                out[key] = value
+            rows.append(out)
+        return rows
+    return marshal_columns
 
-    if envelope:
-        out = OrderedDict([(envelope, out)]) if ordered else {envelope: out}
 
-    return out, has_wildcards['present']
+def _output_rows(output, columns):
+    return [output(row) for row in columns.rows]
+
+
+def _skips_none(field, skip_none):
+    '''Wether or not the ``None`` or empty values of a field are skipped, given the marshalling flag'''
+    override = getattr(field, 'skip_if_none', None)
+    return skip_none if override is None else override
+
+
+def _compile_steps(steps, ordered):
+    factory = OrderedDict if ordered else dict
+    if not any(skip for _, _, skip in steps):
+        steps = tuple((key, step) for key, step, _ in steps)
+        if ordered:
+            def marshal_one(data):
+                return OrderedDict([(key, step(data)) for key, step in steps])
+        else:
+            def marshal_one(data):
+                return {key: step(data) for key, step in steps}
+        return marshal_one
+
+    def marshal_one(data):
+        out = factory()
+        for key, step, skip in steps:
+            value = step(data)
+            # Avoid comparing to new empty dicts
+            if skip and (value is None or (isinstance(value, dict) and not value)):
+                continue
+            out[key] = value
+        return out
+    return marshal_one
+
+
+def _compile_wildcard_steps(steps, ordered):
+    """
+    Build the single pass marshaller for fields containing some :class:`~fields.Wildcard`.
+
+    Wildcard steps return all their matching ``(key, value)`` pairs at once
+    and exclude the keys already output since the previous wildcard.
+    """
+    factory = OrderedDict if ordered else dict
+
+    def marshal_one(data):
+        out = factory()
+        keys = []
+        for key, step, skip, is_wildcard in steps:
+            if is_wildcard:
+                pairs = step(data, exclude=set(keys))
+                keys = []
+            else:
+                value = step(data)
+                keys.append(key)
+                pairs = ((key, value),)
+            for key, value in pairs:
+                if skip and (value is None or (isinstance(value, dict) and not value)):
+                    continue
+                out[key] = value
+        return out
+    return marshal_one
+
+
+def _compile_encoder(fields, skip_none, source=None):
+    # ugly local import to avoid dependency loop
+    from .fields import Wildcard
+
+    fields = [(key, value if isinstance(value, dict) else make(value)) for key, value in fields.items()]
+    if any(isinstance(field, Wildcard) for _, field in fields):
+        # Wildcards output a variable set of keys: encode the marshalled dict instead
+        marshal_one = _compile(OrderedDict(fields), skip_none, False, source).marshal_one
+
+        def encode_one(data):
+            return dumps_bytes(marshal_one(data))
+    else:
+        steps = []
+        for key, field in fields:
+            if isinstance(field, dict):
+                step = compile_encoder(field, skip_none=skip_none).encode_one
+            else:
+                step = field.compile_json(key, source=source)
+            steps.append((dumps_bytes(key), step, _skips_none(field, skip_none)))
+        encode_one = _compile_encoder_steps(tuple(steps))
+
+    # Columns are marshalled by column then encoded
+    columns_marshaller = []
+
+    def encoder(data):
+        if isinstance(data, (list, tuple)):
+            return b'[' + b','.join([encoder(d) for d in data]) + b']'
+        elif isinstance(data, Columns):
+            if not columns_marshaller:
+                columns_marshaller.append(_compile(OrderedDict(fields), skip_none, False, source))
+            return dumps_bytes(columns_marshaller[0](data))
+        return encode_one(data)
+
+    encoder.encode_one = encode_one
+    return encoder
+
+
+def _compile_encoder_steps(steps):
+    if any(skip for _, _, skip in steps):
+        steps = tuple((key + b':', step, skip) for key, step, skip in steps)
+
+        def encode_one(data):
+            parts = []
+            for prefix, step, skip in steps:
+                value = step(data)
+                if skip and (value == b'null' or value == b'{}'):
+                    continue
+                parts.append(prefix + value)
+            return b'{' + b','.join(parts) + b'}'
+    else:
+        # A single formatting operation per object
+        template = b'{' + b','.join(key.replace(b'%', b'%%') + b':%b' for key, _, _ in steps) + b'}'
+        steps = tuple(step for _, step, _ in steps)
+
+        def encode_one(data):
+            return template % tuple([step(data) for step in steps])
+    return encode_one
 
 
 class marshal_with(object):
@@ -222,18 +1340,134 @@ class marshal_with(object):
 
     see :meth:`flask_restplus.marshal`
     """
-    def __init__(self, fields, envelope=None, skip_none=False, mask=None, ordered=False):
+    def __init__(self, fields, envelope=None, skip_none=False, mask=None, ordered=False,
+                 stream=False, chunk_size=DEFAULT_CHUNK_SIZE, as_bytes=False, offload=None, memoize=False,
+                 concurrency=None, layouts=None):
         """
         :param fields: a dict of whose keys will make up the final
                        serialized response output
         :param envelope: optional key that will be used to envelop the serialized
                          response
+        :param bool stream: If ``True``, collections (including asynchronous iterables)
+                            are marshalled incrementally and written as a streaming JSON response
+        :param int chunk_size: the number of rows marshalled and written at once when streaming
+        :param bool as_bytes: If ``True``, data is marshalled straight to JSON bytes
+                              (see :func:`marshal_json`), unless the ``RESTPLUS_JSON`` settings are set
+        :param offload: An optional object deciding which collections are big enough to be marshalled
+                        (and encoded with ``as_bytes`` or when it ``encodes_json``) out of the event loop
+                        and providing the ``executor`` to use
+                        (ie. an :class:`~sanic_restplus.Api` or a :class:`~sanic_restplus.Namespace`)
+        :param bool memoize: If ``True``, nested objects appearing several times in a response
+                             are only marshalled once (see :func:`memoizing`)
+        :param int concurrency: the maximum number of :class:`~sanic_restplus.fields.Async` values
+                                awaited at once (see :func:`marshal_async`)
+        :param layouts: the compact layouts (a name or a list of :data:`LAYOUTS`) clients can request
+                        for collections with the ``layout`` parameter of the ``Accept`` media type
+                        (see :func:`requested_layout` and :func:`to_layout`)
         """
         self.fields = fields
         self.envelope = envelope
         self.skip_none = skip_none
         self.ordered = ordered
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.as_bytes = as_bytes
+        self.offload = offload
+        self.memoize = memoize
+        self.concurrency = concurrency
+        self.layouts = (layouts,) if isinstance(layouts, str) else tuple(layouts or ())
+        for layout in self.layouts:
+            if layout not in LAYOUTS:
+                raise ValueError('Unknown layout {0!r}, expected one of {1}'.format(layout, ', '.join(LAYOUTS)))
         self.mask = Mask(mask, skip=True)
+        # Plain dicts have no state to track: they are identified once, when decorating
+        self._dict_key = None if _is_model(fields) else _fields_key(fields)
+        # The values computed from the fields, only valid for a given fields state, see :meth:`_cached`
+        self._state = None
+        self._cache = {}
+
+    def marshaller(self, mask=None):
+        '''
+        Get the compiled marshaller for a given request mask.
+
+        The marshaller for the default mask is compiled once and kept on the decorator
+        until the fields change.
+        '''
+        if mask:
+            return plan_cache.get(self.fields, mask, self.skip_none, self.ordered, self.fields_key).marshaller
+        return self._cached('marshaller', partial(compile_marshaller, self.fields, self.skip_none,
+                                                  self.ordered, self.mask))
+
+    def encoder(self, mask=None):
+        '''
+        Get the compiled JSON encoder for a given request mask.
+
+        The encoder for the default mask is compiled once and kept on the decorator
+        until the fields change.
+        '''
+        if mask:
+            return plan_cache.get(self.fields, mask, self.skip_none, fields_key=self.fields_key).encoder
+        return self._cached('encoder', partial(compile_encoder, self.fields, self.skip_none, self.mask))
+
+    def projection(self, mask=None):
+        '''
+        Get the dotted attribute paths read from the results for a given request mask
+        (see :func:`projection`).
+
+        The projection for the default mask is computed once and kept on the decorator
+        until the fields change.
+        '''
+        if mask:
+            return plan_cache.get(self.fields, mask, fields_key=self.fields_key).projection
+        return self._cached('projection', partial(projection, self.fields, self.mask))
+
+    @property
+    def awaits(self):
+        '''Wether or not the fields have awaitable values to resolve (see :func:`marshal_async`)'''
+        return self._cached('awaits', partial(has_awaitables, self.fields))
+
+    @property
+    def fields_key(self):
+        '''
+        Identify the fields and their state (see :class:`PlanCache`).
+
+        Models are tracked as they change while plain dicts are read once, when decorating.
+        '''
+        return _fields_key(self.fields) if self._dict_key is None else self._dict_key
+
+    def _cached(self, name, build):
+        '''Get a value computed by ``build`` from the fields, computing it again once they changed'''
+        state = self.fields_key
+        if state != self._state:
+            self._state = state
+            self._cache = {}
+        value = self._cache.get(name)
+        if value is None:
+            value = self._cache[name] = build()
+        return value
+
+    def layout(self, request):
+        '''Get the compact layout requested by the client among the allowed ones, if any'''
+        return requested_layout(request, self.layouts) if self.layouts else None
+
+    def marshal(self, data, mask=None, layout=None):
+        '''
+        Marshal ``data`` with the compiled marshaller, handling the envelope.
+
+        Lists and tuples are marshalled as a batch (see :func:`marshal_many`)
+        and converted to the given compact ``layout`` if any (see :func:`to_layout`).
+        '''
+        marshaller = self.marshaller(mask)
+        if layout is not None:
+            out = _marshal_layout(marshaller, data, layout, self.ordered, self.memoize)
+        elif isinstance(data, (list, tuple)):
+            marshal_one = marshaller.marshal_one
+            if self.memoize:
+                marshal_one = memoizing(marshal_one)
+            out = [marshal_one(item) for item in data]
+        else:
+            out = memoizing(marshaller)(data) if self.memoize else marshaller(data)
+        return _envelop(out, self.envelope, self.ordered)
 
     def __call__(self, f):
         @wraps(f)
@@ -248,28 +1482,108 @@ class marshal_with(object):
                     continue
             else:
                 raise RuntimeError("@marshall_with should be used on an endpoint with request in its args")
-            resp = f(*args, **kwargs)
-            mask = self.mask
 
             #if self.mask_header:
             #if has_app_context():
             #mask_header = current_app.config['RESTPLUS_MASK_HEADER']
             mask_header = 'X-Fields'
-            mask = request.headers.get(mask_header) or mask
+            mask = request.headers.get(mask_header)
+            layout = self.layout(request)
+            # JSON bytes can't be encoded with the application settings (ie. indent)
+            as_bytes = self.as_bytes and not json_settings(request)
+            ctx = getattr(request, 'ctx', None)
+            if ctx is not None:
+                ctx.restplus_projection = _RequestProjection(self, mask)
+            resp = f(*args, **kwargs)
             while inspect.isawaitable(resp):
                 resp = await resp
             if isinstance(resp, tuple):
                 data, code, headers = unpack(resp)
-                return (
-                    marshal(data, self.fields, self.envelope, self.skip_none, mask, self.ordered),
-                    code,
-                    headers
-                )
             else:
-                return marshal(resp, self.fields, self.envelope, self.skip_none, mask, self.ordered)
+                data, code, headers = resp, None, None
+            is_async = is_async_iterable(data)
+            if layout is not None and is_async:
+                # Compact layouts are built from whole collections
+                data = await _collect(data)
+                is_async = False
+            if self.stream and layout is None and (is_async or isinstance(data, (list, tuple, Iterator))):
+                marshal_one = self.marshaller(mask).marshal_one
+                if self.memoize:
+                    marshal_one = memoizing(marshal_one)
+                if self.awaits:
+                    rows = iter_marshal_resolved(data, marshal_one, self.chunk_size, self.concurrency)
+                elif is_async:
+                    rows = iter_marshal_async(data, marshal_one)
+                else:
+                    rows = map(marshal_one, data)
+                return output_json_stream(request, rows, code or 200, headers,
+                                          chunk_size=self.chunk_size, envelope=self.envelope)
+            if self.awaits:
+                # Awaitables can't be encoded straight to JSON nor sent to an executor
+                if is_async:
+                    data = await _collect(data)
+                out = await _marshal_resolved(partial(self.marshal, mask=mask, layout=layout), data, self.concurrency)
+                if as_bytes:
+                    out = RawJSON(dumps_bytes(out))
+            elif not is_async and self.offload is not None and self.offload.should_offload(data):
+                # The data and the model are sent as is, so they must be picklable for process pools
+                mask = mask or (str(self.mask) if self.mask else None)
+                executor = self.offload.executor
+                encodes_json = getattr(self.offload, 'encodes_json', None)
+                if not as_bytes and encodes_json is not None and not json_settings(request):
+                    # Encoded there too rather than sent back to be offloaded again for encoding
+                    as_bytes = encodes_json(request)
+                if executor is not None and not as_bytes and layout is None:
+                    # Marshalled in parallel chunks, each worker compiling the model once
+                    out = await marshal_many_async(data, self.fields, self.envelope, self.skip_none, mask,
+                                                   self.ordered, executor, self.chunk_size, self.memoize)
+                else:
+                    if as_bytes:
+                        task = partial(marshal_json, data, self.fields, self.envelope, self.skip_none, mask,
+                                       self.memoize, layout)
+                    else:
+                        task = partial(_marshal_offloaded, data, self.fields, self.envelope, self.skip_none, mask,
+                                       self.ordered, self.memoize, layout)
+                    out = await asyncio.get_event_loop().run_in_executor(executor, task)
+            elif as_bytes and layout is not None:
+                out = RawJSON(dumps_bytes(self.marshal(data, mask, layout)))
+            elif as_bytes:
+                if is_async:
+                    data = await _collect(data)
+                encoder = self.encoder(mask)
+                out = _envelop_json((memoizing(encoder) if self.memoize else encoder)(data), self.envelope)
+            elif is_async:
+                marshal_one = self.marshaller(mask).marshal_one
+                if self.memoize:
+                    marshal_one = memoizing(marshal_one)
+                out = await _marshal_async_iterable(data, marshal_one, self.envelope, self.ordered)
+            else:
+                out = self.marshal(data, mask, layout)
+            if code is None:
+                return out
+            return out, code, headers
         return wrapper
 
 
+class _RequestProjection(object):
+    '''The paths read from the results for a request mask, only computed once called (see :func:`projection`)'''
+    __slots__ = ('decorator', 'mask', 'paths')
+
+    def __init__(self, decorator, mask):
+        self.decorator = decorator
+        self.mask = mask
+        self.paths = None
+
+    def __call__(self):
+        if self.paths is None:
+            try:
+                self.paths = self.decorator.projection(self.mask)
+            except MaskError:
+                # Let the marshalling report the mask error, after the handler as usual
+                self.paths = ('*',)
+        return self.paths
+
+
 class marshal_with_field(object):
     """
     A decorator that formats the return values of your methods with a single field.
@@ -2,6 +2,7 @@
 #
 import logging
 import re
+import threading
 from collections import OrderedDict
 from inspect import isclass
 
@@ -109,10 +110,11 @@ class Mask(OrderedDict):
         # Should handle lists
         if isinstance(data, (list, tuple, set)):
             return [self.apply(d) for d in data]
-        elif isinstance(data, (fields.Nested, fields.List, fields.Polymorph)):
+        elif isinstance(data, (fields.Nested, fields.List, fields.Polymorph, fields.Async)):
             return data.clone(self)
         elif type(data) == fields.Raw:
-            return fields.Raw(default=data.default, attribute=data.attribute, mask=self)
+            return fields.Raw(default=data.default, attribute=data.attribute, mask=self,
+                              skip_if_none=data.skip_if_none, lazy=data.lazy)
         elif data == fields.Raw:
             return fields.Raw(mask=self)
         elif isinstance(data, fields.Raw) or isclass(data) and issubclass(data, fields.Raw):
@@ -128,6 +130,9 @@ class Mask(OrderedDict):
         '''
         Handle the data filtering given a parsed mask
 
+        Lazy fields (see :class:`~sanic_restplus.fields.Raw`) are only kept if explicitly named:
+        they are left out by ``*`` and pruned from the nested models of the fields kept whole.
+
         :param dict data: the raw data to filter
         :param list mask: a parsed mask tofilter against
         :param bool skip: whether or not to skip missing fields
@@ -148,12 +153,12 @@ class Mask(OrderedDict):
             elif self.skip and field not in data:
                 continue
             else:
-                out[field] = data.get(field, None)
+                out[field] = keep(data.get(field, None))
 
         if '*' in self.keys():
             for key, value in data.items():
-                if key not in out:
-                    out[key] = value
+                if key not in out and not is_lazy(value):
+                    out[key] = keep(value)
         return out
 
     def __str__(self):
@@ -163,6 +168,71 @@ class Mask(OrderedDict):
         ]))
 
 
+def is_lazy(field):
+    '''Wether or not ``field`` is a lazy field instance'''
+    from . import fields
+    return isinstance(field, fields.Raw) and field.lazy
+
+
+def keep(field):
+    '''
+    Keep a whole field, pruning the lazy fields of its nested models.
+
+    Fields without lazy nested fields are returned as is.
+    Otherwise a copy is masked with ``*``: the nested models are only pruned
+    when they are compiled, so self-referencing models are handled level by level.
+    '''
+    from . import fields
+    if isinstance(field, fields.Async):
+        container = keep(field.container)
+        return field if container is field.container else field.with_container(container)
+    elif isinstance(field, fields.List):
+        container = keep(field.container)
+        if container is field.container:
+            return field
+        kwargs = field._attrs()
+        kwargs.pop('container')
+        return field.__class__(container, **kwargs)
+    elif isinstance(field, fields.Nested) and not field.mask and _has_lazy(field):
+        if isinstance(field, fields.Polymorph):
+            return field.clone(Mask('*'))
+        kwargs = field._attrs()
+        model = kwargs.pop('model')
+        kwargs['mask'] = Mask('*')
+        return field.__class__(model, **kwargs)
+    return field
+
+
+# The models being searched for lazy fields, to stop on self-referencing models.
+# Models are tracked by name because resolving a self-referencing model copies its nested models.
+_searching = threading.local()
+
+
+def _has_lazy(field):
+    '''Wether or not the nested models of a field (recursively) have lazy fields'''
+    from . import fields
+    if isinstance(field, (fields.List, fields.Async)):
+        field = field.container
+    if isinstance(field, fields.Polymorph):
+        models = [model.resolved for model in field.mapping.values()]
+    elif isinstance(field, fields.Nested):
+        models = [field.nested]
+    else:
+        return False
+    in_progress = _searching.__dict__.setdefault('models', set())
+    for model in models:
+        key = getattr(model, 'name', None) or id(model)
+        if key in in_progress:
+            continue
+        in_progress.add(key)
+        try:
+            if any(is_lazy(value) or _has_lazy(value) for value in model.values()):
+                return True
+        finally:
+            in_progress.discard(key)
+    return False
+
+
 def apply(data, mask, skip=False):
     '''
     Apply a fields mask to the data.
@@ -42,12 +42,24 @@ class ModelBase(object):
         }
         self.name = name
         self.__parents__ = []
+        self._bind_instance_methods()
 
+    def _bind_instance_methods(self):
         def instance_inherit(name, *parents):
             return self.__class__.inherit(name, self, *parents)
 
         self.inherit = instance_inherit
 
+    def __getstate__(self):
+        # Instance methods are closures which can't be pickled
+        state = self.__dict__.copy()
+        state.pop('inherit', None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._bind_instance_methods()
+
     @property
     def ancestors(self):
         '''
@@ -122,6 +134,9 @@ class RawModel(ModelBase):
 
     :param str name: The model public name
     :param str mask: an optional default model mask
+    :param type source: an optional hint on the type of the marshalled objects
+        (ie. ``dict``, a named tuple or any attribute based class), used to specialize the fields accessors
+        with its :mod:`~sanic_restplus.sources` adapter
     '''
 
     wrapper = dict
@@ -130,12 +145,95 @@ class RawModel(ModelBase):
         self.__mask__ = kwargs.pop('mask', None)
         if self.__mask__ and not isinstance(self.__mask__, Mask):
             self.__mask__ = Mask(self.__mask__)
+        self.__source__ = kwargs.pop('source', None)
+        # Bumped on every change of the fields or the parents, see :meth:`_changed`
+        self._revision = 0
+        # The resolved copy and the compiled marshallers are only valid for a given stamp
+        self._cache_stamp = None
+        self._resolved_cache = None
+        self._compiled = {}
+        #: How many times this model has been resolved, for diagnostics
+        self.resolutions = 0
         super(RawModel, self).__init__(name, *args, **kwargs)
 
+    def _bind_instance_methods(self):
+        super(RawModel, self)._bind_instance_methods()
+
         def instance_clone(name, *parents):
             return self.__class__.clone(name, self, *parents)
         self.clone = instance_clone
 
+    def __getstate__(self):
+        state = super(RawModel, self).__getstate__()
+        state.pop('clone', None)
+        # The resolved copy and the compiled marshallers are rebuilt on demand
+        state['_cache_stamp'] = None
+        state['_resolved_cache'] = None
+        state['_compiled'] = {}
+        return state
+
+    @property
+    def __parents__(self):
+        return self._parents
+
+    @__parents__.setter
+    def __parents__(self, parents):
+        self._parents = parents
+        self._changed()
+
+    def _changed(self):
+        # Unpickling sets the items before restoring the state
+        self._revision = getattr(self, '_revision', 0) + 1
+
+    @property
+    def _stamp(self):
+        '''Identify the current state of the model and its parents'''
+        return (self._revision,) + tuple(getattr(p, '_stamp', None) for p in self.__parents__)
+
+    def _refresh(self):
+        stamp = self._stamp
+        if self._cache_stamp != stamp:
+            self._cache_stamp = stamp
+            self._resolved_cache = None
+            self._compiled = {}
+
+    @property
+    def _marshallers(self):
+        '''Compiled marshallers, see :func:`~sanic_restplus.marshalling.compile_marshaller`'''
+        self._refresh()
+        return self._compiled
+
+    def __setitem__(self, key, value):
+        super(RawModel, self).__setitem__(key, value)
+        self._changed()
+
+    def __delitem__(self, key):
+        super(RawModel, self).__delitem__(key)
+        self._changed()
+
+    def update(self, *args, **kwargs):
+        super(RawModel, self).update(*args, **kwargs)
+        self._changed()
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def pop(self, *args):
+        value = super(RawModel, self).pop(*args)
+        self._changed()
+        return value
+
+    def popitem(self, *args):
+        item = super(RawModel, self).popitem(*args)
+        self._changed()
+        return item
+
+    def clear(self):
+        super(RawModel, self).clear()
+        self._changed()
+
     @property
     def _schema(self):
         properties = self.wrapper()
@@ -158,13 +256,16 @@ class RawModel(ModelBase):
         })
 
 
-    def _resolved(self):
+    @property
+    def resolved(self):
         '''
         Resolve real fields before submitting them to marshal
+
+        The resolved copy is kept until the model or one of its parents changes.
         '''
-        already_resolved = self._resolved.already_resolved.get(id(self), False)
-        if already_resolved:
-            return already_resolved
+        self._refresh()
+        if self._resolved_cache is not None:
+            return self._resolved_cache
         # Duplicate fields
         res = copy.deepcopy(self)
 
@@ -173,17 +274,18 @@ class RawModel(ModelBase):
             res.update(parent.resolved)
 
         # Handle discriminator
-        candidates = [f for f in res.values() if getattr(f, 'discriminator', None)]
+        # Field classes only expose their slots descriptors: only instances can be discriminators
+        candidates = [f for f in res.values()
+                      if not isinstance(f, type) and getattr(f, 'discriminator', None)]
         # Ensure the is only one discriminator
         if len(candidates) > 1:
             raise ValueError('There can only be one discriminator by schema')
         # Ensure discriminator always output the model name
         elif len(candidates) == 1:
             candidates[0].default = self.name
-        self._resolved.already_resolved[id(self)] = res
+        self.resolutions += 1
+        self._resolved_cache = res
         return res
-    _resolved.already_resolved = {}
-    resolved = property(_resolved)
 
     def extend(self, name, fields):
         '''
@@ -224,7 +326,7 @@ class RawModel(ModelBase):
     def __deepcopy__(self, memo):
         obj = self.__class__(self.name,
                              [(key, copy.deepcopy(value, memo)) for key, value in self.items()],
-                             mask=self.__mask__)
+                             mask=self.__mask__, source=self.__source__)
         obj.__parents__ = self.__parents__
         return obj
 
@@ -28,10 +28,12 @@ class Namespace(object):
     :param list decorators: A list of decorators to apply to each resources
     :param bool validate: Whether or not to perform validation on this namespace
     :param bool ordered: Whether or not to preserve order on models and marshalling
+    :param bool as_bytes: Whether or not to marshal straight to JSON bytes by default
+        (see :func:`~sanic_restplus.marshal_json`)
     :param Api api: an optional API to attache to the namespace
     '''
     def __init__(self, name, description=None, path=None, decorators=None, validate=None,
-            authorizations=None, ordered=False, **kwargs):
+            authorizations=None, ordered=False, as_bytes=False, **kwargs):
         self.name = name
         self.description = description
         self._path = path
@@ -46,6 +48,7 @@ class Namespace(object):
         self.default_error_handler = None
         self.authorizations = authorizations
         self.ordered = ordered
+        self.as_bytes = as_bytes
         self.apis = []
         if 'api' in kwargs:
             self.apis.append(kwargs['api'])
@@ -54,6 +57,19 @@ class Namespace(object):
     def path(self):
         return (self._path or ('/' + self.name)).rstrip('/')
 
+    @property
+    def executor(self):
+        '''The executor big collections are offloaded to (see :class:`~sanic_restplus.Api`)'''
+        return self.apis[0].executor if self.apis else None
+
+    def should_offload(self, data):
+        '''Wether or not ``data`` is big enough to be marshalled out of the event loop'''
+        return bool(self.apis) and self.apis[0].should_offload(data)
+
+    def encodes_json(self, request):
+        '''Wether or not the response to ``request`` is encoded by the compact JSON representation'''
+        return bool(self.apis) and self.apis[0].encodes_json(request)
+
     def add_resource(self, resource, *urls, **kwargs):
         '''
         Register a Resource for a given API Namespace
@@ -142,14 +158,14 @@ class Namespace(object):
             api.models[name] = definition
         return definition
 
-    def model(self, name=None, model=None, mask=None, **kwargs):
+    def model(self, name=None, model=None, mask=None, source=None, **kwargs):
         '''
         Register a model
 
         .. seealso:: :class:`Model`
         '''
         cls = OrderedModel if self.ordered else Model
-        model = cls(name, model, mask=mask)
+        model = cls(name, model, mask=mask, source=source)
         model.__apidoc__.update(kwargs)
         return self.add_model(name, model)
 
@@ -238,6 +254,11 @@ class Namespace(object):
             },
             '__mask__': kwargs.get('mask', True),  # Mask values can't be determined outside app context
         }
+        layouts = kwargs.get('layouts')
+        if layouts:
+            doc['__layouts__'] = (layouts,) if isinstance(layouts, str) else tuple(layouts)
+        kwargs.setdefault('as_bytes', self.as_bytes)
+        kwargs.setdefault('offload', self)
         real_marshal_with = marshal_with(fields, ordered=self.ordered, **kwargs)
 
         def wrapper(func):
@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 import collections
+from itertools import islice
 
 from sanic_restplus._http import HTTPStatus
 
@@ -8,6 +9,11 @@ try:
 
     has_orjson = True
     has_ujson = False
+    try:
+        from orjson import OPT_SERIALIZE_NUMPY
+    except ImportError:
+        # orjson without native NumPy support
+        OPT_SERIALIZE_NUMPY = None
 except ImportError:
     has_orjson = False
     try:
@@ -16,15 +22,52 @@ except ImportError:
     except ImportError:
         has_ujson = False
 
-from json import dumps
+from json import dumps, loads
+from inspect import signature
+
+
+from sanic.response import text, stream, HTTPResponse
+
+#: The default number of rows encoded per chunk by :func:`output_json_stream`
+DEFAULT_CHUNK_SIZE = 1000
+
+
+class RawJSON(bytes):
+    '''
+    Already encoded JSON bytes, written as is by the JSON representations.
+
+    See :func:`~sanic_restplus.marshalling.marshal_json`.
+    '''
+    __slots__ = ()
+
+    def loads(self):
+        '''Decode back to Python objects (for non JSON representations)'''
+        return loads(self)
 
 
-from sanic.response import text, HTTPResponse
+if 'body_bytes' in signature(HTTPResponse.__init__).parameters:
+    # Sanic < 19.6 only accepts bytes bodies through ``body_bytes``
+    def json_bytes_response(body, code=200, headers=None):
+        '''Makes a response with an already encoded JSON body'''
+        return HTTPResponse(None, code, headers, content_type='application/json', body_bytes=body)
+else:
+    def json_bytes_response(body, code=200, headers=None):
+        '''Makes a response with an already encoded JSON body'''
+        return HTTPResponse(body, code, headers, content_type='application/json')
+
+
+def json_settings(request):
+    '''Get the ``RESTPLUS_JSON`` encoder settings of the application handling ``request``'''
+    config = getattr(getattr(request, 'app', None), 'config', None)
+    return config.get('RESTPLUS_JSON', {}) if config is not None else {}
+
 
 def output_json_pretty(request, data, code, headers=None):
     '''Makes a Flask response with a JSON encoded body'''
     current_app = request.app
     settings = current_app.config.get('RESTPLUS_JSON', {})
+    if isinstance(data, RawJSON):
+        data = data.loads()
 
     # If we're in debug mode, and the indent is not set, we set it to a
     # reasonable value here.  Note that this won't override any existing value
@@ -46,26 +89,140 @@ if has_ujson:
         if current_app.debug:
             return output_json_pretty(request, data, code, headers=headers)
         settings = current_app.config.get('RESTPLUS_JSON', {})
+        if isinstance(data, RawJSON):
+            if not settings:
+                return json_bytes_response(data + b"\n", code, headers)
+            # Encoded without the settings
+            data = data.loads()
         dumped = fast_dumps(data, **settings) + "\n"
         resp = text(dumped, code, headers, content_type='application/json')
         return resp
     output_json_fast = output_json_fast_ujson
 elif has_orjson:
     #orjson_opts = OPT_NON_STR_KEYS | OPT_NAIVE_UTC | OPT_UTC_Z
-    orjson_opts = OPT_NAIVE_UTC | OPT_UTC_Z
+    orjson_opts = OPT_NAIVE_UTC | OPT_UTC_Z | (OPT_SERIALIZE_NUMPY or 0)
 
     def orjson_default(obj):
         if isinstance(obj, collections.OrderedDict):
             return dict(obj)
+        elif hasattr(obj, 'tolist'):
+            # Arrays orjson can't serialize natively (not contiguous, unsupported dtype) and buffers
+            return obj.tolist()
         raise TypeError
     def output_json_fast_orjson(request, data, code, headers=None):
         current_app = request.app
         if current_app.debug:
             return output_json_pretty(request, data, code, headers=headers)
         settings = current_app.config.get('RESTPLUS_JSON', {})
+        if isinstance(data, RawJSON):
+            if not settings:
+                return json_bytes_response(data + b"\n", code, headers)
+            # Encoded without the settings
+            data = data.loads()
         dumped = fast_dumps(data, option=orjson_opts, default=orjson_default, **settings) + b"\n"
-        resp = HTTPResponse(None, code, headers, content_type='application/json', body_bytes=dumped)
-        return resp
+        return json_bytes_response(dumped, code, headers)
     output_json_fast = output_json_fast_orjson
 else:
     output_json_fast = output_json_pretty
+
+
+if has_orjson:
+    def dumps_bytes(data, **settings):
+        return fast_dumps(data, option=orjson_opts, default=orjson_default, **settings)
+elif has_ujson:
+    def dumps_bytes(data, **settings):
+        return fast_dumps(data, **settings).encode('utf-8')
+else:
+    def dumps_bytes(data, **settings):
+        return dumps(data, **settings).encode('utf-8')
+dumps_bytes.__doc__ = '''Encode some data as JSON bytes with the fastest available encoder'''
+
+#: Whether :func:`dumps_bytes` encodes NumPy arrays natively, without converting them to lists first
+encodes_numpy = has_orjson and OPT_SERIALIZE_NUMPY is not None
+
+
+# Strings are encoded the same way whatever the options
+encode_str = fast_dumps if has_orjson else dumps_bytes
+
+
+def encode_json(value):
+    '''Encode a single value as JSON bytes, with shortcuts for the most common scalar types'''
+    cls = type(value)
+    if cls is str:
+        return encode_str(value)
+    elif value is None:
+        return b'null'
+    elif cls is bool:
+        return b'true' if value else b'false'
+    elif cls is int:
+        return b'%d' % value
+    return dumps_bytes(value)
+
+
+def iter_chunks(rows, chunk_size):
+    '''Split an iterable or an asynchronous iterable into lists of ``chunk_size`` rows, asynchronously'''
+    return ChunkIterator(rows, chunk_size)
+
+
+class ChunkIterator(object):
+    '''
+    An asynchronous iterator over the lists of ``chunk_size`` rows of an iterable or an asynchronous iterable.
+
+    See :func:`iter_chunks`.
+    '''
+    def __init__(self, rows, chunk_size):
+        self.chunk_size = chunk_size
+        self.is_async = hasattr(rows, '__aiter__')
+        self.rows = rows.__aiter__() if self.is_async else iter(rows)
+        self.done = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.done:
+            raise StopAsyncIteration
+        if self.is_async:
+            chunk = []
+            while len(chunk) < self.chunk_size:
+                try:
+                    chunk.append(await self.rows.__anext__())
+                except StopAsyncIteration:
+                    self.done = True
+                    break
+        else:
+            chunk = list(islice(self.rows, self.chunk_size))
+        if not chunk:
+            self.done = True
+            raise StopAsyncIteration
+        return chunk
+
+
+def output_json_stream(request, rows, code=200, headers=None, chunk_size=DEFAULT_CHUNK_SIZE, envelope=None):
+    '''
+    Makes a streaming response writing a JSON array of rows.
+
+    Rows are consumed lazily and encoded ``chunk_size`` at a time,
+    so the whole array is never materialized in memory.
+
+    :param request: the current request
+    :param rows: an iterable or an asynchronous iterable of already marshalled rows
+    :param int code: the response status code
+    :param dict headers: optional response headers
+    :param int chunk_size: the number of rows encoded and written at once
+    :param str envelope: optional key that will be used to envelop the array
+    '''
+    settings = request.app.config.get('RESTPLUS_JSON', {})
+    opening = b'[' if not envelope else b'{' + dumps_bytes(envelope) + b':['
+    closing = b']\n' if not envelope else b']}\n'
+
+    async def streaming_fn(response):
+        separator = b''
+        await response.write(opening)
+        async for chunk in iter_chunks(rows, chunk_size):
+            # Strip the array brackets to join chunks
+            await response.write(separator + dumps_bytes(chunk, **settings)[1:-1])
+            separator = b','
+        await response.write(closing)
+
+    return stream(streaming_fn, code, headers, content_type='application/json')
@@ -7,6 +7,7 @@ from sanic.response import BaseHTTPResponse
 from sanic.constants import HTTP_METHODS
 
 from .model import ModelBase
+from .representations import RawJSON
 
 from .utils import unpack, best_match_accept_mimetype
 
@@ -122,11 +123,13 @@ class Resource(MethodViewExt, metaclass=ResourceMeta):
 
         mediatype = best_match_accept_mimetype(request, representations, default=None)
         if mediatype in representations:
-             # resp might be a coroutine. Wait for it
-             data, code, headers = unpack(resp)
-             resp = representations[mediatype](data, code, headers)
-             resp.headers['Content-Type'] = mediatype
-             return resp
+            # resp might be a coroutine. Wait for it
+            data, code, headers = unpack(resp)
+            if isinstance(data, RawJSON):
+                data = data.loads()
+            resp = representations[mediatype](data, code, headers)
+            resp.headers['Content-Type'] = mediatype
+            return resp
 
         return resp
 
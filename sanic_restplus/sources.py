@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+#
+from collections.abc import Mapping
+from functools import lru_cache
+from operator import attrgetter, itemgetter
+
+try:
+    import dataclasses
+except ImportError:
+    dataclasses = None
+
+__all__ = ('SourceAdapter', 'MappingAdapter', 'TupleAdapter', 'ObjectAdapter', 'DataclassAdapter',
+           'register_source', 'source_adapter')
+
+
+class SourceAdapter(object):
+    '''
+    Extract the values of the marshalled objects of a given type.
+
+    Adapters are built once per marshalled type, so they can inspect it ahead of time
+    and generate direct accessors (ie. an index for tuple rows)
+    instead of probing every object.
+
+    :param type cls: the marshalled objects type
+    '''
+    def __init__(self, cls):
+        self.cls = cls
+
+    def accessor(self, key):
+        '''
+        Build a ``callable(obj)`` extracting the ``key`` value from an object, or ``None`` if missing.
+
+        :param str key: the key or attribute name
+        '''
+        raise NotImplementedError
+
+    def to_dict(self, obj):
+        '''Convert an object into a mapping'''
+        raise NotImplementedError
+
+
+class MappingAdapter(SourceAdapter):
+    '''
+    Mappings and key-indexed rows (ie. ``asyncpg.Record``): values are looked up by key,
+    then by attribute.
+    '''
+    def accessor(self, key):
+        def get(obj):
+            try:
+                return obj[key]
+            except (LookupError, TypeError):
+                return getattr(obj, key, None)
+        return get
+
+    def to_dict(self, obj):
+        return obj
+
+
+class TupleAdapter(SourceAdapter):
+    '''
+    Tuple rows with known columns (ie. named tuples): values are extracted by index.
+
+    To register a row type not exposing its columns as ``_fields``:
+
+    .. code-block:: python
+
+        register_source(Row, partial(TupleAdapter, columns=('id', 'name')))
+
+    :param columns: the columns names, in order. Defaults to the type ``_fields``
+    '''
+    def __init__(self, cls, columns=None):
+        super(TupleAdapter, self).__init__(cls)
+        columns = cls._fields if columns is None else columns
+        self.indexes = dict((name, index) for index, name in enumerate(columns))
+
+    def accessor(self, key):
+        if key in self.indexes:
+            return itemgetter(self.indexes[key])
+        return _attribute_getter(key)
+
+    def to_dict(self, obj):
+        return dict((name, obj[index]) for name, index in self.indexes.items())
+
+
+class ObjectAdapter(SourceAdapter):
+    '''
+    Plain and ``__slots__`` based objects: values are extracted by attribute.
+    '''
+    def accessor(self, key):
+        return _attribute_getter(key)
+
+    def to_dict(self, obj):
+        data = {}
+        for name in slot_names(self.cls):
+            try:
+                data[name] = getattr(obj, name)
+            except AttributeError:
+                continue
+        data.update(getattr(obj, '__dict__', ()))
+        return data
+
+
+class DataclassAdapter(ObjectAdapter):
+    '''
+    Dataclasses: the fields set by ``__init__`` are always present and read directly.
+    '''
+    def __init__(self, cls):
+        super(DataclassAdapter, self).__init__(cls)
+        self.initialized = frozenset(field.name for field in dataclasses.fields(cls) if field.init)
+
+    def accessor(self, key):
+        if key in self.initialized:
+            return attrgetter(key)
+        return _attribute_getter(key)
+
+
+def _attribute_getter(key):
+    def get(obj):
+        return getattr(obj, key, None)
+    return get
+
+
+def _is_indexable(cls):
+    return hasattr(cls, '__iter__') or hasattr(cls, '__getitem__')
+
+
+@lru_cache(maxsize=None)
+def slot_names(cls):
+    '''The public slots declared by ``cls`` and its ancestors'''
+    names = []
+    for klass in reversed(cls.__mro__):
+        slots = klass.__dict__.get('__slots__', ())
+        for name in (slots,) if isinstance(slots, str) else slots:
+            if not name.startswith('_') and name not in names:
+                names.append(name)
+    return tuple(names)
+
+
+_registry = []
+
+
+def register_source(cls, adapter):
+    '''
+    Register the adapter used to extract the values of the ``cls`` objects (and its subclasses).
+
+    Latest registrations take precedence. Adapters are resolved once per type:
+    register them before marshalling.
+
+    :param type cls: the marshalled objects type (or an abstract base class)
+    :param adapter: a :class:`SourceAdapter` subclass or any ``callable(cls)`` building one
+    '''
+    _registry.append((cls, adapter))
+    source_adapter.cache_clear()
+
+
+@lru_cache(maxsize=256)
+def source_adapter(cls):
+    '''
+    Get the :class:`SourceAdapter` for the objects of type ``cls``.
+
+    Registered adapters come first, then named tuples, dataclasses and objects
+    neither iterable nor indexable are detected.
+
+    :return: the adapter or ``None`` if the type isn't handled
+    '''
+    for klass, adapter in reversed(_registry):
+        if issubclass(cls, klass):
+            return adapter(cls)
+    if issubclass(cls, tuple) and isinstance(getattr(cls, '_fields', None), tuple):
+        return TupleAdapter(cls)
+    if _is_indexable(cls):
+        return None
+    if dataclasses is not None and dataclasses.is_dataclass(cls):
+        return DataclassAdapter(cls)
+    return ObjectAdapter(cls)
+
+
+register_source(Mapping, MappingAdapter)
+
+try:
+    from asyncpg import Record
+except ImportError:
+    pass
+else:
+    register_source(Record, MappingAdapter)
@@ -42,6 +42,21 @@ RE_URL = re.compile(r'<([^:<>]+)(?::[^:<>]+)?>')
 DEFAULT_RESPONSE_DESCRIPTION = 'Success'
 DEFAULT_RESPONSE = {'description': DEFAULT_RESPONSE_DESCRIPTION}
 
+#: The schemas of the compact layouts of collections, see :func:`~sanic_restplus.marshalling.to_layout`
+LAYOUT_SCHEMAS = {
+    'rows': {
+        'type': 'object',
+        'properties': {
+            'fields': {'type': 'array', 'items': {'type': 'string'}},
+            'rows': {'type': 'array', 'items': {'type': 'array', 'items': {}}},
+        },
+    },
+    'columns': {
+        'type': 'object',
+        'additionalProperties': {'type': 'array', 'items': {}},
+    },
+}
+
 RE_RAISES = re.compile(r'^:raises\s+(?P<name>[\w\d_]+)\s*:\s*(?P<description>.*)$', re.MULTILINE)
 
 
@@ -413,6 +428,12 @@ class Swagger(object):
         # Handle 'produces' mimetypes documentation
         if 'produces' in doc[method]:
             operation['produces'] = doc[method]['produces']
+        # Handle compact layouts, requested with a media type parameter
+        layouts = doc[method].get('__layouts__')
+        if layouts:
+            produces = operation.get('produces') or list(self.api.representations.keys())
+            operation['produces'] = produces + ['application/json;layout={0}'.format(name) for name in layouts]
+            operation['x-layouts'] = dict((name, LAYOUT_SCHEMAS[name]) for name in layouts)
         # Handle deprecated annotation
         if doc.get('deprecated') or doc[method].get('deprecated'):
             operation['deprecated'] = True
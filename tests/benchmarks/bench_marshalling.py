@@ -1,8 +1,20 @@
+import os
+
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
 import pytest
 
 from faker import Faker
 
-from sanic_restplus import marshal, fields
+from sanic_restplus import marshal, marshal_many, marshal_json, fields, Columns
+from sanic_restplus.representations import dumps_bytes
+
+try:
+    import dataclasses
+except ImportError:
+    # Python < 3.7
+    dataclasses = None
 
 fake = Faker()
 
@@ -33,6 +45,13 @@ def family():
     }
 
 
+PersonRow = namedtuple('PersonRow', 'name age')
+
+SOURCES = [dict, PersonRow]
+if dataclasses is not None:
+    SOURCES.append(dataclasses.make_dataclass('PersonData', [('name', str), ('age', int)]))
+
+
 def marshal_simple():
     return marshal(person(), person_fields)
 
@@ -41,6 +60,18 @@ def marshal_nested():
     return marshal(family(), family_fields)
 
 
+def marshal_many_nested(families):
+    return marshal_many(families, family_fields)
+
+
+def marshal_many_nested_to_json(families):
+    return dumps_bytes(marshal_many(families, family_fields))
+
+
+def marshal_json_many_nested(families):
+    return marshal_json(families, family_fields)
+
+
 def marshal_simple_with_mask(app):
     with app.test_request_context('/', headers={'X-Fields': 'name'}):
         return marshal(person(), person_fields)
@@ -59,8 +90,115 @@ class MarshallingBenchmark(object):
     def bench_marshal_nested(self, benchmark):
         benchmark(marshal_nested)
 
+    def bench_marshal_many_nested(self, benchmark):
+        benchmark(marshal_many_nested, [family() for _ in range(1000)])
+
+    def bench_marshal_many_nested_to_json(self, benchmark):
+        benchmark(marshal_many_nested_to_json, [family() for _ in range(1000)])
+
+    def bench_marshal_json_many_nested(self, benchmark):
+        benchmark(marshal_json_many_nested, [family() for _ in range(1000)])
+
     def bench_marshal_simple_with_mask(self, app, benchmark):
         benchmark(marshal_simple_with_mask, app)
 
     def bench_marshal_nested_with_mask(self, app, benchmark):
         benchmark(marshal_nested_with_mask, app)
+
+
+@pytest.mark.benchmark(group='sources')
+@pytest.mark.parametrize('source', SOURCES)
+def bench_marshal_many_sources(benchmark, source):
+    rows = [source(**person()) for _ in range(1000)]
+    benchmark(marshal_many, rows, person_fields)
+
+
+series_fields = {
+    'timestamps': fields.List(fields.Integer),
+    'values': fields.List(fields.Float),
+    'labels': fields.List(fields.String),
+}
+
+
+@pytest.mark.benchmark(group='primitive-lists')
+def bench_marshal_primitive_lists(benchmark):
+    series = {
+        'timestamps': list(range(100000)),
+        'values': [float(i) for i in range(100000)],
+        'labels': [str(i) for i in range(100000)],
+    }
+    benchmark(marshal, series, series_fields)
+
+
+@pytest.mark.benchmark(group='numpy-series')
+@pytest.mark.parametrize('field', [fields.List(fields.Float), fields.Array(float)], ids=['list', 'array'])
+def bench_marshal_json_numpy_series(benchmark, field):
+    np = pytest.importorskip('numpy')
+    series = {'values': np.random.random(100000)}
+    benchmark(marshal_json, series, {'values': field})
+
+
+measure_fields = {
+    'sensor': fields.String,
+    'timestamp': fields.DateTime,
+    'value': fields.Float,
+    'count': fields.Integer,
+}
+
+
+@pytest.fixture(scope='module')
+def measures():
+    np = pytest.importorskip('numpy')
+    size = 10000
+    return {
+        'sensor': np.array(['sensor-%d' % (i % 10) for i in range(size)]),
+        'timestamp': np.arange(size).astype('datetime64[s]'),
+        'value': np.random.random(size),
+        'count': np.arange(size),
+    }
+
+
+@pytest.mark.benchmark(group='columnar-marshalling')
+def bench_marshal_rows(benchmark, measures):
+    rows = [dict(zip(measures, values)) for values in zip(*[column.tolist() for column in measures.values()])]
+    benchmark(marshal, rows, measure_fields)
+
+
+@pytest.mark.benchmark(group='columnar-marshalling')
+def bench_marshal_columns(benchmark, measures):
+    benchmark(marshal, Columns(measures), measure_fields)
+
+
+wide_fields = dict(('measure_{0:02d}'.format(i), fields.Float) for i in range(50))
+
+
+@pytest.fixture(scope='module')
+def wide_rows():
+    return [dict((key, fake.pyfloat()) for key in wide_fields) for _ in range(2000)]
+
+
+@pytest.mark.benchmark(group='layout-marshalling')
+@pytest.mark.parametrize('layout', [None, 'rows', 'columns'])
+def bench_marshal_json_wide_layout(benchmark, wide_rows, layout):
+    benchmark.extra_info['size'] = len(marshal_json(wide_rows, wide_fields, layout=layout))
+    benchmark(marshal_json, wide_rows, wide_fields, layout=layout)
+
+
+@pytest.fixture(scope='module')
+def families():
+    return [family() for _ in range(20000)]
+
+
+@pytest.mark.benchmark(group='sharded-marshalling')
+def bench_marshal_many_unsharded(benchmark, families):
+    benchmark(marshal_many, families, family_fields)
+
+
+@pytest.mark.benchmark(group='sharded-marshalling')
+@pytest.mark.parametrize('workers', sorted({1, 2, 4, os.cpu_count() or 1}))
+class ShardedMarshallingBenchmark(object):
+    def bench_marshal_many_sharded(self, benchmark, families, workers):
+        with ProcessPoolExecutor(workers) as executor:
+            # Warm up the workers: spawn them and compile the plan
+            marshal_many(families[:workers], family_fields, executor=executor, chunk_size=1)
+            benchmark(marshal_many, families, family_fields, executor=executor, chunk_size=2000)
@@ -0,0 +1,56 @@
+import copy
+import tracemalloc
+
+import pytest
+
+from sanic_restplus import fields, Model
+
+MODELS = 100
+
+
+def build_models():
+    models = []
+    for i in range(MODELS):
+        address = Model('Address{0}'.format(i), {
+            'road': fields.String(required=True, min_length=1),
+            'zip': fields.String(pattern=r'\d{5}'),
+            'city': fields.String,
+        })
+        models.append(Model('Person{0}'.format(i), {
+            'name': fields.String(required=True, description='The name'),
+            'age': fields.Integer(min=0),
+            'weight': fields.Float,
+            'birthdate': fields.DateTime,
+            'active': fields.Boolean(default=True),
+            'address': fields.Nested(address),
+            'tags': fields.List(fields.String),
+        }))
+    return models
+
+
+def copy_models(models):
+    # What model resolution does (resolutions themselves are cached)
+    return [copy.deepcopy(model) for model in models]
+
+
+def allocated(func, *args):
+    '''Memory allocated by ``func`` and still in use once it returns'''
+    tracemalloc.start()
+    try:
+        result = func(*args)  # noqa: F841 (keep the result alive while measuring)
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return size
+
+
+@pytest.mark.benchmark(group='memory')
+class MemoryBenchmark(object):
+    def bench_build_models(self, benchmark):
+        benchmark.extra_info['bytes'] = allocated(build_models)
+        benchmark(build_models)
+
+    def bench_copy_models(self, benchmark):
+        models = build_models()
+        benchmark.extra_info['bytes'] = allocated(copy_models, models)
+        benchmark(copy_models, models)
@@ -1,12 +1,14 @@
 # -*- coding: utf-8 -*-
 import pytest
 
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from sanic import Sanic, Blueprint
 from sanic.websocket import WebSocketProtocol
 from uuid import uuid4
 from spf import SanicPluginsFramework
 import sanic_restplus
 from sanic_restplus import restplus
+from sanic_restplus.marshalling import _sent_plans, _worker_marshallers, _worker_marshallers_lock
 
 # class TestClient(SanicTestClient):
 #     def get_json(self, url, status=200, **kwargs):
@@ -53,6 +55,28 @@ def api(request, app):
     app.register_blueprint(blueprint)
     yield api
 
+@pytest.fixture
+def executor(request):
+    '''
+    A single worker executor, shut down after the test.
+
+    Parametrize it indirectly with ``'threads'`` (the default), ``'processes'``
+    or ``'default'`` for the event loop default executor (``None``).
+    '''
+    kind = getattr(request, 'param', 'threads')
+    if kind == 'default':
+        yield None
+        return
+    executor = {'threads': ThreadPoolExecutor, 'processes': ProcessPoolExecutor}[kind](1)
+    yield executor
+    executor.shutdown()
+    # Don't let the plans sent to this executor (or compiled by its threads) leak to other tests
+    _sent_plans.pop(executor, None)
+    if kind == 'threads':
+        with _worker_marshallers_lock:
+            _worker_marshallers.clear()
+
+
 @pytest.fixture
 def client(app):
     return app.test_client
@@ -2,9 +2,26 @@
 from __future__ import unicode_literals
 
 import copy
+import json
+
+import pytest
+
 import sanic_restplus
 from sanic import Blueprint
-from sanic_restplus import restplus, Namespace
+from sanic_restplus import restplus, Namespace, fields, marshal_with
+from sanic_restplus.representations import RawJSON
+
+
+class FakeApp(object):
+    def __init__(self, debug=False):
+        self.config = {}
+        self.debug = debug
+
+
+class FakeRequest(object):
+    def __init__(self, headers=None, debug=False):
+        self.headers = headers or {}
+        self.app = FakeApp(debug)
 
 
 class APITest(object):
@@ -16,6 +33,58 @@ class APITest(object):
             assert url == '/'
             assert api.base_url == 'http://localhost/'
 
+    def test_should_offload(self, executor):
+        api = sanic_restplus.Api(offload_threshold=2, executor=executor)
+        ns = api.namespace('test')
+
+        assert api.should_offload([1, 2])
+        assert api.should_offload((1, 2, 3))
+        assert not api.should_offload([1])
+        assert not api.should_offload({'a': 1, 'b': 2})
+        assert not api.should_offload(RawJSON(b'[1, 2, 3]'))
+        assert ns.should_offload([1, 2])
+        assert ns.executor is executor
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize('executor', ['threads', 'processes'], indirect=True)
+    async def test_output_offload(self, executor):
+        api = sanic_restplus.Api(offload_threshold=2, executor=executor)
+
+        async def resource(request):
+            return [{'name': 'John'}, {'name': 'Jane'}], 201
+
+        response = await api.output(resource)(FakeRequest())
+        assert response.status == 201
+        assert json.loads(response.body.decode()) == [{'name': 'John'}, {'name': 'Jane'}]
+
+    @pytest.mark.asyncio
+    async def test_marshal_with_offload_encoded_once(self, executor):
+        api = sanic_restplus.Api(offload_threshold=2, executor=executor)
+
+        @marshal_with({'name': fields.String}, offload=api)
+        async def resource(request):
+            return [{'name': 'John'}, {'name': 'Jane'}]
+
+        # Marshalled and encoded in the executor, then written as is
+        assert isinstance(await resource(FakeRequest()), RawJSON)
+        assert not isinstance(await resource(FakeRequest(debug=True)), RawJSON)
+        response = await api.output(resource)(FakeRequest())
+        assert json.loads(response.body.decode()) == [{'name': 'John'}, {'name': 'Jane'}]
+
+    def test_encodes_json(self):
+        api = sanic_restplus.Api()
+        api.representations['application/xml'] = lambda request, data, code, headers=None: None
+
+        assert api.encodes_json(FakeRequest())
+        assert api.encodes_json(FakeRequest({'accept': 'application/json'}))
+        assert not api.encodes_json(FakeRequest({'accept': 'application/xml'}))
+        assert not api.encodes_json(FakeRequest(debug=True))
+
+    def test_should_offload_disabled(self):
+        api = sanic_restplus.Api()
+        assert not api.should_offload(list(range(10000)))
+        assert not Namespace('test').should_offload(list(range(10000)))
+
     def test_root_endpoint_lazy(self, app):
         api = sanic_restplus.Api(version='1.0')
         api.init_app(app)
@@ -1,7 +1,11 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals
+import asyncio
+import copy
+import pickle
 
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, datetime, timezone, timedelta
 from decimal import Decimal
 from functools import partial
@@ -9,7 +13,7 @@ from functools import partial
 import pytest
 from spf import SanicPluginsFramework
 from sanic import Blueprint
-from sanic_restplus import fields, Api, restplus
+from sanic_restplus import fields, marshal, Api, Model, restplus
 cet = timezone(timedelta(hours=1), 'CET')
 
 class FieldTestCase(object):
@@ -52,6 +56,17 @@ class BaseFieldTestMixin(object):
         assert 'readOnly' in field.__schema__
         assert field.__schema__['readOnly']
 
+    def test_slots(self):
+        field = self.field_class(title='A title')
+        assert not hasattr(field, '__dict__')
+        with pytest.raises(AttributeError):
+            field.unknown = 'value'
+
+    def test_copy_and_pickle(self):
+        field = self.field_class(title='A title', description='A description')
+        for cloned in copy.deepcopy(field), pickle.loads(pickle.dumps(field)):
+            assert cloned.__schema__ == field.__schema__
+
 
 class NumberTestMixin(object):
     def test_min(self):
@@ -902,6 +917,97 @@ class ListFieldTest(BaseFieldTestMixin, FieldTestCase):
         data = [1, 2, 'a']
         self.assert_field(field, data, data)
 
+    @pytest.mark.parametrize('container,value,expected', [
+        (fields.Integer, [1, 2, 3], [1, 2, 3]),
+        (fields.Integer, (1, True, '3', 4.5), [1, 1, 3, 4]),
+        (fields.Integer(default=0), [1, None, 3], [1, 0, 3]),
+        (fields.Float, [1, 2.5], [1.0, 2.5]),
+        (fields.String, ['a', 1, None], ['a', '1', None]),
+        (fields.String(default='x'), ['a', None], ['a', 'x']),
+        (fields.Raw(default=42), [1, None, 'a'], [1, 42, 'a']),
+    ])
+    def test_primitive_items(self, container, value, expected):
+        field = fields.List(container)
+        assert field.output('foo', {'foo': value}) == expected
+        assert field.compile('foo')({'foo': value}) == expected
+
+    def test_primitive_items_are_copied(self):
+        value = [1, 2, 3]
+        output = fields.List(fields.Integer).compile('foo')({'foo': value})
+        assert output == value
+        assert output is not value
+
+    def test_primitive_items_error(self):
+        field = fields.List(fields.Integer)
+        with pytest.raises(fields.MarshallingError) as error:
+            field.output('foo', {'foo': [1, 'two']})
+        assert '"two"' in str(error.value)
+
+
+class ArrayFieldTest(BaseFieldTestMixin, FieldTestCase):
+    field_class = fields.Array
+
+    def test_defaults(self):
+        field = fields.Array()
+        assert not field.required
+        assert field.__schema__ == {'type': 'array', 'items': {'type': 'number'}}
+
+    @pytest.mark.parametrize('dtype,items', [
+        (int, {'type': 'integer', 'format': 'int64'}),
+        ('int32', {'type': 'integer', 'format': 'int32'}),
+        ('uint8', {'type': 'integer', 'format': 'int32'}),
+        (float, {'type': 'number', 'format': 'double'}),
+        ('float32', {'type': 'number', 'format': 'float'}),
+        (bool, {'type': 'boolean'}),
+    ])
+    def test_schema(self, dtype, items):
+        assert fields.Array(dtype).__schema__ == {'type': 'array', 'items': items}
+
+    def test_unsupported_dtype(self):
+        with pytest.raises(fields.MarshallingError):
+            fields.Array(str)
+
+    def test_value(self):
+        from array import array
+
+        self.assert_field(fields.Array(), [1, 2.5], [1, 2.5])
+        self.assert_field(fields.Array(), (1, 2), [1, 2])
+        self.assert_field(fields.Array(), array('d', [1, 2]), [1.0, 2.0])
+        self.assert_field(fields.Array(), memoryview(b'ab'), [97, 98])
+        self.assert_field(fields.Array(), None, None)
+
+    def test_value_with_dtype(self):
+        from array import array
+
+        self.assert_field(fields.Array(float), [1, '2.5'], [1.0, 2.5])
+        self.assert_field(fields.Array(int), array('d', [1.5, 2]), [1, 2])
+        self.assert_field_raises(fields.Array(int), ['one'])
+
+    def test_without_numpy(self, mocker):
+        mocker.patch.object(fields, 'numpy', None)
+        field = fields.Array('float32')
+        assert field.__schema__['items'] == {'type': 'number', 'format': 'float'}
+        self.assert_field(field, [1, 2], [1.0, 2.0])
+        with pytest.raises(fields.MarshallingError):
+            fields.Array('f4')
+
+    def test_numpy_array(self):
+        np = pytest.importorskip('numpy')
+        self.assert_field(fields.Array(), np.arange(3), [0, 1, 2])
+        self.assert_field(fields.Array(np.float32), np.array([1, 2]), [1.0, 2.0])
+        self.assert_field(fields.Array('f4'), np.arange(3), [0.0, 1.0, 2.0])
+
+    def test_numpy_array_to_json(self):
+        np = pytest.importorskip('numpy')
+        from sanic_restplus import marshal_json
+
+        model = {'values': fields.Array(), 'floats': fields.Array(np.float64)}
+        data = {'values': np.arange(6)[::2], 'floats': np.array([1, 2], dtype=np.int8)}
+        assert marshal_json(data, model) == b'{"values":[0,2,4],"floats":[1.0,2.0]}'
+
+        data = {'values': [1, 2], 'floats': None}
+        assert marshal_json(data, model) == b'{"values":[1,2],"floats":null}'
+
 
 class WildcardFieldTest(BaseFieldTestMixin, FieldTestCase):
     field_class = partial(fields.Wildcard, fields.String)
@@ -1037,6 +1143,103 @@ class WildcardFieldTest(BaseFieldTestMixin, FieldTestCase):
         assert expected1 == result1
         assert result2 == result1
 
+    def test_expand(self):
+        field = fields.Wildcard(fields.String)
+        data = {'John': 12, 'bob': 42, 'Jane': None}
+        assert field.expand('j*', data) == [('John', '12'), ('Jane', None)]
+        assert field.expand('j*', data, exclude={'John'}) == [('Jane', None)]
+        assert field.expand('x*', data) == [('x*', None)]
+        assert field.expand('*', None) == [('*', None)]
+
+    def test_expand_with_default(self):
+        field = fields.Wildcard(fields.String, default='x')
+        assert field.expand('*', {'a': None, 'b': 'x', 'c': 'y'}) == [('a', 'x'), ('b', 'x'), ('c', 'y')]
+        assert field.expand('*', {}) == [('*', 'x')]
+
+    def test_expand_only_evaluates_matching_attributes(self):
+        class Dummy(object):
+            name = 'John'
+
+            @property
+            def expensive(self):
+                raise AssertionError('Should not be evaluated')
+
+            def method(self):
+                pass
+
+        field = fields.Wildcard(fields.String)
+        assert field.expand('n*', Dummy()) == [('name', 'John')]
+        assert field.expand('*', Dummy(), exclude={'expensive'}) == [('name', 'John')]
+
+    def test_marshal_single_pass(self):
+        model = OrderedDict([('bob', fields.Integer), ('*', fields.Wildcard(fields.String))])
+        data = {'bob': '42', 'John': 12, 'Jane': None, 'Jim': 'x'}
+        expected = {'bob': 42, 'John': '12', 'Jane': None, 'Jim': 'x'}
+        assert marshal(data, model) == expected
+        assert marshal(data, model, skip_none=True) == {'bob': 42, 'John': '12', 'Jim': 'x'}
+        assert marshal([data, data], model) == [expected, expected]
+
+    def test_output_with_context(self):
+        field = fields.Wildcard(fields.String)
+        data1 = {'John': 12, 'Jane': 42}
+        data2 = {'Jim': 1, 'Joe': 2}
+        context1 = fields.WildcardContext()
+        context2 = fields.WildcardContext(exclude={'Joe'})
+
+        # Interleaved calls do not share any state
+        assert field.output('*', data1, context=context1) == '42'
+        assert field.output('*', data2, context=context2) == '1'
+        assert field.output('*', data1, context=context1) == '12'
+        assert field.output('*', data2, context=context2) is None
+        assert field.output('*', data1, context=context1) is None
+        assert (context1.last, context2.last) == ('John', 'Jim')
+        assert field.key is None
+
+    @pytest.mark.asyncio
+    async def test_concurrent_output(self):
+        field = fields.Wildcard(fields.Integer)
+        data = [{'k{0}-{1}'.format(i, j): j for j in range(10)} for i in range(10)]
+
+        async def drain(item):
+            context = fields.WildcardContext()
+            out = {}
+            while True:
+                value = field.output('*', item, context=context)
+                if value is None:
+                    return out
+                out[context.last] = value
+                await asyncio.sleep(0)
+
+        assert await asyncio.gather(*(drain(item) for item in data)) == data
+
+    def test_clone_does_not_share_context(self):
+        wild1 = fields.Wildcard(fields.String)
+        wild1.output('*', {'a': 1})
+        wild2 = wild1.clone()
+        assert wild1.key == 'a'
+        assert wild2.key is None
+        assert wild2._context is not wild1._context
+
+    def test_output_default_context_per_thread(self):
+        field = fields.Wildcard(fields.String)
+        data = {'a': 1}
+        assert field.output('*', data) == '1'
+        with ThreadPoolExecutor(1) as executor:
+            assert executor.submit(field.output, '*', {'b': 2, 'c': 3}).result() == '3'
+        assert field.key == 'a'
+        assert field.output('*', data) is None
+
+    def test_compile_custom_output(self):
+        class Upper(fields.Wildcard):
+            def output(self, key, obj, ordered=False, **kwargs):
+                value = super(Upper, self).output(key, obj, ordered, **kwargs)
+                return value.upper() if value else value
+
+        model = OrderedDict([('bob', fields.Integer), ('*', Upper(fields.String))])
+        data = {'bob': '42', 'John': 'a', 'Jane': 'b'}
+        assert marshal(data, model) == {'bob': 42, 'John': 'A', 'Jane': 'B'}
+        assert marshal([data, data], model) == [{'bob': 42, 'John': 'A', 'Jane': 'B'}] * 2
+
 
 class ClassNameFieldTest(StringTestMixin, BaseFieldTestMixin, FieldTestCase):
     field_class = fields.ClassName
@@ -1321,6 +1524,63 @@ class PolymorphTest(FieldTestCase):
             'extra2': 'extra2'
         }}
 
+    def polymorph(self):
+        parent = Model('Person', {'name': fields.String})
+        child1 = Model.inherit('Child1', parent, {'extra1': fields.String})
+        child2 = Model.inherit('Child2', parent, {'extra2': fields.String})
+
+        class Child1(object):
+            name = 'child1'
+            extra1 = 'extra1'
+
+        class Child2(object):
+            name = 'child2'
+            extra2 = 'extra2'
+
+        return fields.Polymorph({Child1: child1, Child2: child2}), Child1, Child2
+
+    def test_polymorph_dispatch_table(self):
+        field, Child1, Child2 = self.polymorph()
+
+        class GrandChild1(Child1):
+            pass
+
+        assert field.resolve(Child1).name == 'Child1'
+        assert field.resolve(GrandChild1).name == 'Child1'
+        assert field.resolve(GrandChild1) is field.resolve(Child1)
+        assert set(field._dispatch) == {Child1, GrandChild1}
+        with pytest.raises(ValueError):
+            field.resolve(object)
+        assert object not in field._dispatch
+
+    def test_polymorph_compiled_list(self):
+        field, Child1, Child2 = self.polymorph()
+        thing = Model('Thing', {'owners': fields.List(field)})
+        data = {'owners': [Child1(), Child2(), Child1()]}
+        expected = {'owners': [
+            {'name': 'child1', 'extra1': 'extra1'},
+            {'name': 'child2', 'extra2': 'extra2'},
+            {'name': 'child1', 'extra1': 'extra1'},
+        ]}
+        assert marshal(data, thing) == expected
+        assert field.output('owner', {'owner': Child2()}) == {'name': 'child2', 'extra2': 'extra2'}
+
+    def test_polymorph_model_change(self):
+        field, Child1, _ = self.polymorph()
+        thing = {'owner': field}
+        assert marshal({'owner': Child1()}, thing) == {'owner': {'name': 'child1', 'extra1': 'extra1'}}
+        resolved = field.resolve(Child1)
+
+        field.mapping[Child1]['extra1'] = fields.Integer(attribute='missing', default=1)
+        assert field.resolve(Child1) is not resolved
+        assert marshal({'owner': Child1()}, thing) == {'owner': {'name': 'child1', 'extra1': 1}}
+        assert field.output('owner', {'owner': Child1()}) == {'name': 'child1', 'extra1': 1}
+
+    def test_polymorph_compiled_unknown_class(self):
+        field, _, _ = self.polymorph()
+        with pytest.raises(ValueError):
+            marshal({'owner': object()}, Model('Thing', {'owner': field}))
+
 
 class CustomFieldTest(FieldTestCase):
     def test_custom_field(self):
@@ -1331,6 +1591,33 @@ class CustomFieldTest(FieldTestCase):
 
         assert field.__schema__ == {'type': 'integer', 'format': 'int64'}
 
+    def test_custom_field_attributes(self):
+        class CustomNested(fields.Nested):
+            def __init__(self, model, extra=None, **kwargs):
+                self.extra = extra
+                super(CustomNested, self).__init__(model, **kwargs)
+
+        field = CustomNested({'name': fields.String}, extra='value', title='A title')
+        assert field.__dict__ == {'extra': 'value'}
+
+        cloned = field.clone()
+        assert isinstance(cloned, CustomNested)
+        assert cloned.extra == 'value'
+        assert cloned.title == 'A title'
+
+    def test_custom_field_slots(self):
+        class CustomField(fields.String):
+            __slots__ = 'extra'
+
+            def __init__(self, extra=None, **kwargs):
+                self.extra = extra
+                super(CustomField, self).__init__(**kwargs)
+
+        field = CustomField(extra='value', min_length=2)
+        assert not hasattr(field, '__dict__')
+        assert field._attrs()['extra'] == 'value'
+        assert field._attrs()['min_length'] == 2
+
 
 class FieldsHelpersTest(object):
     def test_to_dict(self):
@@ -1374,3 +1661,38 @@ class FieldsHelpersTest(object):
 
         obj = Test('hi')
         assert fields.get_value('value', obj) == 'hi'
+
+    @pytest.mark.parametrize('key,obj', [
+        ('foo', {'foo': 42}),
+        ('bar', {'foo': 42}),
+        ('foo', OrderedDict(foo=42)),
+        ('foo.bar', {'foo': {'bar': 42}}),
+        ('foo.bar', {'foo': None}),
+        ('foo.0', {'foo': [42]}),
+        (1, [41, 42]),
+        ('real', 42),
+    ])
+    def test_make_accessor(self, key, obj):
+        assert fields.make_accessor(key)(obj) == fields.get_value(key, obj)
+
+    def test_make_accessor_obj(self, mocker):
+        obj = mocker.Mock(foo=mocker.Mock(bar=42))
+        assert fields.make_accessor('foo')(obj) is obj.foo
+        assert fields.make_accessor('foo.bar')(obj) == 42
+
+    def test_make_accessor_callable(self):
+        def key(obj):
+            return obj['foo'] * 2
+
+        assert fields.make_accessor(key) is key
+
+    def test_make_accessor_with_source(self):
+        class Foo(object):
+            foo = 42
+
+        assert fields.make_accessor('foo', dict)({'foo': 42}) == 42
+        assert fields.make_accessor('foo', dict)({}) is None
+        assert fields.make_accessor(1, tuple)((41, 42)) == 42
+        assert fields.make_accessor('foo', Foo)(Foo()) == 42
+        assert fields.make_accessor('foo.real', Foo)(Foo()) == 42
+        assert fields.make_accessor('bar', Foo)(Foo()) is None
@@ -6,7 +6,7 @@ import pytest
 
 from collections import OrderedDict
 
-from sanic_restplus import mask, Api, Resource, fields, marshal, Mask
+from sanic_restplus import mask, Api, Resource, fields, marshal, Mask, Model
 
 
 def assert_data(tested, expected):
@@ -472,6 +472,63 @@ class ApplyMaskTest(object):
             mask.apply(model, 'nested{notpossible}')
 
 
+class LazyFieldsTest(object):
+    def model(self, calls):
+        def expensive(obj):
+            calls.append(obj['name'])
+            return 'computed'
+
+        owner = Model('Owner', {
+            'name': fields.String,
+            'expensive': fields.String(attribute=expensive, lazy=True),
+        })
+        return Model('Item', {
+            'id': fields.Integer,
+            'owner': fields.Nested(owner),
+            'owners': fields.List(fields.Nested(owner)),
+        })
+
+    def data(self):
+        return {'id': 1, 'owner': {'name': 'John'}, 'owners': [{'name': 'Jane'}]}
+
+    def test_computed_without_mask(self):
+        calls = []
+        result = marshal(self.data(), self.model(calls))
+        assert result['owner'] == {'name': 'John', 'expensive': 'computed'}
+        assert calls == ['John', 'Jane']
+
+    def test_explicitly_named(self):
+        calls = []
+        result = marshal(self.data(), self.model(calls), mask='owner{name,expensive}')
+        assert result == {'owner': {'name': 'John', 'expensive': 'computed'}}
+        assert calls == ['John']
+
+    def test_not_computed_when_parent_kept(self):
+        calls = []
+        result = marshal(self.data(), self.model(calls), mask='id,owner,owners')
+        assert result == {'id': 1, 'owner': {'name': 'John'}, 'owners': [{'name': 'Jane'}]}
+        assert calls == []
+
+    def test_not_computed_with_star(self):
+        calls = []
+        model = {'name': fields.String, 'lazy': fields.Raw(attribute=lambda o: calls.append(o), lazy=True)}
+        assert marshal({'name': 'John'}, model, mask='*') == {'name': 'John'}
+        assert marshal({'name': 'John'}, model, mask='{lazy,*}') == {'name': 'John', 'lazy': None}
+        assert len(calls) == 1
+
+    def test_self_referencing_model(self):
+        node = Model('Node', {'name': fields.String, 'lazy': fields.String(lazy=True)})
+        node['child'] = fields.Nested(node, allow_null=True)
+        data = {'node': {'name': 'a', 'lazy': 'x', 'child': {'name': 'b', 'lazy': 'y', 'child': None}}}
+        result = marshal(data, {'node': fields.Nested(node)}, mask='node')
+        assert result == {'node': {'name': 'a', 'child': {'name': 'b', 'child': None}}}
+
+    def test_keep_fields_without_lazy_fields(self):
+        field = fields.Nested({'name': fields.String})
+        assert mask.keep(field) is field
+        assert mask.apply({'nested': field}, 'nested')['nested'] is field
+
+
 class MaskAPI(object):
     def test_marshal_with_honour_field_mask_header(self, app, client):
         api = Api(app)
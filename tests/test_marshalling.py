@@ -1,13 +1,24 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals
 
+import asyncio
+import json
+import pickle
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
 import pytest
 
 from sanic_restplus import (
-    marshal, marshal_with, marshal_with_field, fields, Api, Resource
+    marshal, marshal_with, marshal_with_field, marshal_many, marshal_json, compile_marshaller, compile_encoder,
+    projection, memoizing, marshal_async, marshal_many_async, fields, Api, Columns, Mask, Model, Resource
+)
+from sanic_restplus.marshalling import (
+    PlanCache, _MissingPlan, _marshal_chunk, _worker_marshallers, to_layout, requested_layout
 )
+from sanic_restplus.representations import RawJSON, output_json_fast
 
-from collections import OrderedDict
+from collections import OrderedDict, namedtuple
+from datetime import datetime
 
 
 # Add a dummy Resource to verify that the app is properly set.
@@ -51,6 +62,27 @@ class MarshallingTest(object):
         output = marshal(marshal_dict, model, skip_none=True)
         assert output == {'baz': 'biz'}
 
+    def test_marshal_with_skip_if_none(self):
+        model = OrderedDict([
+            ('foo', fields.Raw(skip_if_none=True)),
+            ('bat', fields.Raw(skip_if_none=False)),
+            ('qux', fields.Raw),
+            ('nested', fields.Nested({'a': fields.Raw}, skip_if_none=True, skip_none=True)),
+        ])
+        marshal_dict = {'foo': None, 'bat': None, 'qux': None, 'nested': {}}
+        assert marshal(marshal_dict, model) == {'bat': None, 'qux': None}
+        assert marshal(marshal_dict, model, skip_none=True) == {'bat': None}
+        assert marshal_json(marshal_dict, model) == b'{"bat":null,"qux":null}'
+        assert marshal_json(marshal_dict, model, skip_none=True) == b'{"bat":null}'
+
+    def test_marshal_wildcard_with_skip_if_none(self):
+        model = OrderedDict([('foo', fields.Raw(skip_if_none=False)), ('*', fields.Wildcard(fields.String))])
+        marshal_dict = OrderedDict([('foo', None), ('bat', None), ('baz', 'biz')])
+        assert marshal(marshal_dict, model, skip_none=True) == {'foo': None, 'baz': 'biz'}
+
+        model['*'] = fields.Wildcard(fields.String, skip_if_none=True)
+        assert marshal(marshal_dict, model) == {'foo': None, 'baz': 'biz'}
+
     def test_marshal_decorator(self):
         model = OrderedDict([('foo', fields.Raw)])
 
@@ -427,3 +459,1180 @@ class MarshallingTest(object):
         resp = await client.get('/api')
         assert resp.status_code == 200
         assert resp.data.decode('utf-8') == '{"foo": 3.0}\n'
+
+
+class CompiledMarshallerTest(object):
+    def test_compile_marshaller(self):
+        model = OrderedDict([('foo', fields.Raw), ('fee', fields.Nested({'fye': fields.String}))])
+        marshaller = compile_marshaller(model)
+        data = {'foo': 'bar', 'bat': 'baz', 'fee': {'fye': 'fum'}}
+        assert marshaller(data) == {'foo': 'bar', 'fee': {'fye': 'fum'}}
+        assert marshaller([data]) == [{'foo': 'bar', 'fee': {'fye': 'fum'}}]
+        assert marshaller(data) == marshal(data, model)
+
+    def test_compile_marshaller_with_skip_none_and_mask(self):
+        model = OrderedDict([('foo', fields.Raw), ('bat', fields.Raw), ('qux', fields.Raw)])
+        marshaller = compile_marshaller(model, skip_none=True, mask='foo,qux')
+        assert marshaller({'foo': 'bar', 'bat': 'baz', 'qux': None}) == {'foo': 'bar'}
+
+    def test_compile_marshaller_is_cached_on_model(self):
+        model = Model('Person', {'name': fields.String})
+        marshaller = compile_marshaller(model)
+        assert compile_marshaller(model) is marshaller
+        assert compile_marshaller(model, ordered=True) is not marshaller
+        assert compile_marshaller(model, mask='name') is not marshaller
+
+    def test_compile_marshaller_with_source_hint(self):
+        Row = namedtuple('Row', 'id name')
+        model = Model('Row', {'id': fields.Integer(attribute=0), 'name': fields.String(attribute='name')},
+                      source=Row)
+        assert compile_marshaller(model).marshal_one(Row(1, 'foo')) == {'id': 1, 'name': 'foo'}
+        assert marshal_many([Row(1, 'foo')], model, mask='name') == [{'name': 'foo'}]
+
+        model = Model('Person', {'name': fields.String, 'age': fields.Integer}, source=dict)
+        assert compile_marshaller(model)({'name': 'John'}) == {'name': 'John', 'age': None}
+
+    def test_compile_marshaller_self_referencing_model(self):
+        model = Model('Node', {'name': fields.String})
+        model['child'] = fields.Nested(model, allow_null=True)
+        data = {'name': 'root', 'child': {'name': 'leaf', 'child': None}}
+        expected = {'name': 'root', 'child': {'name': 'leaf', 'child': None}}
+        assert compile_marshaller(model)(data) == expected
+
+    def test_compile_marshaller_custom_field(self):
+        class Upper(fields.Raw):
+            def output(self, key, obj, **kwargs):
+                return obj[key].upper()
+
+        marshaller = compile_marshaller({'name': Upper, 'size': fields.Integer})
+        assert marshaller({'name': 'foo', 'size': '3'}) == {'name': 'FOO', 'size': 3}
+
+    def test_compile_marshaller_list_of_nested(self):
+        model = {'items': fields.List(fields.Nested({'name': fields.String}, allow_null=True))}
+        data = {'items': [{'name': 'a'}, None, {'name': 3}]}
+        assert compile_marshaller(model)(data) == {'items': [{'name': 'a'}, None, {'name': '3'}]}
+        assert compile_marshaller(model)(data) == marshal(data, model)
+
+    def test_marshal_with_model_change(self):
+        model = Model('Person', {'name': fields.String})
+        decorator = marshal_with(model)
+        data = {'name': 'John', 'age': 42}
+        assert decorator.marshal(data) == {'name': 'John'}
+        assert decorator.encoder()(data) == b'{"name":"John"}'
+        assert decorator.projection() == ('name',)
+        assert decorator.awaits is False
+
+        model['age'] = fields.Integer
+        assert decorator.marshal(data) == {'name': 'John', 'age': 42}
+        assert decorator.encoder()(data) == b'{"name":"John","age":42}'
+        assert decorator.projection() == ('name', 'age')
+
+    def test_marshal_with_plain_dict_read_once(self):
+        model = {'name': fields.String}
+        decorator = marshal_with(model)
+        key = decorator.fields_key
+        assert decorator.marshal({'name': 'John', 'age': 42}) == {'name': 'John'}
+        assert decorator.marshaller('name')({'name': 'John'}) == {'name': 'John'}
+        # Plain dicts are identified when decorating, unlike models
+        model['age'] = fields.Integer
+        assert decorator.fields_key is key
+        assert decorator.marshal({'name': 'John', 'age': 42}) == {'name': 'John'}
+
+
+class PlanCacheTest(object):
+    def test_hit_on_same_mask(self):
+        cache = PlanCache()
+        model = Model('Person', {'name': fields.String, 'age': fields.Integer})
+        plan = cache.get(model, 'name')
+        assert cache.get(model, '{name}') is plan
+        assert cache.get(model, Mask('name')) is plan
+        assert cache.info() == (2, 1, 256, 1)
+        assert list(plan.fields.keys()) == ['name']
+
+    def test_miss_on_flags(self):
+        cache = PlanCache()
+        model = Model('Person', {'name': fields.String, 'age': fields.Integer})
+        plan = cache.get(model, 'name')
+        assert cache.get(model, 'name', skip_none=True) is not plan
+        assert cache.get(model, 'name', ordered=True) is not plan
+        assert cache.get(model) is not plan
+        assert cache.info().misses == 4
+
+    def test_model_default_mask(self):
+        cache = PlanCache()
+        model = Model('Person', {'name': fields.String, 'age': fields.Integer}, mask='age')
+        assert cache.get(model) is cache.get(model, 'age')
+        assert list(cache.get(model).fields.keys()) == ['age']
+
+    def test_bounded(self):
+        cache = PlanCache(maxsize=2)
+        model = Model('Person', {'name': fields.String, 'age': fields.Integer})
+        first = cache.get(model, 'name')
+        cache.get(model, 'age')
+        cache.get(model, 'name,age')
+        assert cache.info().currsize == 2
+        assert cache.get(model, 'name') is not first
+
+    def test_clear(self):
+        cache = PlanCache()
+        cache.get({'name': fields.String}, 'name')
+        cache.clear()
+        assert cache.info() == (0, 0, 256, 0)
+
+    def test_plain_dict_content(self):
+        cache = PlanCache()
+        cache.get({'name': fields.String}, 'name')
+        plan = cache.get({'name': fields.String}, 'name')
+        assert cache.get({'name': fields.String}, 'name') is plan
+        assert cache.get({'name': fields.Integer}, 'name') is not plan
+        assert cache.info().currsize == 1
+
+    def test_plain_dicts_kept_apart(self):
+        cache = PlanCache(maxsize=1, dict_maxsize=1)
+        model = Model('Person', {'name': fields.String, 'age': fields.Integer})
+        plan = cache.get(model, 'name')
+        for _ in range(3):
+            cache.get({'name': fields.String}, 'age')
+            cache.get({'name': fields.String}, 'age')
+        assert cache.get(model, 'name') is plan
+        assert cache.info().currsize == 2
+
+    def test_inline_field_instances_not_cached(self):
+        cache = PlanCache()
+        for _ in range(3):
+            assert cache.get({'name': fields.String()}).marshaller({'name': 'John'}) == {'name': 'John'}
+        assert cache.info().currsize == 0
+
+    def test_cached_plain_dict_copied(self):
+        cache = PlanCache()
+        model = {'name': fields.String, 'age': fields.Integer}
+        cache.get(model)
+        plan = cache.get(model)
+        del model['name']
+        assert plan.marshaller({'name': 'John', 'age': 42}) == {'name': 'John', 'age': 42}
+
+    def test_changed_plain_dict(self):
+        model = {'name': fields.String}
+        assert marshal({'name': 'John', 'age': 42}, model) == {'name': 'John'}
+        model['age'] = fields.Integer
+        assert marshal({'name': 'John', 'age': 42}, model) == {'name': 'John', 'age': 42}
+        del model['name']
+        assert marshal({'name': 'John', 'age': 42}, model, mask='name,age') == {'age': 42}
+
+    def test_plan_marshaller(self):
+        cache = PlanCache()
+        model = Model('Person', {'name': fields.String, 'age': fields.Integer})
+        plan = cache.get(model, 'name')
+        assert plan.marshaller is plan.marshaller
+        assert plan.marshaller({'name': 'John', 'age': 42}) == {'name': 'John'}
+
+
+class FakeRequest(object):
+    def __init__(self, headers=None):
+        self.headers = headers or {}
+
+
+class FakeContext(object):
+    pass
+
+
+class MarshalManyTest(object):
+    def test_marshal_many(self):
+        model = OrderedDict([('foo', fields.Raw), ('bat', fields.Integer)])
+        data = [{'foo': 'bar', 'bat': '1'}, {'foo': 'baz', 'bat': 2}]
+        expected = [{'foo': 'bar', 'bat': 1}, {'foo': 'baz', 'bat': 2}]
+        assert marshal_many(data, model) == expected
+        assert marshal_many(data, model) == marshal(data, model)
+
+    def test_marshal_many_generator(self):
+        model = {'foo': fields.Integer}
+        output = marshal_many(({'foo': str(i)} for i in range(3)), model)
+        assert output == [{'foo': 0}, {'foo': 1}, {'foo': 2}]
+
+    def test_marshal_many_with_envelope_mask_and_skip_none(self):
+        model = Model('Foo', {'foo': fields.Raw, 'bat': fields.Raw, 'qux': fields.Raw})
+        data = [{'foo': 'bar', 'bat': None, 'qux': 'q'}]
+        output = marshal_many(data, model, envelope='hey', skip_none=True, mask='foo,bat')
+        assert output == {'hey': [{'foo': 'bar'}]}
+
+    @pytest.mark.asyncio
+    async def test_marshal_with_list(self):
+        model = Model('Foo', {'foo': fields.Raw, 'bat': fields.Raw})
+
+        @marshal_with(model)
+        async def try_me(request):
+            return [{'foo': 'bar', 'bat': 'baz'}, {'foo': 'qux'}]
+
+        assert await try_me(FakeRequest()) == [{'foo': 'bar', 'bat': 'baz'}, {'foo': 'qux', 'bat': None}]
+        output = await try_me(FakeRequest({'X-Fields': 'foo'}))
+        assert output == [{'foo': 'bar'}, {'foo': 'qux'}]
+
+
+class FakeApp(object):
+    def __init__(self, **config):
+        self.config = config
+        self.debug = False
+
+
+class FakeStreamingResponse(object):
+    def __init__(self):
+        self.chunks = []
+
+    async def write(self, data):
+        self.chunks.append(data)
+
+    @property
+    def body(self):
+        return b''.join(self.chunks)
+
+
+async def consume(response):
+    collector = FakeStreamingResponse()
+    await response.streaming_fn(collector)
+    return collector
+
+
+class ShardedMarshalManyTest(object):
+    model = Model('Person', {'name': fields.String, 'age': fields.Integer})
+
+    def test_marshal_many_with_threads(self):
+        data = [{'name': 'John', 'age': str(i)} for i in range(10)]
+        with ThreadPoolExecutor(2) as executor:
+            output = marshal_many(iter(data), self.model, envelope='data', executor=executor, chunk_size=3)
+        assert output == {'data': [{'name': 'John', 'age': i} for i in range(10)]}
+
+    def test_marshal_many_with_processes(self):
+        data = [{'name': 'John', 'age': str(i)} for i in range(10)]
+        with ProcessPoolExecutor(1) as executor:
+            output = marshal_many(data, self.model, mask='age', executor=executor, chunk_size=4)
+            assert output == [{'age': i} for i in range(10)]
+            assert marshal_many([], self.model, executor=executor) == []
+
+    def test_marshal_chunk_compiles_plan_once(self):
+        plan = pickle.dumps(({'foo': fields.Integer}, False, None, False))
+        assert _marshal_chunk('key', [{'foo': '1'}], plan=plan) == [{'foo': 1}]
+        marshal_one = _worker_marshallers['key']
+        assert _marshal_chunk('key', [{'foo': '2'}]) == [{'foo': 2}]
+        assert _worker_marshallers['key'] is marshal_one
+
+    def test_marshal_chunk_missing_plan(self):
+        with pytest.raises(_MissingPlan):
+            _marshal_chunk('unknown', [{'foo': '1'}])
+
+    def test_plan_sent_once(self):
+        data = [{'name': 'John', 'age': i} for i in range(10)]
+        with RecordingExecutor(2) as executor:
+            assert marshal_many(data, self.model, mask='age', executor=executor, chunk_size=3) == \
+                [{'age': i} for i in range(10)]
+            # One chunk per worker carries the plan
+            assert [plan is not None for plan in executor.plans] == [True, True, False, False]
+            del executor.plans[:]
+            # Threads share the compiled plans: they are all primed
+            assert marshal_many(data, self.model, mask='age', executor=executor, chunk_size=3) == \
+                [{'age': i} for i in range(10)]
+        assert executor.plans == [None] * 4
+
+    def test_plan_sent_again_to_new_workers(self):
+        data = [{'name': 'John', 'age': i} for i in range(4)]
+        with RecordingExecutor(1) as executor:
+            marshal_many(data, self.model, mask='name', executor=executor, chunk_size=2)
+            # As if the worker process had been replaced
+            _worker_marshallers.clear()
+            del executor.plans[:]
+            assert marshal_many(data, self.model, mask='name', executor=executor, chunk_size=2) == \
+                [{'name': 'John'}] * 4
+        assert executor.plans[:2] == [None, None]
+        assert executor.plans[2] is not None
+
+    def test_plan_not_confirmed_on_failure(self):
+        model = Model('Person', {'age': fields.Integer})
+        with RecordingExecutor(1) as executor:
+            with pytest.raises(fields.MarshallingError):
+                marshal_many([{'age': 'abc'}], model, executor=executor)
+            del executor.plans[:]
+            with pytest.raises(fields.MarshallingError):
+                marshal_many([{'age': 'abc'}], model, executor=executor)
+        assert executor.plans[0] is not None
+
+    @pytest.mark.asyncio
+    async def test_marshal_many_async(self):
+        data = [{'name': 'John', 'age': str(i)} for i in range(10)]
+        with ThreadPoolExecutor(2) as executor:
+            output = await marshal_many_async(iter(data), self.model, envelope='data', executor=executor,
+                                              chunk_size=3)
+        assert output == {'data': [{'name': 'John', 'age': i} for i in range(10)]}
+
+    @pytest.mark.asyncio
+    async def test_marshal_many_async_with_processes(self):
+        with ProcessPoolExecutor(1) as executor:
+            output = await marshal_many_async(async_rows(3), {'foo': fields.Integer}, executor=executor,
+                                              chunk_size=2)
+        assert output == [{'foo': i} for i in range(3)]
+
+    @pytest.mark.asyncio
+    async def test_marshal_many_async_without_executor(self):
+        assert await marshal_many_async([{'foo': '1'}], {'foo': fields.Integer}) == [{'foo': 1}]
+
+
+class RecordingExecutor(ThreadPoolExecutor):
+    def __init__(self, *args, **kwargs):
+        super(RecordingExecutor, self).__init__(*args, **kwargs)
+        self.plans = []
+
+    def submit(self, fn, key, chunk, memoize=False, plan=None):
+        self.plans.append(plan)
+        return super(RecordingExecutor, self).submit(fn, key, chunk, memoize, plan)
+
+
+class StreamingMarshalTest(object):
+    def request(self, headers=None):
+        request = FakeRequest(headers)
+        request.app = FakeApp()
+        return request
+
+    @pytest.mark.asyncio
+    async def test_marshal_with_stream(self):
+        model = Model('Foo', {'foo': fields.Integer})
+
+        @marshal_with(model, stream=True, chunk_size=2)
+        async def try_me(request):
+            return ({'foo': str(i), 'bar': i} for i in range(5))
+
+        response = await try_me(self.request())
+        assert response.status == 200
+        assert response.content_type == 'application/json'
+        collector = await consume(response)
+        assert len(collector.chunks) == 5  # opening, 3 chunks, closing
+        assert json.loads(collector.body.decode()) == [{'foo': i} for i in range(5)]
+
+    @pytest.mark.asyncio
+    async def test_marshal_with_stream_envelope_mask_and_code(self):
+        model = Model('Foo', {'foo': fields.Integer, 'bar': fields.Integer})
+
+        @marshal_with(model, envelope='data', stream=True)
+        async def try_me(request):
+            return [{'foo': 1, 'bar': 2}], 201, {'X-Test': '1'}
+
+        response = await try_me(self.request({'X-Fields': 'bar'}))
+        assert response.status == 201
+        assert response.headers['X-Test'] == '1'
+        collector = await consume(response)
+        assert json.loads(collector.body.decode()) == {'data': [{'bar': 2}]}
+
+    @pytest.mark.asyncio
+    async def test_marshal_with_stream_empty(self):
+        @marshal_with({'foo': fields.Integer}, stream=True)
+        async def try_me(request):
+            return []
+
+        collector = await consume(await try_me(self.request()))
+        assert collector.body == b'[]\n'
+
+    @pytest.mark.asyncio
+    async def test_marshal_with_stream_single_object(self):
+        @marshal_with({'foo': fields.Integer}, stream=True)
+        async def try_me(request):
+            return {'foo': '3'}
+
+        assert await try_me(self.request()) == {'foo': 3}
+
+
+class AsyncRows(object):
+    '''An asynchronous iterable over some rows, like a database cursor'''
+    def __init__(self, rows):
+        self.rows = iter(rows)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self.rows)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+def async_rows(count):
+    return AsyncRows({'foo': str(i), 'bar': i} for i in range(count))
+
+
+class AsyncIterableMarshalTest(object):
+    @pytest.mark.asyncio
+    async def test_marshal_async_generator(self):
+        output = await marshal(async_rows(3), {'foo': fields.Integer}, envelope='data')
+        assert output == {'data': [{'foo': 0}, {'foo': 1}, {'foo': 2}]}
+
+    @pytest.mark.asyncio
+    async def test_marshal_many_async_generator(self):
+        output = await marshal_many(async_rows(2), {'foo': fields.Integer}, mask='foo')
+        assert output == [{'foo': 0}, {'foo': 1}]
+
+    @pytest.mark.asyncio
+    async def test_marshal_with_async_generator(self):
+        @marshal_with({'foo': fields.Integer})
+        async def try_me(request):
+            return async_rows(2)
+
+        assert await try_me(FakeRequest()) == [{'foo': 0}, {'foo': 1}]
+
+    @pytest.mark.asyncio
+    async def test_marshal_with_async_generator_tuple(self):
+        @marshal_with({'foo': fields.Integer}, envelope='data')
+        async def try_me(request):
+            return async_rows(1), 201, {}
+
+        assert await try_me(FakeRequest()) == ({'data': [{'foo': 0}]}, 201, {})
+
+    @pytest.mark.asyncio
+    async def test_marshal_with_stream_async_generator(self):
+        @marshal_with({'foo': fields.Integer}, stream=True, chunk_size=2)
+        async def try_me(request):
+            return async_rows(5)
+
+        request = FakeRequest()
+        request.app = FakeApp()
+        collector = await consume(await try_me(request))
+        assert len(collector.chunks) == 5
+        assert json.loads(collector.body.decode()) == [{'foo': i} for i in range(5)]
+
+
+class MarshalJsonTest(object):
+    person = Model('Person', {'name': fields.String, 'age': fields.Integer, 'tags': fields.List(fields.String)})
+    family = Model('Family', {
+        'father': fields.Nested(person),
+        'mother': fields.Nested(person, allow_null=True),
+        'children': fields.List(fields.Nested(person)),
+        'address': {'city': fields.String(attribute='city')},
+        'score': fields.Float,
+    })
+    data = {
+        'father': {'name': 'John "Doe"', 'age': '42', 'tags': ['a', 'b']},
+        'mother': None,
+        'children': [{'name': 'Jim', 'age': 3}, None],
+        'city': 'Paris',
+        'score': 1.5,
+    }
+
+    @pytest.mark.parametrize('skip_none', [False, True])
+    @pytest.mark.parametrize('envelope', [None, 'data'])
+    def test_marshal_json(self, skip_none, envelope):
+        expected = marshal([self.data, self.data], self.family, envelope=envelope, skip_none=skip_none)
+        output = marshal_json([self.data, self.data], self.family, envelope=envelope, skip_none=skip_none)
+        assert isinstance(output, RawJSON)
+        assert json.loads(output.decode()) == expected
+        assert output.loads() == expected
+
+    def test_marshal_json_with_mask(self):
+        output = marshal_json(self.data, self.family, mask='father{name},children{age}')
+        assert output == b'{"father":{"name":"John \\"Doe\\""},"children":[{"age":3},{"age":null}]}'
+
+    def test_marshal_json_wildcard(self):
+        model = OrderedDict([('foo', fields.Integer), ('*', fields.Wildcard(fields.String))])
+        output = marshal_json({'foo': '1', 'bar': 2}, model)
+        assert json.loads(output.decode()) == {'foo': 1, 'bar': '2'}
+
+    def test_compile_encoder_is_cached(self):
+        encoder = compile_encoder(self.person)
+        assert compile_encoder(self.person) is encoder
+        assert compile_encoder(self.person, skip_none=True) is not encoder
+        assert compile_encoder(self.person, mask='name') is not encoder
+        assert compile_encoder(self.person, mask='name') is compile_encoder(self.person, mask='name')
+
+    def test_compile_encoder_custom_field(self):
+        class Upper(fields.Raw):
+            def output(self, key, obj, **kwargs):
+                return obj[key].upper()
+
+        encoder = compile_encoder({'foo': Upper, '%s': fields.Raw})
+        assert encoder({'foo': 'bar', '%s': 1}) == b'{"foo":"BAR","%s":1}'
+
+    @pytest.mark.asyncio
+    async def test_marshal_json_async_generator(self):
+        output = await marshal_json(async_rows(2), {'foo': fields.Integer}, envelope='data')
+        assert output == b'{"data":[{"foo":0},{"foo":1}]}'
+
+    @pytest.mark.asyncio
+    async def test_marshal_with_as_bytes(self):
+        @marshal_with(self.person, as_bytes=True, envelope='data')
+        async def try_me(request):
+            return {'name': 'John', 'age': 42}, 201, {}
+
+        output, code, headers = await try_me(FakeRequest())
+        assert isinstance(output, RawJSON)
+        assert output == b'{"data":{"name":"John","age":42,"tags":null}}'
+        output, _, _ = await try_me(FakeRequest({'X-Fields': 'age'}))
+        assert output == b'{"data":{"age":42}}'
+
+    @pytest.mark.asyncio
+    async def test_marshal_with_as_bytes_json_settings(self):
+        @marshal_with(self.person, as_bytes=True, mask='name')
+        async def try_me(request):
+            return {'name': 'John', 'age': 42}
+
+        request = FakeRequest()
+        request.app = FakeApp(RESTPLUS_JSON={'indent': 2})
+        # Left to the representation, which encodes with the settings
+        output = await try_me(request)
+        assert not isinstance(output, RawJSON)
+        assert output == {'name': 'John'}
+
+    @pytest.mark.asyncio
+    async def test_marshal_with_as_bytes_async_generator(self):
+        @marshal_with({'foo': fields.Integer}, as_bytes=True)
+        async def try_me(request):
+            return async_rows(2)
+
+        assert await try_me(FakeRequest()) == b'[{"foo":0},{"foo":1}]'
+
+    def test_output_json_raw(self):
+        request = FakeRequest()
+        request.app = FakeApp()
+        response = output_json_fast(request, RawJSON(b'{"foo":1}'), 200)
+        assert response.body == b'{"foo":1}\n'
+        assert response.content_type == 'application/json'
+
+        request.app.debug = True
+        response = output_json_fast(request, RawJSON(b'{"foo":1}'), 200)
+        assert json.loads(response.body.decode()) == {'foo': 1}
+
+
+class FakeOffload(object):
+    def __init__(self, executor=None):
+        self.executor = executor
+
+    def should_offload(self, data):
+        return isinstance(data, list) and len(data) >= 2
+
+
+class OffloadTest(object):
+    model = Model('Person', {'name': fields.String, 'age': fields.Integer})
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize('executor', ['default', 'threads'], indirect=True)
+    async def test_marshal_with_offload(self, executor):
+        @marshal_with(self.model, envelope='data', offload=FakeOffload(executor))
+        async def try_me(request):
+            return [{'name': 'John', 'age': i} for i in range(2)]
+
+        output = await try_me(FakeRequest({'X-Fields': 'age'}))
+        assert output == {'data': [{'age': 0}, {'age': 1}]}
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize('executor', ['default', 'threads'], indirect=True)
+    async def test_marshal_with_offload_as_bytes(self, executor):
+        @marshal_with(self.model, envelope='data', as_bytes=True, offload=FakeOffload(executor))
+        async def try_me(request):
+            return [{'name': 'John', 'age': i} for i in range(2)]
+
+        output = await try_me(FakeRequest({'X-Fields': 'age'}))
+        assert isinstance(output, RawJSON)
+        assert output == b'{"data":[{"age":0},{"age":1}]}'
+
+    @pytest.mark.asyncio
+    async def test_marshal_with_offload_processes(self):
+        with ProcessPoolExecutor(1) as executor:
+            @marshal_with(self.model, mask='name', offload=FakeOffload(executor))
+            async def try_me(request):
+                return [{'name': 'John', 'age': i} for i in range(2)]
+
+            assert await try_me(FakeRequest()) == [{'name': 'John'}, {'name': 'John'}]
+
+            @marshal_with(self.model, mask='name', as_bytes=True, offload=FakeOffload(executor))
+            async def try_me(request):
+                return [{'name': 'John', 'age': i} for i in range(2)]
+
+            assert await try_me(FakeRequest()) == b'[{"name":"John"},{"name":"John"}]'
+
+    @pytest.mark.asyncio
+    async def test_marshal_with_offload_below_threshold(self):
+        @marshal_with(self.model, offload=FakeOffload())
+        async def try_me(request):
+            return [{'name': 'John', 'age': 1}]
+
+        assert await try_me(FakeRequest()) == [{'name': 'John', 'age': 1}]
+
+
+class ProjectionTest(object):
+    address = Model('Address', {'city': fields.String, 'zip': fields.String(attribute='postcode')})
+    person = Model('Person', {
+        'name': fields.String,
+        'town': fields.String(attribute='address.city'),
+        'address': fields.Nested(address),
+        'pets': fields.List(fields.Nested(Model('Pet', {'name': fields.String}))),
+    })
+
+    def test_projection(self):
+        assert projection(self.person) == ('name', 'address.city', 'address.postcode', 'pets.name')
+
+    def test_projection_with_mask(self):
+        assert projection(self.person, 'name,address{zip}') == ('name', 'address.postcode')
+        assert projection(self.person, Mask('town')) == ('address.city',)
+
+    def test_projection_whole_values(self):
+        model = {'address': fields.Raw, 'city': fields.String(attribute='address.city'),
+                 'tags': fields.List(fields.String)}
+        assert projection(model) == ('address', 'tags')
+
+    def test_projection_whole_object(self):
+        assert projection({'name': fields.String, 'extra': fields.Wildcard(fields.String)}) == ('*',)
+        assert projection({'name': fields.String(attribute=lambda o: o.name)}) == ('*',)
+
+    def test_projection_custom_field(self):
+        class Upper(fields.Raw):
+            def output(self, key, obj, **kwargs):
+                return obj[key].upper()
+
+        assert projection({'name': Upper}) == ('*',)
+        assert projection({'address': fields.Nested({'name': Upper})}) == ('address',)
+
+    def test_projection_formatted_string_and_class_name(self):
+        model = {'url': fields.FormattedString('/{name}/{address.city}'), 'kind': fields.ClassName}
+        assert projection(model) == ('name', 'address')
+
+    def test_projection_self_referencing_model(self):
+        model = Model('Node', {'name': fields.String})
+        model['parent'] = fields.Nested(model, allow_null=True)
+        assert projection(model) == ('name', 'parent')
+
+    def test_projection_is_cached(self):
+        assert projection(self.person) is projection(self.person)
+        assert projection(self.person, 'name') is projection(self.person, 'name')
+
+    @pytest.mark.asyncio
+    async def test_marshal_with_projection(self):
+        seen = []
+
+        @marshal_with(self.person, mask='name,town')
+        async def try_me(request):
+            seen.append(request.ctx.restplus_projection())
+            return {'name': 'John', 'address': {'city': 'Paris'}}
+
+        request = FakeRequest()
+        request.ctx = FakeContext()
+        assert await try_me(request) == {'name': 'John', 'town': 'Paris'}
+        request.headers['X-Fields'] = 'pets'
+        assert await try_me(request) == {'pets': None}
+        assert seen == [('name', 'address.city'), ('pets.name',)]
+
+    @pytest.mark.asyncio
+    async def test_marshal_with_projection_lazy(self):
+        @marshal_with(self.person)
+        async def try_me(request):
+            return {'name': 'John'}
+
+        request = FakeRequest({'X-Fields': 'name'})
+        request.ctx = FakeContext()
+        await try_me(request)
+        lazy = request.ctx.restplus_projection
+        assert lazy.paths is None
+        assert lazy() == ('name',)
+        assert lazy() is lazy.paths
+
+    @pytest.mark.asyncio
+    async def test_marshal_with_projection_invalid_mask(self):
+        @marshal_with(self.person)
+        async def try_me(request):
+            assert request.ctx.restplus_projection() == ('*',)
+            return {'name': 'John'}
+
+        request = FakeRequest({'X-Fields': 'name{'})
+        request.ctx = FakeContext()
+        with pytest.raises(Exception):
+            await try_me(request)
+
+
+class MemoizeTest(object):
+    owner = Model('Owner', {'name': fields.String})
+    item = Model('Item', {
+        'id': fields.Integer,
+        'owner': fields.Nested(owner),
+        'watchers': fields.List(fields.Nested(owner)),
+    })
+
+    def data(self):
+        john = {'name': 'John'}
+        return [{'id': i, 'owner': john, 'watchers': [john]} for i in range(3)]
+
+    def test_marshal_memoize(self):
+        output = marshal(self.data(), self.item, memoize=True)
+        assert output == marshal(self.data(), self.item)
+        assert output[0]['owner'] is output[1]['owner'] is output[2]['watchers'][0]
+
+    def test_marshal_without_memoize(self):
+        output = marshal(self.data(), self.item)
+        assert output[0]['owner'] is not output[1]['owner']
+
+    def test_memoize_is_per_call(self):
+        data = self.data()
+        assert marshal(data, self.item, memoize=True)[0]['owner'] is not \
+            marshal(data, self.item, memoize=True)[0]['owner']
+
+    def test_memoize_per_marshaller(self):
+        john = {'name': 'John', 'age': 42}
+        model = {'owner': fields.Nested(self.owner), 'person': fields.Nested({'age': fields.Integer})}
+        assert marshal({'owner': john, 'person': john}, model, memoize=True) == \
+            {'owner': {'name': 'John'}, 'person': {'age': 42}}
+
+    def test_memoize_keeps_objects_alive(self):
+        class Owner(object):
+            def __init__(self, name):
+                self.name = name
+
+        # New owners built on access could reuse the id of a collected one
+        model = {'owner': fields.Nested(self.owner, attribute=lambda o: Owner(o['name']))}
+        output = marshal([{'name': str(i)} for i in range(10)], model, memoize=True)
+        assert output == [{'owner': {'name': str(i)}} for i in range(10)]
+
+    def test_marshal_many_memoize(self):
+        output = marshal_many(iter(self.data()), self.item, memoize=True)
+        assert output[0]['owner'] is output[2]['owner']
+
+    def test_marshal_json_memoize(self):
+        assert marshal_json(self.data(), self.item, memoize=True) == marshal_json(self.data(), self.item)
+
+    def test_memoizing(self):
+        marshaller = memoizing(compile_marshaller(self.item).marshal_one)
+        first, second = [marshaller(row) for row in self.data()[:2]]
+        assert first['owner'] is second['owner']
+
+    @pytest.mark.asyncio
+    async def test_marshal_memoize_async_generator(self):
+        output = await marshal(AsyncRows(self.data()), self.item, memoize=True)
+        assert output[0]['owner'] is output[1]['owner']
+
+    @pytest.mark.asyncio
+    async def test_marshal_with_memoize(self):
+        @marshal_with(self.item, memoize=True)
+        async def try_me(request):
+            return self.data()
+
+        output = await try_me(FakeRequest())
+        assert output[0]['owner'] is output[1]['owner']
+
+
+async def fetch_rating(item):
+    return item['id'] * 1.5
+
+
+async def fetch_author(item):
+    return {'name': 'author{0}'.format(item['id']), 'id': item['id']}
+
+
+async def fetch_karma(author):
+    return author['id'] * 10
+
+
+class AsyncFieldsTest(object):
+    author = Model('Author', {
+        'name': fields.String,
+        'karma': fields.Async(fields.Integer, attribute=fetch_karma),
+    })
+    item = Model('Item', {
+        'id': fields.Integer,
+        'rating': fields.Async(fields.Float, attribute=fetch_rating),
+        'author': fields.Async(fields.Nested(author), attribute=fetch_author),
+    })
+
+    def expected(self, id):
+        return {'id': id, 'rating': id * 1.5, 'author': {'name': 'author{0}'.format(id), 'karma': id * 10}}
+
+    @pytest.mark.asyncio
+    async def test_marshal_async(self):
+        output = await marshal_async([{'id': 1}, {'id': 2}], self.item, envelope='data')
+        assert output == {'data': [self.expected(1), self.expected(2)]}
+
+    @pytest.mark.asyncio
+    async def test_marshal_async_with_mask(self):
+        output = await marshal_async({'id': 1}, self.item, mask='id,author{name}')
+        assert output == {'id': 1, 'author': {'name': 'author1'}}
+
+    @pytest.mark.asyncio
+    async def test_marshal_async_concurrency(self):
+        running = []
+        peak = []
+
+        async def slow(item):
+            running.append(item)
+            peak.append(len(running))
+            await asyncio.sleep(0.01)
+            running.remove(item)
+            return item['id']
+
+        model = {'value': fields.Async(fields.Integer, attribute=slow)}
+        output = await marshal_async([{'id': i} for i in range(10)], model, concurrency=3)
+        assert output == [{'value': i} for i in range(10)]
+        assert max(peak) == 3
+
+    @pytest.mark.asyncio
+    async def test_marshal_async_plain_values(self):
+        model = {'value': fields.Async(fields.Integer), 'values': fields.List(fields.Async(fields.Integer))}
+        assert await marshal_async({'value': '1', 'values': ['2']}, model) == {'value': 1, 'values': [2]}
+
+    @pytest.mark.asyncio
+    async def test_marshal_async_generator(self):
+        assert await marshal_async(AsyncRows([{'id': 1}]), self.item) == [self.expected(1)]
+
+    def test_marshal_awaitable_synchronously(self):
+        with pytest.raises(fields.MarshallingError):
+            marshal({'id': 1}, self.item)
+
+    def test_async_container_attribute(self):
+        with pytest.raises(fields.MarshallingError):
+            fields.Async(fields.String(attribute='name'))
+
+    def test_async_schema(self):
+        assert fields.Async(fields.Integer, description='A count').__schema__ == {
+            'type': 'integer',
+            'description': 'A count',
+        }
+
+    @pytest.mark.asyncio
+    async def test_marshal_with_async_fields(self):
+        @marshal_with(self.item, envelope='data')
+        async def try_me(request):
+            return [{'id': 1}], 201, {}
+
+        assert await try_me(FakeRequest()) == ({'data': [self.expected(1)]}, 201, {})
+
+    @pytest.mark.asyncio
+    async def test_marshal_with_async_fields_as_bytes(self):
+        @marshal_with(self.item, as_bytes=True, offload=FakeOffload())
+        async def try_me(request):
+            return [{'id': i} for i in range(2)]
+
+        output = await try_me(FakeRequest({'X-Fields': 'id,rating'}))
+        assert isinstance(output, RawJSON)
+        assert json.loads(output.decode()) == [{'id': 0, 'rating': 0.0}, {'id': 1, 'rating': 1.5}]
+
+    @pytest.mark.asyncio
+    async def test_marshal_with_async_fields_stream(self):
+        @marshal_with(self.item, stream=True, chunk_size=2)
+        async def try_me(request):
+            return ({'id': i} for i in range(3))
+
+        request = FakeRequest()
+        request.app = FakeApp()
+        collector = await consume(await try_me(request))
+        assert json.loads(collector.body.decode()) == [self.expected(i) for i in range(3)]
+
+
+class BatchedFieldsTest(object):
+    def model(self, calls):
+        async def load_teams(ids):
+            calls.append(('teams', ids))
+            return [{'name': 'team{0}'.format(id)} for id in ids]
+
+        async def load_users(ids):
+            calls.append(('users', ids))
+            return dict((id, {'name': 'user{0}'.format(id), 'team_id': id % 2}) for id in ids if id != 3)
+
+        async def load_comments(ids):
+            calls.append(('comments', ids))
+            return [[{'text': 'comment{0}'.format(id)}] for id in ids]
+
+        user = Model('User', {
+            'name': fields.String,
+            'team': fields.Batched(load_teams, fields.Nested({'name': fields.String}), attribute='team_id'),
+        })
+        return Model('Post', {
+            'id': fields.Integer,
+            'author': fields.Batched(load_users, fields.Nested(user, allow_null=True), attribute='author_id'),
+            'comments': fields.Batched(load_comments, fields.List(fields.Nested({'text': fields.String})),
+                                       attribute='id'),
+        })
+
+    @pytest.mark.asyncio
+    async def test_one_load_per_loader(self):
+        calls = []
+        data = [{'id': i, 'author_id': i % 4 or None} for i in range(6)]
+        output = await marshal_async(data, self.model(calls))
+        assert output[1] == {
+            'id': 1,
+            'author': {'name': 'user1', 'team': {'name': 'team1'}},
+            'comments': [{'text': 'comment1'}],
+        }
+        assert output[0]['author'] is None
+        assert output[3]['author'] is None
+        assert sorted(calls) == [
+            ('comments', [0, 1, 2, 3, 4, 5]),
+            ('teams', [1, 0]),
+            ('users', [1, 2, 3]),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_masked_out_not_loaded(self):
+        calls = []
+        output = await marshal_async([{'id': 1, 'author_id': 2}], self.model(calls), mask='id,author{name}')
+        assert output == [{'id': 1, 'author': {'name': 'user2'}}]
+        assert calls == [('users', [2])]
+
+    @pytest.mark.asyncio
+    async def test_loader_values_mismatch(self):
+        async def loader(ids):
+            return []
+
+        with pytest.raises(fields.MarshallingError):
+            await marshal_async({'id': 1}, {'id': fields.Batched(loader, fields.Raw)})
+
+    def test_batched_synchronously(self):
+        with pytest.raises(fields.MarshallingError):
+            marshal({'id': 1, 'author_id': 1}, self.model([]))
+
+    def test_batched_projection(self):
+        assert projection(self.model([]), 'author{name}') == ('author_id',)
+
+    @pytest.mark.asyncio
+    async def test_marshal_with_batched(self):
+        calls = []
+
+        @marshal_with(self.model(calls), mask='author{name}')
+        async def try_me(request):
+            return [{'author_id': 1}, {'author_id': 2}, {'author_id': 1}]
+
+        output = await try_me(FakeRequest())
+        assert output == [{'author': {'name': 'user1'}}, {'author': {'name': 'user2'}}, {'author': {'name': 'user1'}}]
+        assert calls == [('users', [1, 2])]
+
+
+class FakeFrame(object):
+    """A minimal DataFrame like object"""
+    def __init__(self, columns):
+        self._columns = columns
+
+    @property
+    def columns(self):
+        return list(self._columns)
+
+    def __getitem__(self, name):
+        return self._columns[name]
+
+    def __len__(self):
+        return len(next(iter(self._columns.values()), ()))
+
+
+class ColumnsTest(object):
+    model = OrderedDict([
+        ('name', fields.String),
+        ('age', fields.Integer),
+        ('score', fields.Float(attribute='points')),
+        ('missing', fields.String(default='x')),
+    ])
+
+    def test_marshal_mapping(self):
+        data = Columns({'name': ['John', 'Jane'], 'age': ['42', 41], 'points': [1, 2.5]})
+        assert marshal(data, self.model) == [
+            {'name': 'John', 'age': 42, 'score': 1.0, 'missing': 'x'},
+            {'name': 'Jane', 'age': 41, 'score': 2.5, 'missing': 'x'},
+        ]
+
+    def test_marshal_frame(self):
+        data = Columns(FakeFrame({'name': ['John'], 'age': [42], 'points': [1]}))
+        assert len(data) == 1
+        assert marshal(data, self.model) == [{'name': 'John', 'age': 42, 'score': 1.0, 'missing': 'x'}]
+
+    def test_same_as_rows(self):
+        model = {
+            'name': fields.String(default='anonymous'),
+            'double': fields.Integer(attribute=lambda row: row['age'] * 2),
+            'nested': fields.Nested({'age': fields.Integer}, attribute=lambda row: row),
+            'inline': {'name': fields.Raw},
+            'tags': fields.List(fields.String),
+        }
+        columns = {'name': ['John', None], 'age': [42, 41], 'tags': [['a'], []]}
+        rows = [dict(zip(columns, values)) for values in zip(*columns.values())]
+        for kwargs in {}, {'skip_none': True}, {'ordered': True}, {'mask': 'name,nested'}:
+            assert marshal(Columns(columns), model, **kwargs) == marshal(rows, model, **kwargs)
+
+    def test_ordered_with_envelope(self):
+        output = marshal(Columns({'name': ['John']}), self.model, envelope='data', ordered=True)
+        assert output == OrderedDict([('data', [
+            OrderedDict([('name', 'John'), ('age', None), ('score', None), ('missing', 'x')]),
+        ])])
+
+    def test_wildcard(self):
+        model = {'name': fields.String, '*': fields.Wildcard(fields.Integer)}
+        output = marshal(Columns({'name': ['John'], 'age': [42]}), model)
+        assert output == [{'name': 'John', 'age': 42}]
+
+    def test_marshal_json(self):
+        data = Columns({'name': ['John', 'Jane'], 'age': [42, 41]})
+        assert json.loads(marshal_json(data, self.model, skip_none=True)) == [
+            {'name': 'John', 'age': 42, 'missing': 'x'},
+            {'name': 'Jane', 'age': 41, 'missing': 'x'},
+        ]
+
+    def test_empty(self):
+        assert marshal(Columns({}), self.model) == []
+        assert marshal(Columns(FakeFrame({})), self.model) == []
+
+    def test_different_lengths(self):
+        with pytest.raises(fields.MarshallingError):
+            Columns({'name': ['John', 'Jane'], 'age': [42]})
+
+    def test_formatting_error(self):
+        with pytest.raises(fields.MarshallingError) as error:
+            marshal(Columns({'name': ['John'], 'age': ['old']}), self.model)
+        assert '"age"' in str(error.value)
+        assert '"old"' in str(error.value)
+
+    def test_numpy_columns(self):
+        np = pytest.importorskip('numpy')
+        columns = {
+            'name': np.array(['John', 'Jane']),
+            'age': np.array([42, 41], dtype=np.int32),
+            'points': np.array([True, False]),
+        }
+        output = marshal(Columns(columns), self.model)
+        assert output == [
+            {'name': 'John', 'age': 42, 'score': 1.0, 'missing': 'x'},
+            {'name': 'Jane', 'age': 41, 'score': 0.0, 'missing': 'x'},
+        ]
+        assert all(type(row['age']) is int and type(row['score']) is float for row in output)
+
+    @pytest.mark.parametrize('dt_format', ['iso8601', 'rfc822'])
+    def test_numpy_datetimes(self, dt_format):
+        np = pytest.importorskip('numpy')
+        model = {'date': fields.DateTime(dt_format=dt_format, default=datetime(2000, 1, 1))}
+        dates = np.array(['2020-01-01T10:00', '2020-01-02T10:00:00.25', 'NaT'], dtype='datetime64[ns]')
+        rows = [{'date': date} for date in dates.astype('datetime64[us]').tolist()]
+        assert marshal(Columns({'date': dates}), model) == marshal(rows, model)
+        assert marshal(Columns({'date': dates[:1]}), model) == marshal(rows[:1], model)
+
+
+class LayoutTest(object):
+    model = OrderedDict([('name', fields.String), ('age', fields.Integer)])
+    people = [{'name': 'John', 'age': 42}, {'name': 'Jane', 'age': None}]
+
+    def test_to_layout_rows(self):
+        output = to_layout(self.people, 'rows', keys=['name', 'age'])
+        assert output == {'fields': ['name', 'age'], 'rows': [['John', 42], ['Jane', None]]}
+
+    def test_to_layout_columns(self):
+        output = to_layout(self.people, 'columns', keys=['name', 'age'])
+        assert output == {'name': ['John', 'Jane'], 'age': [42, None]}
+
+    def test_to_layout_missing_keys(self):
+        output = to_layout([{'name': 'John'}, {'age': 41}], 'rows')
+        assert output == {'fields': ['name', 'age'], 'rows': [['John', None], [None, 41]]}
+
+    def test_to_layout_keys_order(self):
+        rows = [{'name': 'John', 'age': 42}, {'age': 41, 'name': 'Jane'}]
+        output = to_layout(rows, 'columns', keys=['name', 'age'])
+        assert output == {'name': ['John', 'Jane'], 'age': [42, 41]}
+
+    def test_to_layout_empty(self):
+        assert to_layout([], 'rows', keys=['name']) == {'fields': ['name'], 'rows': []}
+        assert to_layout([], 'columns', keys=['name']) == {'name': []}
+
+    def test_to_layout_ordered(self):
+        output = to_layout(self.people, 'rows', keys=['name', 'age'], ordered=True)
+        assert list(output.keys()) == ['fields', 'rows']
+
+    def test_to_layout_unknown(self):
+        with pytest.raises(ValueError):
+            to_layout(self.people, 'cells')
+
+    @pytest.mark.parametrize('accept,expected', [
+        ('application/json;layout=rows', 'rows'),
+        ('application/json; layout="columns"', 'columns'),
+        ('application/json;layout=rows;q=0.5, application/json;layout=columns', 'columns'),
+        ('application/json', None),
+        ('application/json;layout=cells', None),
+        ('application/json;layout=rows;q=0', None),
+        ('application/json;layout=rows;q=0, application/json;layout=columns;q=0.1', 'columns'),
+        ('application/xml;layout=rows', None),
+        ('application/xml, application/json;layout=rows;q=0.5', None),
+        ('application/json;layout=rows, application/xml;q=0.5', 'rows'),
+        ('application/json, application/xml;layout=rows', None),
+    ])
+    def test_requested_layout(self, accept, expected):
+        assert requested_layout(FakeRequest({'accept': accept})) == expected
+
+    def test_requested_layout_not_allowed(self):
+        assert requested_layout(FakeRequest({'accept': 'application/json;layout=rows'}), ('columns',)) is None
+
+    def test_marshal_json(self):
+        output = marshal_json(self.people, self.model, layout='rows', envelope='data')
+        assert output == b'{"data":{"fields":["name","age"],"rows":[["John",42],["Jane",null]]}}'
+
+    def test_marshal_json_skip_none_and_mask(self):
+        output = marshal_json(self.people, self.model, layout='columns', skip_none=True, mask='age')
+        assert output == b'{"age":[42,null]}'
+
+    def test_marshal_json_columns_input(self):
+        output = marshal_json(Columns({'name': ['John', 'Jane'], 'age': [42, 41]}), self.model, layout='rows')
+        assert output == b'{"fields":["name","age"],"rows":[["John",42],["Jane",41]]}'
+
+    def test_marshal_json_single_object(self):
+        assert marshal_json(self.people[0], self.model, layout='rows') == b'{"name":"John","age":42}'
+
+    def test_marshal_with_unknown_layout(self):
+        with pytest.raises(ValueError):
+            marshal_with(self.model, layouts=['rows', 'cells'])
+
+    @pytest.mark.asyncio
+    async def test_marshal_with(self):
+        @marshal_with(self.model, layouts=('rows', 'columns'), envelope='data')
+        async def try_me(request):
+            return self.people
+
+        output = await try_me(FakeRequest({'accept': 'application/json;layout=columns'}))
+        assert output == {'data': {'name': ['John', 'Jane'], 'age': [42, None]}}
+        output = await try_me(FakeRequest({'accept': 'application/json;layout=rows', 'X-Fields': 'age'}))
+        assert output == {'data': {'fields': ['age'], 'rows': [[42], [None]]}}
+        output = await try_me(FakeRequest({'accept': 'application/json'}))
+        assert output == {'data': [{'name': 'John', 'age': 42}, {'name': 'Jane', 'age': None}]}
+
+    @pytest.mark.asyncio
+    async def test_marshal_with_not_allowed(self):
+        @marshal_with(self.model, layouts='columns')
+        async def try_me(request):
+            return self.people
+
+        output = await try_me(FakeRequest({'accept': 'application/json;layout=rows'}))
+        assert output == [{'name': 'John', 'age': 42}, {'name': 'Jane', 'age': None}]
+
+    @pytest.mark.asyncio
+    async def test_marshal_with_not_json(self):
+        @marshal_with(self.model, layouts='rows')
+        async def try_me(request):
+            return self.people
+
+        output = await try_me(FakeRequest({'accept': 'application/xml;layout=rows'}))
+        assert output == [{'name': 'John', 'age': 42}, {'name': 'Jane', 'age': None}]
+
+    @pytest.mark.asyncio
+    async def test_marshal_with_as_bytes(self):
+        @marshal_with(self.model, layouts='rows', as_bytes=True)
+        async def try_me(request):
+            return self.people, 201, {}
+
+        output, code, _ = await try_me(FakeRequest({'accept': 'application/json;layout=rows'}))
+        assert isinstance(output, RawJSON)
+        assert output == b'{"fields":["name","age"],"rows":[["John",42],["Jane",null]]}'
+        assert code == 201
+
+    @pytest.mark.asyncio
+    async def test_marshal_with_async_generator(self):
+        @marshal_with({'foo': fields.Integer}, layouts='columns', stream=True)
+        async def try_me(request):
+            return async_rows(3)
+
+        assert await try_me(FakeRequest({'accept': 'application/json;layout=columns'})) == {'foo': [0, 1, 2]}
+
+    @pytest.mark.asyncio
+    async def test_marshal_with_offload(self):
+        @marshal_with(self.model, layouts='rows', offload=FakeOffload())
+        async def try_me(request):
+            return self.people
+
+        output = await try_me(FakeRequest({'accept': 'application/json;layout=rows'}))
+        assert output == {'fields': ['name', 'age'], 'rows': [['John', 42], ['Jane', None]]}
+
+    @pytest.mark.asyncio
+    async def test_marshal_with_single_object(self):
+        @marshal_with(self.model, layouts='rows')
+        async def try_me(request):
+            return self.people[0]
+
+        assert await try_me(FakeRequest({'accept': 'application/json;layout=rows'})) == {'name': 'John', 'age': 42}
@@ -2,11 +2,12 @@
 from __future__ import unicode_literals
 
 import copy
+import pickle
 import pytest
 
 from collections import OrderedDict
 
-from sanic_restplus import fields, Model, OrderedModel, SchemaModel
+from sanic_restplus import fields, marshal, Model, OrderedModel, SchemaModel
 
 
 class ModelTest(object):
@@ -294,6 +295,32 @@ class ModelTest(object):
         child_copy = copy.deepcopy(child)
         assert child_copy.__parents__[0] == parent
 
+    def test_model_pickle(self):
+        parent = Model('Person', {
+            'name': fields.String,
+            'age': fields.Integer(description="foo"),
+        }, mask='name', source=dict)
+        child = parent.inherit('Child', {
+            'extra': fields.Nested(parent),
+        })
+        marshal({'name': 'John', 'extra': {'name': 'Jim'}}, child)
+
+        parent_copy = pickle.loads(pickle.dumps(parent))
+        child_copy = pickle.loads(pickle.dumps(child))
+
+        assert parent_copy.name == 'Person'
+        assert parent_copy["age"].description == "foo"
+        assert str(parent_copy.__mask__) == '{name}'
+        assert parent_copy.__source__ is dict
+        assert child_copy.__parents__[0].name == 'Person'
+        assert child_copy.clone('Clone').name == 'Clone'
+        assert child_copy.inherit('Inherited', {}).__parents__[0] is child_copy
+        assert marshal({'name': 'John', 'extra': {'name': 'Jim'}}, child_copy) == {
+            'name': 'John',
+            'age': None,
+            'extra': {'name': 'Jim'},
+        }
+
     def test_clone_from_instance(self):
         parent = Model('Parent', {
             'name': fields.String,
@@ -616,6 +643,70 @@ class ModelTest(object):
             model.validate(data, format_checker=FormatChecker())
 
 
+class ModelResolvedTest(object):
+    def test_resolved_is_cached(self):
+        model = Model('Person', {'name': fields.String})
+        assert model.resolved is model.resolved
+        assert model.resolutions == 1
+
+    def test_resolved_invalidated_on_change(self):
+        model = Model('Person', {'name': fields.String})
+        resolved = model.resolved
+
+        model['age'] = fields.Integer
+        assert model.resolved is not resolved
+        assert set(model.resolved) == set(['name', 'age'])
+
+        model.update({'birthdate': fields.DateTime})
+        assert 'birthdate' in model.resolved
+
+        del model['name']
+        model.pop('age')
+        assert list(model.resolved) == ['birthdate']
+        assert model.resolutions == 4
+
+    def test_resolved_invalidated_on_parent_change(self):
+        parent = Model('Person', {'name': fields.String})
+        child = parent.inherit('Child', {'extra': fields.String})
+        resolved = child.resolved
+
+        parent['age'] = fields.Integer
+        assert child.resolved is not resolved
+        assert set(child.resolved) == set(['name', 'age', 'extra'])
+
+        other = Model('Other', {'other': fields.String})
+        child.__parents__ = [other]
+        assert set(child.resolved) == set(['other', 'extra'])
+
+    def test_resolved_released_with_model(self):
+        import gc
+        import weakref
+
+        model = Model('Person', {'name': fields.String})
+        resolved = weakref.ref(model.resolved)
+        del model
+        gc.collect()
+        assert resolved() is None
+
+    def test_marshallers_invalidated_on_change(self):
+        model = Model('Person', {'name': fields.String})
+        data = {'name': 'John', 'age': 42}
+        assert marshal(data, model) == {'name': 'John'}
+        assert marshal(data, model, mask='name') == {'name': 'John'}
+
+        model['age'] = fields.Integer
+        assert marshal(data, model) == {'name': 'John', 'age': 42}
+        assert marshal(data, model, mask='name,age') == {'name': 'John', 'age': 42}
+
+    def test_pickled_model_is_resolved_again(self):
+        model = Model('Person', {'name': fields.String})
+        assert 'name' in model.resolved
+
+        unpickled = pickle.loads(pickle.dumps(model))
+        assert 'name' in unpickled.resolved
+        assert unpickled.resolutions == model.resolutions + 1
+
+
 class ModelSchemaTestCase(object):
     def test_model_schema(self):
         address = SchemaModel('Address', {
@@ -1,7 +1,10 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals
 
+import pytest
+
 from sanic_restplus import Namespace, Model, OrderedModel, Api, Resource, fields, reqparse
+from sanic_restplus.representations import RawJSON
 
 
 class NamespaceTest(object):
@@ -9,6 +12,13 @@ class NamespaceTest(object):
         api = Namespace('test')
         assert isinstance(api.parser(), reqparse.RequestParser)
 
+    def test_as_list(self):
+        api = Namespace('test')
+        model = api.model('Person', {'name': fields.String})
+        field = fields.Nested(model)
+        assert api.as_list(field) is field
+        assert field.__apidoc__ == {'as_list': True}
+
     def test_doc_decorator(self):
         api = Namespace('test')
         params = {'q': {'description': 'some description'}}
@@ -103,6 +113,27 @@ class NamespaceTest(object):
         assert 'Parent' in api.models
         assert 'Child' in api.models
 
+    @pytest.mark.asyncio
+    async def test_marshal_with_as_bytes(self):
+        class FakeRequest(object):
+            headers = {}
+
+        ns = Namespace('test', as_bytes=True)
+        model = ns.model('Person', {'name': fields.String})
+
+        @ns.marshal_with(model)
+        async def as_bytes(request):
+            return {'name': 'John'}
+
+        @ns.marshal_with(model, as_bytes=False)
+        async def as_dict(request):
+            return {'name': 'John'}
+
+        output = await as_bytes(FakeRequest())
+        assert isinstance(output, RawJSON)
+        assert output == b'{"name":"John"}'
+        assert await as_dict(FakeRequest()) == {'name': 'John'}
+
     def test_api_payload(self, app, client):
         api = Api(app, validate=True)
         ns = Namespace('apples')
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from collections import OrderedDict, namedtuple
+from functools import partial
+
+import pytest
+
+from sanic_restplus import fields, marshal_many, sources, Model
+from sanic_restplus.sources import (
+    DataclassAdapter, MappingAdapter, ObjectAdapter, TupleAdapter, register_source, source_adapter
+)
+
+# Python < 3.7
+dataclasses = pytest.importorskip('dataclasses')
+
+Row = namedtuple('Row', 'name age')
+
+Person = dataclasses.make_dataclass('Person', [
+    ('name', str),
+    ('age', int),
+    ('nickname', str, dataclasses.field(default=None, init=False)),
+])
+
+
+class Slotted(object):
+    __slots__ = ('name', 'age')
+
+    def __init__(self, name, age=None):
+        self.name = name
+        if age is not None:
+            self.age = age
+
+
+class Plain(object):
+    def __init__(self, name, age):
+        self.name = name
+        self.age = age
+
+
+@pytest.fixture
+def registry():
+    registered = list(sources._registry)
+    yield
+    sources._registry[:] = registered
+    source_adapter.cache_clear()
+
+
+class SourceAdapterTest(object):
+    @pytest.mark.parametrize('cls,expected', [
+        (dict, MappingAdapter),
+        (OrderedDict, MappingAdapter),
+        (Model, MappingAdapter),
+        (Row, TupleAdapter),
+        (Person, DataclassAdapter),
+        (Slotted, ObjectAdapter),
+        (Plain, ObjectAdapter),
+    ])
+    def test_detection(self, cls, expected):
+        adapter = source_adapter(cls)
+        assert type(adapter) is expected
+        assert adapter.cls is cls
+
+    def test_detection_without_dataclasses(self, registry, monkeypatch):
+        monkeypatch.setattr(sources, 'dataclasses', None)
+        source_adapter.cache_clear()
+        assert type(source_adapter(Person)) is ObjectAdapter
+        assert type(source_adapter(Plain)) is ObjectAdapter
+
+    @pytest.mark.parametrize('cls', [tuple, list, str])
+    def test_unhandled(self, cls):
+        assert source_adapter(cls) is None
+
+    @pytest.mark.parametrize('obj', [
+        {'name': 'John', 'age': 42},
+        Row('John', 42),
+        Person('John', 42),
+        Slotted('John', 42),
+        Plain('John', 42),
+    ])
+    def test_accessor(self, obj):
+        adapter = source_adapter(type(obj))
+        assert adapter.accessor('name')(obj) == 'John'
+        assert adapter.accessor('age')(obj) == 42
+        assert adapter.accessor('missing')(obj) is None
+
+    def test_unset_values(self):
+        assert source_adapter(Slotted).accessor('age')(Slotted('John')) is None
+        assert source_adapter(Person).accessor('nickname')(Person('John', 42)) is None
+
+    def test_tuple_accessor_fallback_to_attributes(self):
+        assert source_adapter(Row).accessor('_fields')(Row('John', 42)) == ('name', 'age')
+
+    @pytest.mark.parametrize('obj', [
+        Row('John', 42),
+        Person('John', 42),
+        Slotted('John', 42),
+        Plain('John', 42),
+    ])
+    def test_to_dict(self, obj):
+        data = source_adapter(type(obj)).to_dict(obj)
+        assert data['name'] == 'John'
+        assert data['age'] == 42
+
+    def test_register_columns(self, registry):
+        class Record(tuple):
+            pass
+
+        register_source(Record, partial(TupleAdapter, columns=('name', 'age')))
+
+        adapter = source_adapter(Record)
+        assert isinstance(adapter, TupleAdapter)
+        assert adapter.accessor('age')(Record(('John', 42))) == 42
+        assert marshal_many([Record(('John', 42))], {'age': fields.Integer}) == [{'age': 42}]
+
+    def test_register_precedence(self, registry):
+        class Item(object):
+            def __getitem__(self, key):
+                return key.upper()
+
+        class Special(Item):
+            pass
+
+        register_source(Item, MappingAdapter)
+        register_source(Special, ObjectAdapter)
+
+        assert isinstance(source_adapter(Item), MappingAdapter)
+        assert isinstance(source_adapter(Special), ObjectAdapter)
+        assert source_adapter(Item).accessor('name')(Item()) == 'NAME'
+
+
+class SourcesMarshallingTest(object):
+    model = {
+        'name': fields.String,
+        'age': fields.Integer,
+        'missing': fields.String,
+    }
+
+    @pytest.mark.parametrize('cls', [Row, Person, Slotted, Plain])
+    def test_marshal_many(self, cls):
+        expected = [{'name': 'John', 'age': 42, 'missing': None}]
+        assert marshal_many([cls('John', 42)], self.model) == expected
+
+    @pytest.mark.parametrize('cls', [Row, Person, Slotted, Plain])
+    def test_marshal_with_source_hint(self, cls):
+        model = Model('Person', self.model, source=cls)
+        expected = [{'name': 'John', 'age': 42, 'missing': None}]
+        assert marshal_many([cls('John', 42)], model) == expected
+
+    def test_marshal_mixed_types(self):
+        rows = [{'name': 'John', 'age': 42}, Row('Jane', 41), Person('Jim', 40), Plain('Joe', 39)]
+        assert marshal_many(rows, self.model) == [
+            {'name': 'John', 'age': 42, 'missing': None},
+            {'name': 'Jane', 'age': 41, 'missing': None},
+            {'name': 'Jim', 'age': 40, 'missing': None},
+            {'name': 'Joe', 'age': 39, 'missing': None},
+        ]
+
+    def test_to_marshallable_type(self):
+        assert fields.to_marshallable_type(Row('John', 42)) == {'name': 'John', 'age': 42}
+        assert fields.to_marshallable_type(Slotted('John', 42)) == {'name': 'John', 'age': 42}
+
+    def test_formatted_string(self):
+        field = fields.FormattedString('{name} ({age})')
+        assert field.output('foo', Row('John', 42)) == 'John (42)'
+        assert field.output('foo', Slotted('John', 42)) == 'John (42)'
@@ -2946,6 +2946,24 @@ class SwaggerTest(object):
         assert 'produces' in post_operation
         assert post_operation['produces'] == ['application/octet-stream']
 
+    def test_marshal_with_layouts(self, api, client):
+        model = api.model('Person', {'name': restplus.fields.String})
+
+        @api.route('/test/', endpoint='test')
+        class TestResource(sanic_restplus.Resource):
+            @api.marshal_with(model, layouts=['rows', 'columns'])
+            async def get(self, request):
+                pass
+
+        data = client.get_specs()
+
+        op = data['paths']['/test/']['get']
+        assert op['produces'] == [
+            'application/json', 'application/json;layout=rows', 'application/json;layout=columns'
+        ]
+        assert set(op['x-layouts'].keys()) == set(['rows', 'columns'])
+        assert op['x-layouts']['columns']['additionalProperties']['type'] == 'array'
+
     def test_deprecated_resource(self, api, client):
         @api.deprecated
         @api.route('/test/', endpoint='test')